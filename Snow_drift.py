@@ -37,6 +37,7 @@ import matplotlib.pyplot as plt
 import os
 import plotly.graph_objects as go
 import streamlit as st
+from datasets import DatasetHandle, HASH_FUNCS
 
 def compute_Qupot(hourly_wind_speeds, dt=3600):
     """
@@ -163,6 +164,116 @@ def compute_average_sector(df):
     return avg_sectors
 
 
+def season_codes(times):
+    """
+    Assign every hourly sample to its season (July 1 to June 30).
+
+    Parameters:
+      times: array-like of timestamps.
+
+    Returns:
+      (seasons, codes): the sorted season start years and, for every sample,
+      the index of its season in `seasons`.
+    """
+    times = pd.DatetimeIndex(pd.to_datetime(times))
+    season = np.where(times.month >= 7, times.year, times.year - 1)
+    seasons, codes = np.unique(season, return_inverse=True)
+    return seasons, codes
+
+
+def compute_seasonal_arrays(temperature, precipitation, wind_speed, wind_direction, codes, n_seasons, dt=3600):
+    """
+    Array-based kernel computing per-season Qupot, Swe and the 16-sector breakdown
+    in a single pass over the hourly samples.
+
+    Parameters:
+      temperature, precipitation, wind_speed, wind_direction: arrays of hourly values,
+        either 1-D (hours,) for one site or 2-D (sites, hours).
+      codes: season index of every hour (see season_codes).
+      n_seasons: number of seasons.
+      dt: time step in seconds
+
+    Returns:
+      (Qupot, Swe, sectors): arrays of shape (n_seasons,), (n_seasons,) and (n_seasons, 16),
+      with a leading sites axis for 2-D input.
+
+    Missing (NaN) hours are handled as in compute_yearly_results: they add nothing
+    to Swe (pandas' sum skips them), and a missing wind speed makes Qupot, and so
+    Qt, NaN for its season. Hours without a wind direction are left out of the
+    sectors, where compute_sector_transport would fail on them.
+    """
+    single_site = np.ndim(wind_speed) == 1
+    wind_speed = np.atleast_2d(np.asarray(wind_speed, dtype=float))
+    n_sites = wind_speed.shape[0]
+    # Flat bin of every sample: (site, season), each site owning n_seasons bins.
+    bins = np.arange(n_sites)[:, None] * n_seasons + np.asarray(codes)[None, :]
+
+    transport = np.power(wind_speed, 3.8) * dt / 233847
+    Qupot = np.bincount(bins.ravel(), weights=transport.ravel(), minlength=n_sites * n_seasons)
+
+    # Hourly Swe: precipitation counts when temperature < +1°C (missing values add nothing).
+    temperature = np.atleast_2d(np.asarray(temperature, dtype=float))
+    precipitation = np.atleast_2d(np.asarray(precipitation, dtype=float))
+    Swe_hourly = np.nan_to_num(np.where(temperature < 1, precipitation, 0.0), nan=0.0)
+    Swe = np.bincount(bins.ravel(), weights=Swe_hourly.ravel(), minlength=n_sites * n_seasons)
+
+    direction = np.atleast_2d(np.asarray(wind_direction, dtype=float))
+    valid = np.isfinite(direction)
+    sector = (((direction[valid] + 11.25) % 360) // 22.5).astype(np.int64)
+    sectors = np.bincount(bins[valid] * 16 + sector, weights=transport[valid],
+                          minlength=n_sites * n_seasons * 16)
+
+    Qupot = Qupot.reshape(n_sites, n_seasons)
+    Swe = Swe.reshape(n_sites, n_seasons)
+    sectors = sectors.reshape(n_sites, n_seasons, 16)
+    if single_site:
+        return Qupot[0], Swe[0], sectors[0]
+    return Qupot, Swe, sectors
+
+
+def snow_transport_arrays(T, F, theta, Swe, Qupot):
+    """
+    Vectorized version of compute_snow_transport for arrays of seasons.
+
+    Returns a dictionary with the same keys as compute_snow_transport.
+    """
+    Qspot = 0.5 * T * Swe
+    Srwe = theta * Swe
+    snowfall_controlled = Qupot > Qspot
+    Qinf = np.where(snowfall_controlled, 0.5 * T * Srwe, Qupot)
+    Qt = Qinf * (1 - 0.14 ** (F / T))
+    return {
+        "Qupot (kg/m)": Qupot,
+        "Qspot (kg/m)": Qspot,
+        "Srwe (mm)": Srwe,
+        "Qinf (kg/m)": Qinf,
+        "Qt (kg/m)": Qt,
+        "Control": np.where(snowfall_controlled, "Snowfall controlled", "Wind controlled"),
+    }
+
+
+def compute_seasonal_transport(df, T, F, theta, dt=3600):
+    """
+    Compute the yearly (seasonal) results and the per-season sector breakdown in one pass.
+
+    Produces the same numbers as compute_yearly_results and compute_average_sector
+    without per-row Python work.
+
+    Returns:
+      (yearly_df, sectors): the DataFrame returned by compute_yearly_results and an
+      array of shape (n_seasons, 16) with the sector transport of every season.
+    """
+    seasons, codes = season_codes(df['time'])
+    Qupot, Swe, sectors = compute_seasonal_arrays(df['temperature_2m'].to_numpy(),
+                                                  df['precipitation'].to_numpy(),
+                                                  df['wind_speed_10m'].to_numpy(),
+                                                  df['wind_direction_10m'].to_numpy(),
+                                                  codes, len(seasons), dt)
+    yearly_df = pd.DataFrame(snow_transport_arrays(T, F, theta, Swe, Qupot))
+    yearly_df["season"] = [f"{s}-{s+1}" for s in seasons]
+    return yearly_df, sectors
+
+
 def plot_rose(avg_sector_values, overall_avg):
     """
     Create a canvas with a polar (wind rose) plot showing the average directional breakdown.
@@ -230,6 +341,57 @@ def plot_rose(avg_sector_values, overall_avg):
     return fig
 
 
+FENCE_FACTORS = {"Wyoming": 8.5, "Slat-and-wire": 7.7, "Solid": 2.9}
+
+
+def snowdrift_batch(times, temperature, precipitation, wind_speed, wind_direction,
+                    T=3000, F=30000, theta=0.5, chunk_size=64, dt=3600):
+    """
+    Evaluate snow drift for many sites at once.
+
+    Parameters:
+      times: array-like of the hourly timestamps shared by all sites (hours,).
+      temperature, precipitation, wind_speed, wind_direction: arrays of shape (sites, hours).
+      T: Maximum transport distance (m), scalar or one value per site.
+      F: Fetch distance (m), scalar or one value per site.
+      theta: Relocation coefficient, scalar or one value per site.
+      chunk_size: Number of sites processed at a time, bounds the temporary memory
+                  to roughly chunk_size * hours * 8 bytes per array.
+      dt: time step in seconds
+
+    Returns:
+      (results, sectors):
+        results: DataFrame indexed by (site, season) with the columns of
+                 compute_yearly_results plus the fence height for every fence type.
+        sectors: array of shape (sites, seasons, 16) with the sector transport (kg/m).
+    """
+    seasons, codes = season_codes(times)
+    wind_speed = np.asarray(wind_speed, dtype=float)
+    n_sites, n_seasons = wind_speed.shape[0], len(seasons)
+
+    Qupot = np.empty((n_sites, n_seasons))
+    Swe = np.empty((n_sites, n_seasons))
+    sectors = np.empty((n_sites, n_seasons, 16))
+    for lo in range(0, n_sites, chunk_size):
+        hi = min(lo + chunk_size, n_sites)
+        Qupot[lo:hi], Swe[lo:hi], sectors[lo:hi] = compute_seasonal_arrays(
+            np.asarray(temperature[lo:hi]), np.asarray(precipitation[lo:hi]),
+            wind_speed[lo:hi], np.asarray(wind_direction[lo:hi]),
+            codes, n_seasons, dt)
+
+    # Per-site parameters broadcast over the season axis.
+    T, F, theta = (np.reshape(np.asarray(p, dtype=float), (-1, 1)) for p in (T, F, theta))
+    transport = snow_transport_arrays(T, F, theta, Swe, Qupot)
+
+    index = pd.MultiIndex.from_product([range(n_sites), [f"{s}-{s+1}" for s in seasons]],
+                                       names=["site", "season"])
+    results = pd.DataFrame({key: np.broadcast_to(value, (n_sites, n_seasons)).ravel()
+                            for key, value in transport.items()}, index=index)
+    for fence_type, factor in FENCE_FACTORS.items():
+        results[f"{fence_type} (m)"] = (results["Qt (kg/m)"] / 1000.0 / factor) ** (1 / 2.2)
+    return results, sectors
+
+
 def compute_fence_height(Qt, fence_type):
     """
     Calculate the necessary effective fence height (H) for storing a given snow drift.
@@ -266,32 +428,25 @@ def compute_fence_height(Qt, fence_type):
     H = (Qt_tonnes / factor) ** (1 / 2.2)
     return H
 
-@st.cache_data(ttl=600)
-def snowdrift(df: pd.DataFrame) -> tuple:
+@st.cache_data(ttl=600, hash_funcs=HASH_FUNCS)
+def snowdrift(weather: DatasetHandle, T: float = 3000, F: float = 30000, theta: float = 0.5) -> tuple:
     """
     Calculate snow drift for all seasons in the data and create a wind rose plot.
 
     Args:
-        df: DataFrame with weather data including time, temperature, precipitation,
-            wind speed, and wind direction.
+        weather: Handle of the weather data indexed by time, including temperature,
+            precipitation, wind speed, and wind direction.
+        T: Maximum transport distance in meters.
+        F: Fetch distance in meters.
+        theta: Relocation coefficient.
 
     Returns:
         Tuple of (wind rose plot, fence height DataFrame, yearly results DataFrame,
         overall average in tonnes/m).
     """
-    # Convert the 'time' column to datetime.
-    df['time'] = pd.to_datetime(df['time'])
-
-    # Define season: if month >= 7, season = current year; otherwise, season = previous year.
-    df['season'] = df['time'].apply(lambda dt: dt.year if dt.month >= 7 else dt.year - 1)
-
-    # Parameters for the snow transport calculation.
-    T = 3000      # Maximum transport distance in meters
-    F = 30000     # Fetch distance in meters
-    theta = 0.5   # Relocation coefficient
-
-    # Compute seasonal results (yearly averages for each season).
-    yearly_df = compute_yearly_results(df, T, F, theta)
+    df = weather.data.reset_index()
+    # Compute seasonal results and the directional breakdown of every season in one pass.
+    yearly_df, sectors = compute_seasonal_transport(df, T, F, theta)
     overall_avg = yearly_df['Qt (kg/m)'].mean()
     print("\nYearly average snow drift (Qt) per season:")
     print(f"Overall average Qt over all seasons: {overall_avg / 1000:.1f} tonnes/m")
@@ -305,8 +460,8 @@ def snowdrift(df: pd.DataFrame) -> tuple:
     overall_avg_tonnes = overall_avg / 1000
     print(f"\nOverall average Qt over all seasons: {overall_avg_tonnes:.1f} tonnes/m")
 
-    # Compute the average directional breakdown (average over all seasons).
-    avg_sectors = compute_average_sector(df)
+    # Average directional breakdown over all seasons.
+    avg_sectors = sectors.mean(axis=0)
 
     # Create the rose plot canvas with the average directional breakdown.
     plot = plot_rose(avg_sectors, overall_avg)
@@ -0,0 +1,65 @@
+"""
+Benchmark: price-area lookup with AreaIndex vs. matplotlib's Path.contains_points.
+
+Draws random points over the bounding box of the price areas, locates them
+with AreaIndex (batch and one at a time) and with matplotlib's point-in-polygon
+test on the full-resolution polygons, and checks both agree.
+
+Run from the repository root:
+    python -m benchmarks.bench_area_index [--points 100000]
+"""
+import argparse
+import time
+
+import numpy as np
+from matplotlib.path import Path
+
+from geodata import GEOJSON, AreaIndex, read_areas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=GEOJSON, help="Full-resolution GeoJSON.")
+    parser.add_argument("--points", type=int, default=100_000, help="Number of random points.")
+    args = parser.parse_args()
+
+    areas = read_areas(args.source)
+    t0 = time.perf_counter()
+    index = AreaIndex(areas)
+    build = time.perf_counter() - t0
+
+    rng = np.random.default_rng(0)
+    lat_min, lon_min, lat_max, lon_max = index.bounds
+    lat, lon = rng.uniform(lat_min, lat_max, args.points), rng.uniform(lon_min, lon_max, args.points)
+
+    t0 = time.perf_counter()
+    found = index.locate_many(lat, lon)
+    batch = time.perf_counter() - t0
+
+    singles = min(args.points, 10_000)
+    t0 = time.perf_counter()
+    for i in range(singles):
+        index.locate(lat[i], lon[i])
+    single = time.perf_counter() - t0
+
+    expected = np.full(args.points, -1)
+    t0 = time.perf_counter()
+    points = np.column_stack([lon, lat])
+    for i, (_, polygons) in enumerate(areas):
+        for polygon in polygons:
+            inside = Path(polygon[0]).contains_points(points)
+            for hole in polygon[1:]:
+                inside &= ~Path(hole).contains_points(points)
+            expected[inside] = i
+    reference = time.perf_counter() - t0
+
+    print(f"{args.points} points, {sum(len(ring) for _, p in areas for poly in p for ring in poly)} polygon vertices")
+    print(f"AreaIndex build (once):     {build * 1e3:10.1f} ms")
+    print(f"AreaIndex batch per point:  {batch / args.points * 1e6:10.2f} us")
+    print(f"AreaIndex single lookup:    {single / singles * 1e6:10.2f} us")
+    print(f"matplotlib per point:       {reference / args.points * 1e6:10.2f} us")
+    print(f"area mismatches:            {int((found != expected).sum())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: time st.cache_data spends hashing arguments into cache keys.
+
+For every cached analysis function of the pages, the arguments of one rerun are
+hashed with Streamlit's own cache-key hasher, once as before (the DataFrame or
+Series passed directly) and once as now (a DatasetHandle with HASH_FUNCS).
+Frames are synthetic and sized like a year of data for one selection. The
+one-off cost of fingerprinting a loaded frame (paid on a loader cache miss, not
+per rerun) is printed as well.
+
+Run from the repository root:
+    python -m benchmarks.bench_cache_keys [--days 365] [--repeat 20]
+"""
+import argparse
+import hashlib
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+from streamlit.runtime.caching.hashing import CacheType, update_hash
+
+from benchmarks.bench_columnar_loader import AREAS, GROUPS
+from datasets import HASH_FUNCS, DatasetHandle
+from elhub_loader import apply_schema, elhub_columns
+
+WEATHER_COLUMNS = ["temperature_2m", "precipitation", "wind_speed_10m", "wind_gusts_10m", "wind_direction_10m"]
+
+
+def synthetic_frames(days: int) -> dict[str, pd.DataFrame]:
+    """Elhub (all areas and groups), weather and aligned frames covering `days`."""
+    rng = np.random.default_rng(0)
+    hours = pd.date_range("2024-01-01", periods=days * 24, freq="h")
+    n = len(hours) * len(AREAS) * len(GROUPS)
+    elhub = apply_schema(pd.DataFrame({"starttime": np.repeat(hours, len(AREAS) * len(GROUPS)),
+                                       "pricearea": np.tile(np.repeat(AREAS, len(GROUPS)), len(hours)),
+                                       "productiongroup": np.tile(GROUPS, len(hours) * len(AREAS)),
+                                       "quantitykwh": rng.random(n) * 1e6}),
+                         elhub_columns("productiongroup"))
+    weather = pd.DataFrame({name: rng.random(len(hours)) for name in WEATHER_COLUMNS},
+                           index=hours.rename("time"))
+    aligned = pd.concat([pd.DataFrame({"quantitykwh": rng.random(len(hours)) * 1e6}, index=weather.index), weather],
+                        axis=1)
+    return {"elhub": elhub, "weather": weather, "aligned": aligned}
+
+
+def key_seconds(args: tuple, repeat: int, hash_funcs: dict = None) -> float:
+    """Median seconds to hash the arguments of one call into a cache key."""
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        hasher = hashlib.new("md5")
+        for arg in args:
+            update_hash(arg, hasher=hasher, cache_type=CacheType.DATA, hash_funcs=hash_funcs)
+        runs.append(time.perf_counter() - t0)
+    return statistics.median(runs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365, help="Days of synthetic data.")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    frames = synthetic_frames(args.days)
+    handles = {}
+    for name, frame in frames.items():
+        t0 = time.perf_counter()
+        handles[name] = DatasetHandle.create(frame, name, days=args.days)
+        print(f"fingerprint {name:8} {len(frame):>8} rows: {(time.perf_counter() - t0) * 1e3:7.1f} ms (once per load)")
+
+    aligned = frames["aligned"]
+    calls = {  # function: (arguments before, arguments now)
+        "loess": ((frames["elhub"], "NO1", "hydro", 168, 141, 141, True),
+                  (handles["elhub"], "NO1", "hydro", 168, 141, 141, True)),
+        "spectrogram": ((frames["elhub"], "NO1", "hydro", 256, 128),
+                        (handles["elhub"], "NO1", "hydro", 256, 128)),
+        "high_pass": ((frames["weather"], "temperature_2m", 50, 2.0),
+                      (handles["weather"], "temperature_2m", 50, 2.0)),
+        "lof": ((frames["weather"], "precipitation", 20, 0.01),
+                (handles["weather"], "precipitation", 20, 0.01)),
+        "snowdrift": ((frames["weather"].reset_index(), 3000, 30000, 0.5),
+                      (handles["weather"], 3000, 30000, 0.5)),
+        "corr_surface": ((aligned["quantitykwh"], aligned["precipitation"], 720),
+                         (handles["aligned"], "quantitykwh", "precipitation", 720)),
+    }
+    print(f"\n{'function':14} {'frames':>10} {'handles':>10} {'speedup':>9}")
+    total_before = total_after = 0.0
+    for name, (before, after) in calls.items():
+        t_before = key_seconds(before, args.repeat)
+        t_after = key_seconds(after, args.repeat, HASH_FUNCS)
+        total_before, total_after = total_before + t_before, total_after + t_after
+        print(f"{name:14} {t_before * 1e3:8.2f}ms {t_after * 1e3:8.3f}ms {t_before / t_after:8.0f}x")
+    print(f"{'total':14} {total_before * 1e3:8.2f}ms {total_after * 1e3:8.3f}ms "
+          f"{total_before / total_after:8.0f}x  (one call of each function)")
+
+
+if __name__ == "__main__":
+    main()
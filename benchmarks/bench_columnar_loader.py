@@ -0,0 +1,80 @@
+"""
+Benchmark: list-of-dicts DataFrame construction vs. the columnar Elhub loader.
+
+Uses the MongoDB instance in MONGO_URI if set, otherwise an in-memory mongomock
+collection filled with synthetic hourly production documents.
+
+Run from the repository root:
+    python -m benchmarks.bench_columnar_loader [--days 120]
+"""
+import argparse
+import datetime
+import os
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pymongo
+
+from elhub_loader import collection_for, elhub_columns, load_columnar
+
+AREAS = ["NO1", "NO2", "NO3", "NO4", "NO5"]
+GROUPS = ["hydro", "wind", "solar", "thermal", "other"]
+
+
+def synthetic_client(days: int):
+    """Create a mongomock client with `days` of hourly documents per area and group."""
+    import mongomock
+
+    client = mongomock.MongoClient()
+    rng = np.random.default_rng(0)
+    start = datetime.datetime(2021, 1, 1)
+    docs = [{"starttime": start + datetime.timedelta(hours=h),
+             "endtime": start + datetime.timedelta(hours=h + 1),
+             "lastupdatedtime": start,
+             "pricearea": area,
+             "productiongroup": group,
+             "quantitykwh": float(rng.random() * 1e6)}
+            for h in range(days * 24) for area in AREAS for group in GROUPS]
+    client.elhub.prod_data.insert_many(docs)
+    return client
+
+
+def measure(func) -> tuple[float, float, pd.DataFrame]:
+    """Return (seconds, peak MiB, result) for one call of func."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=120, help="Days of synthetic data (mongomock only).")
+    args = parser.parse_args()
+
+    uri = os.environ.get("MONGO_URI")
+    client = pymongo.MongoClient(uri) if uri else synthetic_client(args.days)
+    collection, feat_name = collection_for(client, "production")
+    columns = elhub_columns(feat_name)
+
+    def dicts() -> pd.DataFrame:
+        data = pd.DataFrame(list(collection.find({}, {"_id": 0})))
+        return data.set_index("starttime").sort_index()
+
+    def columnar() -> pd.DataFrame:
+        cursor = collection.find({}, {"_id": 0, **{name: 1 for name in columns}})
+        return load_columnar(cursor, columns)
+
+    for name, func in [("list of dicts", dicts), ("columnar", columnar)]:
+        elapsed, peak, frame = measure(func)
+        size = frame.memory_usage(deep=True).sum() / 2**20
+        print(f"{name:>14}: {elapsed:6.2f} s, peak {peak:8.1f} MiB, frame {size:7.1f} MiB, rows {len(frame)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark: memory of the untyped Elhub frame vs. the enforced Elhub schema.
+
+The untyped frame is what get_elhub_data used to return: every field of the
+documents, with object columns for strings and timestamps pandas inferred. The
+schema frame keeps starttime (UTC index), pricearea and the group field as
+categoricals and quantitykwh as float64. Prints deep memory per column and the
+pickled size and time, which is what st.cache_data stores and reads on every hit.
+
+Uses the MongoDB instance in MONGO_URI if set, otherwise an in-memory mongomock
+collection filled with synthetic hourly production documents.
+
+Run from the repository root:
+    python -m benchmarks.bench_elhub_schema [--days 120]
+"""
+import argparse
+import os
+import pickle
+import time
+
+import pandas as pd
+import pymongo
+
+from benchmarks.bench_columnar_loader import synthetic_client
+from elhub_loader import apply_schema, collection_for, elhub_columns
+
+
+def report(name: str, frame: pd.DataFrame) -> float:
+    """Print the memory of each column and return the total in MiB."""
+    usage = frame.memory_usage(deep=True) / 2**20
+    t0 = time.perf_counter()
+    blob = pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL)
+    dump = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    pickle.loads(blob)
+    load = time.perf_counter() - t0
+    print(f"{name}: {usage.sum():.1f} MiB in memory, pickle {len(blob) / 2**20:.1f} MiB "
+          f"(dump {dump * 1e3:.0f} ms, load {load * 1e3:.0f} ms)")
+    for column, mib in usage.items():
+        dtype = frame.index.dtype if column == "Index" else frame[column].dtype
+        print(f"    {column:>16} {str(dtype):>20} {mib:8.2f} MiB")
+    return usage.sum()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=120, help="Days of synthetic data (mongomock only).")
+    args = parser.parse_args()
+
+    uri = os.environ.get("MONGO_URI")
+    client = pymongo.MongoClient(uri) if uri else synthetic_client(args.days)
+    collection, feat_name = collection_for(client, "production")
+
+    untyped = pd.DataFrame(list(collection.find({}, {"_id": 0}))).set_index("starttime").sort_index()
+    typed = apply_schema(untyped, elhub_columns(feat_name))
+
+    before = report("untyped", untyped)
+    after = report("schema", typed)
+    print(f"{len(typed)} rows, {before / after:.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark: map page payload with the full-resolution GeoJSON vs. the simplified levels.
+
+Renders the Folium map the way comb_map did before (Choropleth plus GeoJson plus
+the highlighted area, all at full resolution) and the way it does now (one
+GeoJson layer of the simplified level for the zoom), and reports the HTML size
+and the render time.
+
+Run from the repository root:
+    python -m benchmarks.bench_geodata
+"""
+import argparse
+import json
+import time
+
+import folium
+import pandas as pd
+
+from geodata import AREA_KEY, GEOJSON, ZOOM_LEVELS, level_for_zoom, load_levels, with_properties
+
+
+def render(m: folium.Map) -> tuple[float, float]:
+    """HTML size in kB and render time in ms of a map."""
+    t0 = time.perf_counter()
+    html = m.get_root().render()
+    return len(html) / 1e3, (time.perf_counter() - t0) * 1e3
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=GEOJSON, help="Full-resolution GeoJSON.")
+    args = parser.parse_args()
+
+    with open(args.source) as f:
+        gj = json.load(f)
+    areas = [feature["properties"][AREA_KEY].replace(" ", "") for feature in gj["features"]]
+    for feature, area in zip(gj["features"], areas):
+        feature["properties"].update({AREA_KEY: area, "quantitymwh": 1.0})
+    dfg = pd.DataFrame({"pricearea": areas, "quantitymwh": range(len(areas))})
+
+    m = folium.Map(location=(63, 10), zoom_start=4)
+    folium.Choropleth(geo_data=gj, data=dfg, columns=["pricearea", "quantitymwh"],
+                      key_on=f"feature.properties.{AREA_KEY}").add_to(m)
+    folium.GeoJson(gj).add_to(m)
+    folium.GeoJson(gj["features"][0]).add_to(m)
+    size, ms = render(m)
+    print(f"full resolution, three layers: {size:8.1f} kB {ms:8.1f} ms")
+
+    levels = load_levels(args.source)
+    for zoom in ZOOM_LEVELS:
+        level = with_properties(level_for_zoom(levels, zoom), {area: {"quantitymwh": 1.0} for area in areas})
+        m = folium.Map(location=(63, 10), zoom_start=zoom)
+        folium.GeoJson(level, style_function=lambda feature: {"fillColor": "#440154", "weight": 1}).add_to(m)
+        size, ms = render(m)
+        print(f"zoom {zoom:>2} level, one layer:    {size:8.1f} kB {ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
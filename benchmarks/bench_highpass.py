@@ -0,0 +1,62 @@
+"""
+Benchmark: recomputing the DCT high-pass detector vs. HighPassSpectrum.
+
+Simulates dragging the cutoff slider of weather_lof one step at a time up and
+back down, then dragging the nstd slider, on synthetic hourly data. The old
+path transforms the series and takes the MAD for every position; the spectrum
+transforms once, corrects the low band by the cosines between neighbouring
+cutoffs and only re-thresholds for nstd. Also checks the outlier masks agree.
+
+Run from the repository root:
+    python -m benchmarks.bench_highpass [--days 1460]
+"""
+import argparse
+import time
+
+import numpy as np
+from scipy.stats import median_abs_deviation
+
+from outliers import HighPassSpectrum, calc_highpass
+
+
+def detect(values: np.ndarray, cutoff: int, nstd: float) -> np.ndarray:
+    """Outlier mask as computed on every slider change before HighPassSpectrum."""
+    satv = calc_highpass(values, cutoff)
+    mad = median_abs_deviation(satv)
+    std_robust = 1.4826 * mad
+    return (satv > mad + nstd * std_robust) | (satv < mad - nstd * std_robust)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=1460, help="Days of hourly data.")
+    parser.add_argument("--cutoff", type=int, default=50, help="Start of the cutoff drag.")
+    parser.add_argument("--steps", type=int, default=30, help="Slider steps in each direction.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    values = rng.standard_normal(args.days * 24).cumsum()
+    cutoffs = list(range(args.cutoff, args.cutoff + args.steps)) + list(range(args.cutoff + args.steps, args.cutoff - 1, -1))
+    nstds = np.round(np.arange(0.5, 5.01, 0.1), 1)
+
+    timings = {}
+    expected, masks = [], []
+    spectrum = HighPassSpectrum(values)
+    for name, drag in [("cutoff", [(c, 2.0) for c in cutoffs]), ("nstd", [(cutoffs[-1], nstd) for nstd in nstds])]:
+        t0 = time.perf_counter()
+        expected += [detect(values, c, nstd) for c, nstd in drag]
+        t1 = time.perf_counter()
+        masks += [spectrum.threshold(c, nstd)[1] for c, nstd in drag]
+        t2 = time.perf_counter()
+        timings[name] = ((t1 - t0) / len(drag), (t2 - t1) / len(drag))
+    mismatches = sum(int((mask != ref).sum()) for mask, ref in zip(masks, expected))
+
+    print(f"{len(values)} rows, {len(cutoffs)} cutoff and {len(nstds)} nstd slider positions")
+    print("per slider position      recompute   HighPassSpectrum")
+    for name, (old, new) in timings.items():
+        print(f"{name:<24} {old * 1e3:6.2f} ms   {new * 1e3:6.2f} ms")
+    print(f"outlier mask mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark: Elhub query latency before and after ensure_indexes.
+
+Needs a real MongoDB (explain and index builds are not available in mongomock).
+Fills a scratch database with synthetic hourly production documents, times every
+query shape of the pages without secondary indexes, creates the indexes and
+times them again, printing the winning plan of each shape. The scratch database
+is dropped afterwards.
+
+Run from the repository root against a local mongod:
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_indexes [--days 365] [--repeat 5]
+"""
+import argparse
+import datetime
+import os
+import statistics
+import time
+
+import numpy as np
+import pymongo
+
+from benchmarks.bench_columnar_loader import AREAS, GROUPS
+from elhub_indexes import check_query_plans, ensure_indexes, query_shapes
+
+
+def fill(collection, days: int) -> None:
+    """Insert `days` of hourly documents per area and group, one day per batch."""
+    rng = np.random.default_rng(0)
+    start = datetime.datetime(2024, 1, 1)
+    for day in range(days):
+        docs = [{"starttime": start + datetime.timedelta(hours=h),
+                 "endtime": start + datetime.timedelta(hours=h + 1),
+                 "lastupdatedtime": start,
+                 "pricearea": area,
+                 "productiongroup": group,
+                 "quantitykwh": float(rng.random() * 1e6)}
+                for h in range(day * 24, (day + 1) * 24) for area in AREAS for group in GROUPS]
+        collection.insert_many(docs, ordered=False)
+
+
+def time_shapes(collection, shapes: dict[str, list[dict]], repeat: int) -> dict[str, float]:
+    """Median seconds to run and drain each pipeline."""
+    timings = {}
+    for shape, pipeline in shapes.items():
+        runs = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            for _ in collection.aggregate(pipeline, allowDiskUse=True):
+                pass
+            runs.append(time.perf_counter() - t0)
+        timings[shape] = statistics.median(runs)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365, help="Days of synthetic data.")
+    parser.add_argument("--range-days", type=int, default=30, help="Length of the queried date range.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database", default="elhub_bench", help="Scratch database, dropped before and after.")
+    args = parser.parse_args()
+
+    uri = os.environ.get("MONGO_URI")
+    if not uri:
+        raise SystemExit("Set MONGO_URI to a MongoDB instance, e.g. mongodb://localhost:27017")
+    client = pymongo.MongoClient(uri)
+    client.drop_database(args.database)
+    collection = client[args.database].prod_data
+    feat_name = "productiongroup"
+    try:
+        fill(collection, args.days)
+        start = datetime.datetime(2024, 1, 1) + datetime.timedelta(days=args.days // 2)
+        dates = (start, start + datetime.timedelta(days=args.range_days))
+        shapes = query_shapes(feat_name, GROUPS[:2], AREAS[0], dates)
+
+        before = time_shapes(collection, shapes, args.repeat)
+        plans_before = {row["shape"]: row for row in check_query_plans(collection, feat_name, GROUPS[:2], AREAS[0], dates)}
+        t0 = time.perf_counter()
+        ensure_indexes(collection, feat_name)
+        build = time.perf_counter() - t0
+        after = time_shapes(collection, shapes, args.repeat)
+        plans_after = {row["shape"]: row for row in check_query_plans(collection, feat_name, GROUPS[:2], AREAS[0], dates)}
+
+        print(f"{collection.estimated_document_count()} documents, {args.range_days}-day range, index build {build:.1f} s")
+        print(f"{'shape':34} {'before':>9} {'after':>9} {'speedup':>8}  plan after")
+        for shape in shapes:
+            plan = " <- ".join(plans_after[shape]["stages"])
+            was = "COLLSCAN" if plans_before[shape]["collscan"] else "indexed"
+            print(f"{shape:34} {before[shape] * 1e3:7.1f}ms {after[shape] * 1e3:7.1f}ms "
+                  f"{before[shape] / after[shape]:7.1f}x  {plan} (was {was})")
+    finally:
+        client.drop_database(args.database)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark: sklearn LocalOutlierFactor refits vs. the reusable LofIndex.
+
+Simulates moving the n_neighbors slider of weather_lof over a range of values on
+synthetic hourly data: sklearn refits for every value, LofIndex is built once
+(k_max neighbours) and then only scored. Also checks the labels agree.
+
+Run from the repository root:
+    python -m benchmarks.bench_lof [--days 1460] [--features 1]
+"""
+import argparse
+import time
+
+import numpy as np
+from sklearn.neighbors import LocalOutlierFactor
+
+from outliers import K_MAX, LofIndex
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=1460, help="Days of hourly data.")
+    parser.add_argument("--features", type=int, default=1, help="Number of features (1 uses the sorted search, more the KD-tree).")
+    parser.add_argument("--contamination", type=float, default=0.01)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((args.days * 24, args.features)).cumsum(axis=0)  # smooth, weather-like
+    ks = [5, 10, 20, 35, 50, 75, 100]
+
+    t0 = time.perf_counter()
+    index = LofIndex(X, k_max=K_MAX)
+    build = time.perf_counter() - t0
+
+    sk_total = ix_total = 0.0
+    mismatches = 0
+    for k in ks:
+        t0 = time.perf_counter()
+        expected = LocalOutlierFactor(n_neighbors=k, contamination=args.contamination).fit_predict(X)
+        sk_total += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        labels, _ = index.predict(k, args.contamination)
+        ix_total += time.perf_counter() - t0
+        mismatches += int((labels != expected).sum())
+
+    print(f"{len(X)} rows, {args.features} feature(s), n_neighbors in {ks}")
+    print(f"sklearn refit per value: {sk_total / len(ks) * 1e3:8.1f} ms")
+    print(f"LofIndex build (once):   {build * 1e3:8.1f} ms")
+    print(f"LofIndex per value:      {ix_total / len(ks) * 1e3:8.1f} ms")
+    print(f"label mismatches:        {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark: row-wise Tabler snow-transport functions vs. the array-based kernel.
+
+Runs compute_yearly_results + compute_average_sector and
+compute_seasonal_transport on synthetic hourly weather, checks that both give
+the same numbers and prints the timings.
+
+Run from the repository root:
+    python -m benchmarks.bench_snow_drift [--years 4]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from Snow_drift import compute_average_sector, compute_seasonal_transport, compute_yearly_results
+
+T, F, THETA = 3000, 30000, 0.5
+
+
+def synthetic_weather(years: int) -> pd.DataFrame:
+    """Hourly weather with the columns returned by get_weather_data."""
+    rng = np.random.default_rng(0)
+    time_index = pd.date_range("2021-01-01", periods=years * 8760, freq="h")
+    return pd.DataFrame({
+        "time": time_index,
+        "temperature_2m": rng.normal(2, 8, len(time_index)),
+        "precipitation": rng.exponential(0.3, len(time_index)),
+        "wind_speed_10m": rng.gamma(2.0, 2.5, len(time_index)),
+        "wind_direction_10m": rng.uniform(0, 360, len(time_index)),
+    })
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=4)
+    args = parser.parse_args()
+    df = synthetic_weather(args.years)
+
+    t0 = time.perf_counter()
+    df_rows = df.copy()
+    df_rows["season"] = df_rows["time"].apply(lambda dt: dt.year if dt.month >= 7 else dt.year - 1)
+    yearly_rows = compute_yearly_results(df_rows, T, F, THETA)
+    sectors_rows = compute_average_sector(df_rows)
+    t_rows = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    yearly_fast, sectors = compute_seasonal_transport(df, T, F, THETA)
+    sectors_fast = sectors.mean(axis=0)
+    t_fast = time.perf_counter() - t0
+
+    pd.testing.assert_frame_equal(yearly_rows, yearly_fast[yearly_rows.columns], check_exact=False, rtol=1e-9)
+    np.testing.assert_allclose(sectors_rows, sectors_fast, rtol=1e-9)
+    print(f"{len(df)} hourly rows, {len(yearly_fast)} seasons")
+    print(f"   row-wise: {t_rows:7.3f} s")
+    print(f"vectorized: {t_fast:7.3f} s  ({t_rows / t_fast:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
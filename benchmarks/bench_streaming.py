@@ -0,0 +1,73 @@
+"""
+Benchmark: materialized vs. streamed aggregation of the Elhub data.
+
+Builds the daily rollup, group sums and per-area means once from one fully
+loaded frame and once from monthly chunks of iter_elhub_data fed to
+RollupAccumulators, checks that both agree and prints time and peak memory.
+
+Uses the MongoDB instance in MONGO_URI if set, otherwise an in-memory mongomock
+collection filled with synthetic hourly production documents. mongomock scans
+the whole collection for every monthly query, so its timings overstate the
+cost of streaming; compare the peak memory there.
+
+Run from the repository root:
+    python -m benchmarks.bench_streaming [--days 90]
+"""
+import argparse
+import datetime
+import os
+
+import pandas as pd
+import pymongo
+
+from benchmarks.bench_columnar_loader import measure, synthetic_client
+from elhub_loader import collection_for, elhub_columns, load_columnar
+from elhub_rollups import RollupAccumulator
+from utilities import elhub_pipeline, iter_elhub_data
+
+KINDS = {"daily rollup": ("D", ("pricearea", "group")),
+         "group sums": (None, ("group",)),
+         "area means": (None, ("pricearea",))}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=90, help="Days of synthetic data (mongomock only).")
+    args = parser.parse_args()
+
+    uri = os.environ.get("MONGO_URI")
+    client = pymongo.MongoClient(uri) if uri else synthetic_client(args.days)
+    collection, feat_name = collection_for(client, "production")
+    first = collection.find_one({}, sort=[("starttime", 1)])["starttime"]
+    last = collection.find_one({}, sort=[("starttime", -1)])["starttime"]
+    dates = (first, last)
+
+    def materialized() -> dict[str, pd.DataFrame]:
+        columns = elhub_columns(feat_name)
+        pipeline = elhub_pipeline(dates, feat_name=feat_name, fields=list(columns))
+        data = load_columnar(collection.aggregate(pipeline, allowDiskUse=True), columns)
+        results = {}
+        for kind, (grain, by) in KINDS.items():
+            acc = RollupAccumulator(feat_name, grain, by)
+            acc.update(data)
+            results[kind] = acc.result()
+        return results
+
+    def streamed() -> dict[str, pd.DataFrame]:
+        accs = {kind: RollupAccumulator(feat_name, grain, by) for kind, (grain, by) in KINDS.items()}
+        for chunk in iter_elhub_data(client, "production", dates, use_mirror=False):
+            for acc in accs.values():
+                acc.update(chunk)
+        return {kind: acc.result() for kind, acc in accs.items()}
+
+    print(f"{collection.estimated_document_count()} documents from {first:%Y-%m-%d} to {last:%Y-%m-%d}")
+    results = {}
+    for name, func in [("materialized", materialized), ("streamed", streamed)]:
+        elapsed, peak, results[name] = measure(func)
+        print(f"{name:>13}: {elapsed:6.2f} s, peak {peak:8.1f} MiB")
+    for kind in KINDS:
+        pd.testing.assert_frame_equal(results["materialized"][kind], results["streamed"][kind])
+
+
+if __name__ == "__main__":
+    main()
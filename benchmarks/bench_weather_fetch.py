@@ -0,0 +1,85 @@
+"""
+Benchmark: single-request vs. chunked concurrent weather fetching.
+
+Starts a local stub of the Open-Meteo archive API whose response time grows with
+the number of requested days, points utilities at it and times get_weather_data
+with an empty on-disk cache for both fetch strategies.
+
+Run from the repository root:
+    python -m benchmarks.bench_weather_fetch [--years 4] [--ms-per-day 5]
+"""
+import argparse
+import datetime
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+import utilities
+import weather_cache
+
+
+def make_handler(ms_per_day: float):
+    """Create a request handler that serves synthetic hourly data."""
+
+    class StubArchive(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            start, end = query["start_date"][0], query["end_date"][0]
+            time_index = pd.date_range(start, pd.Timestamp(end) + pd.Timedelta(hours=23), freq="h")
+            time.sleep(ms_per_day * (len(time_index) / 24) / 1000)
+            hourly = {"time": time_index.strftime("%Y-%m-%dT%H:%M").tolist()}
+            for i, name in enumerate(query["hourly"][0].split(",")):
+                hourly[name] = [float(i)] * len(time_index)
+            body = json.dumps({"hourly": hourly}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return StubArchive
+
+
+def run(years: int, chunk_months: int, max_workers: int) -> tuple[float, int]:
+    """Time one cold get_weather_data call and return (seconds, rows)."""
+    weather_cache.default_cache().root = tempfile.mkdtemp()
+    utilities.get_weather_data.clear()
+    dates = (datetime.date(2021, 1, 1), datetime.date(2021 + years - 1, 12, 31))
+    t0 = time.perf_counter()
+    data = utilities.get_weather_data((59.9139, 10.7522), dates,
+                                      chunk_months=chunk_months, max_workers=max_workers)
+    return time.perf_counter() - t0, len(data)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=4)
+    parser.add_argument("--ms-per-day", type=float, default=5.0, help="Simulated server time per requested day.")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.ms_per_day))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    utilities.WEATHER_ARCHIVE_URL = f"http://127.0.0.1:{server.server_port}/v1/archive?"
+
+    try:
+        for label, chunk_months, max_workers in [("single request", 0, 1),
+                                                 ("6-month chunks x4", 6, 4),
+                                                 ("3-month chunks x8", 3, 8)]:
+            elapsed, rows = run(args.years, chunk_months, max_workers)
+            print(f"{label:>18}: {elapsed:6.2f} s ({rows} rows)")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
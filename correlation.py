@@ -0,0 +1,121 @@
+"""
+Sliding window lagged correlation.
+
+Computes the centered rolling Pearson correlation between a lagged series and a
+reference series for many lags at once. Window sums are taken from cumulative
+sums, so every lag costs O(n) regardless of the window length, and a whole lag
+× time correlation surface costs O(n·L). The result matches
+
+    x.shift(lag).rolling(window, center=True).corr(y)
+
+for every lag, including NaN where the window is incomplete or contains missing values.
+"""
+from typing import Sequence
+
+import numpy as np
+
+
+def _window_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Sum over the centered window at each position.
+
+    A window of length w centered on t covers [t - w//2, t - w//2 + w), like
+    pandas rolling(center=True). Positions where the window leaves the series are NaN.
+    """
+    n = len(values)
+    csum = np.concatenate([[0.0], np.cumsum(values)])
+    out = np.full(n, np.nan)
+    half = window // 2
+    if window <= n:
+        out[half:n - window + half + 1] = csum[window:] - csum[:n - window + 1]
+    return out
+
+
+def lagged_rolling_corr(
+    x: np.ndarray,
+    y: np.ndarray,
+    lags: Sequence[int],
+    window: int,
+    time_stride: int = 1,
+) -> np.ndarray:
+    """
+    Centered rolling correlation between x shifted by each lag and y.
+
+    Args:
+        x: Series that is lagged (shifted forward in time by lag steps).
+        y: Reference series of the same length.
+        lags: Non-negative lags in steps.
+        window: Window length in steps.
+        time_stride: Only keep every time_stride-th time step of the result.
+
+    Returns:
+        float32 array of shape (len(lags), ceil(n / time_stride)) with the correlation
+        of lag i at time step j * time_stride.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    lags = np.asarray(lags, dtype=np.int64)
+    if x.shape != y.shape or x.ndim != 1:
+        raise ValueError("x and y must be 1-D arrays of the same length")
+    if (lags < 0).any():
+        raise ValueError("lags must be non-negative")
+
+    # Subtract the means so the sums of squares stay small relative to their differences
+    x_valid, y_valid = ~np.isnan(x), ~np.isnan(y)
+    x0 = np.where(x_valid, x - (np.nanmean(x) if x_valid.any() else 0.0), 0.0)
+    y0 = np.where(y_valid, y - (np.nanmean(y) if y_valid.any() else 0.0), 0.0)
+
+    # Window statistics of x do not depend on the lag, only their position does.
+    # Windows with missing values are NaN, which propagates to the correlation.
+    sx, sxx = _window_sums(x0, window), _window_sums(x0 ** 2, window)
+    sx[_window_sums(x_valid.astype(np.float64), window) != window] = np.nan
+    sy, syy = _window_sums(y0, window), _window_sums(y0 ** 2, window)
+    sy[_window_sums(y_valid.astype(np.float64), window) != window] = np.nan
+    var_y = window * syy - sy ** 2
+
+    n = len(x)
+    half = window // 2
+    last = n - window + half  # last position with a complete window
+    keep = slice(None, None, time_stride)
+    out = np.empty((len(lags), len(range(n)[keep])), dtype=np.float32)
+    row = np.empty(n)
+    product = np.zeros(n)
+    csum = np.zeros(n + 1)
+    for i, lag in enumerate(lags):
+        row[:] = np.nan
+        first = half + lag  # first position whose shifted window lies inside the series
+        if first <= last:
+            product[:lag] = 0.0
+            product[lag:] = x0[:n - lag] * y0[lag:]
+            np.cumsum(product, out=csum[1:])
+            t = slice(first, last + 1)
+            sxy = csum[first - half + window:last - half + window + 1] - csum[first - half:last - half + 1]
+            sx_l, sxx_l = sx[first - lag:last + 1 - lag], sxx[first - lag:last + 1 - lag]
+            cov = window * sxy - sx_l * sy[t]
+            var_x = window * sxx_l - sx_l ** 2
+            with np.errstate(invalid="ignore", divide="ignore"):
+                denom = np.sqrt(var_x * var_y[t])
+                row[t] = np.where(denom > 0, cov / denom, np.nan)
+        out[i] = row[keep]
+    return out
+
+
+def best_lag(surface: np.ndarray, lags: Sequence[int]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Find the lag with the strongest correlation at each time step.
+
+    Args:
+        surface: Correlation surface from lagged_rolling_corr.
+        lags: Lags of the surface rows.
+
+    Returns:
+        Tuple of (best lag, correlation at that lag) per time step. Time steps
+        without any defined correlation are NaN.
+    """
+    lags = np.asarray(lags, dtype=np.float64)
+    strength = np.abs(surface)
+    defined = ~np.isnan(strength).all(axis=0)
+    idx = np.where(np.isnan(strength), -np.inf, strength).argmax(axis=0)
+    best = np.where(defined, lags[idx], np.nan)
+    corr = np.where(defined, surface[idx, np.arange(surface.shape[1])], np.nan)
+    return best, corr
@@ -0,0 +1,115 @@
+"""
+Dataset handles used as cheap cache keys.
+
+st.cache_data hashes every argument of a cached function on every rerun, which
+for a DataFrame argument means hashing (a sample of) its cells each time a
+widget changes. Loaders instead return a DatasetHandle: an immutable wrapper
+around the frame with a fingerprint of (source, query parameters, data
+version). Cached analysis functions take the handle and pass HASH_FUNCS to
+st.cache_data, so their cache key only contains the fingerprint.
+
+The data version is a digest of the frame contents, computed once when the
+loader runs (i.e. on a loader cache miss), not on every rerun: cached loaders
+are decorated with versioned, which stores the digest in the frame's attrs, so
+it travels with every copy st.cache_data hands out.
+"""
+import functools
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+import pandas as pd
+
+
+def frame_version(data: pd.DataFrame) -> str:
+    """
+    Digest of the contents of a frame (index, columns and values).
+
+    Args:
+        data: Frame to fingerprint.
+
+    Returns:
+        Hex digest that changes whenever any value, label or dtype changes.
+    """
+    digest = hashlib.sha1()
+    digest.update(repr((data.shape, list(data.columns), list(data.dtypes.astype(str)))).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+VERSION_ATTR = "frame_version"
+
+
+def versioned(loader: Callable[..., pd.DataFrame]) -> Callable[..., pd.DataFrame]:
+    """
+    Decorator for loaders: store frame_version of the result in its attrs.
+
+    Apply it below st.cache_data, so the digest is computed on a cache miss and
+    cached with the frame.
+
+    Args:
+        loader: Function returning a DataFrame.
+
+    Returns:
+        Wrapped loader.
+    """
+    @functools.wraps(loader)
+    def wrapper(*args, **kwargs) -> pd.DataFrame:
+        data = loader(*args, **kwargs)
+        data.attrs[VERSION_ATTR] = frame_version(data)
+        return data
+
+    return wrapper
+
+
+def _fingerprint(*parts: Any) -> str:
+    """Digest of the repr of the parts (parameters are plain values, so repr is stable)."""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+@dataclass(frozen=True, eq=False)
+class DatasetHandle:
+    """
+    Loaded frame plus a fingerprint identifying it.
+
+    Attributes:
+        data: The frame. Treat it as read-only, cached results are keyed on the fingerprint.
+        fingerprint: Digest of (source, parameters, data version).
+    """
+    data: pd.DataFrame = field(repr=False)
+    fingerprint: str
+
+    @classmethod
+    def create(cls, data: pd.DataFrame, source: str, **params: Any) -> "DatasetHandle":
+        """
+        Wrap a freshly loaded frame.
+
+        The data version stored by versioned is used when present, otherwise
+        the frame is hashed.
+
+        Args:
+            data: Frame as returned by a loader. Use derive for frames computed from it.
+            source: Name of the loader or data source.
+            **params: Query parameters the frame was loaded with.
+
+        Returns:
+            Handle whose fingerprint covers the source, parameters and frame contents.
+        """
+        version = data.attrs.get(VERSION_ATTR) or frame_version(data)
+        return cls(data, _fingerprint(source, sorted(params.items()), version))
+
+    def derive(self, data: pd.DataFrame, **params: Any) -> "DatasetHandle":
+        """
+        Wrap a frame computed deterministically from this one (a filter, column selection, ...).
+
+        Args:
+            data: Derived frame.
+            **params: Parameters of the derivation.
+
+        Returns:
+            Handle whose fingerprint covers this fingerprint and the parameters, without hashing the data.
+        """
+        return DatasetHandle(data, _fingerprint(self.fingerprint, sorted(params.items())))
+
+
+HASH_FUNCS = {DatasetHandle: lambda handle: handle.fingerprint}  # pass to st.cache_data(hash_funcs=...)
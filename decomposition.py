@@ -0,0 +1,179 @@
+"""
+STL decomposition service.
+
+Decompositions are cached per (dataset, series, period, smoothers, robust) in a
+process-wide store, independently of how they are plotted, so switching back to
+a series or parameter set that was seen before is a lookup. All (price area,
+group) series of a dataset can be decomposed up front in worker processes, and
+a downsampled, non-robust preview gives a quick approximation to draw while the
+full-resolution fit is computed.
+"""
+import math
+import os
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from statsmodels.tsa.seasonal import STL
+
+from datasets import DatasetHandle
+from utilities import process_pool
+
+COMPONENTS = ["observed", "trend", "seasonal", "resid"]
+STL_CACHE_SIZE = 64  # about 25 series for two parameter sets
+PREVIEW_POINTS = 2000  # target length of the preview series
+PREVIEW_MIN_CYCLE = 6  # keep at least this many points per seasonal cycle in the preview
+
+StlParams = tuple[int, int, int, bool]  # (period, seasonal smoother, trend smoother, robust)
+
+
+@st.cache_resource
+def _stl_store() -> OrderedDict:
+    """Decompositions shared across reruns and sessions, keyed by (fingerprint, area, group, params)."""
+    return OrderedDict()
+
+
+def _odd(value: float, minimum: int = 3) -> int:
+    """Smallest odd integer >= max(value, minimum)."""
+    value = max(int(math.ceil(value)), minimum)
+    return value if value % 2 else value + 1
+
+
+def stl_params(period: int, seasonal: int, trend: int, robust: bool) -> StlParams:
+    """
+    Normalize STL parameters, so equivalent settings share one cache entry.
+
+    Args:
+        period: Seasonal period in samples.
+        seasonal: Length of the seasonal smoother (odd).
+        trend: Length of the trend smoother (odd), raised to exceed the period if needed.
+        robust: Whether to use robust STL.
+
+    Returns:
+        Tuple of (period, seasonal, trend, robust).
+    """
+    if period > trend:
+        trend = period + 1 if period % 2 == 0 else period
+    return int(period), _odd(seasonal), _odd(trend), bool(robust)
+
+
+def select_series(data: pd.DataFrame, feat_name: str, price_area: str, group: str) -> pd.Series:
+    """Quantity of one (price area, group) series, in time order."""
+    mask = (data["pricearea"] == price_area) & (data[feat_name] == group)
+    return data.loc[mask, "quantitykwh"].sort_index()
+
+
+def stl_components(series: pd.Series, params: StlParams) -> pd.DataFrame:
+    """
+    Run STL on one series.
+
+    Args:
+        series: Evenly spaced series without missing values.
+        params: Parameters from stl_params.
+
+    Returns:
+        DataFrame with observed, trend, seasonal and resid columns on the series index.
+    """
+    period, seasonal, trend, robust = params
+    res = STL(series.to_numpy(dtype=np.float64), period=period, seasonal=seasonal, trend=trend, robust=robust).fit()
+    return pd.DataFrame({"observed": res.observed, "trend": res.trend,
+                         "seasonal": res.seasonal, "resid": res.resid}, index=series.index)
+
+
+def preview_components(series: pd.Series, params: StlParams, max_points: int = PREVIEW_POINTS) -> pd.DataFrame:
+    """
+    Approximate STL on a block-averaged copy of the series.
+
+    The series is averaged over blocks of k samples (k chosen so about
+    max_points remain, but never fewer than PREVIEW_MIN_CYCLE points per
+    period). The period and the trend smoother are scaled by 1/k; the seasonal
+    smoother counts cycles and is kept. The fit is not robust.
+
+    Args:
+        series: Evenly spaced series without missing values.
+        params: Parameters from stl_params.
+        max_points: Target number of points.
+
+    Returns:
+        DataFrame like stl_components, on the index of the first sample of every block.
+    """
+    period, seasonal, trend, _ = params
+    k = max(1, min(len(series) // max_points, period // PREVIEW_MIN_CYCLE))
+    if k == 1:
+        return stl_components(series, (period, seasonal, trend, False))
+    n = len(series) // k * k
+    values = series.to_numpy(dtype=np.float64)[:n].reshape(-1, k).mean(axis=1)
+    coarse = pd.Series(values, index=series.index[:n:k])
+    return stl_components(coarse, stl_params(max(2, round(period / k)), seasonal, _odd(trend / k), False))
+
+
+def cached_decomposition(dataset: DatasetHandle, feat_name: str, price_area: str, group: str,
+                         params: StlParams) -> Optional[pd.DataFrame]:
+    """Return the stored decomposition of a series, or None if it has not been computed."""
+    store = _stl_store()
+    key = (dataset.fingerprint, feat_name, price_area, group, params)
+    if key in store:
+        store.move_to_end(key)
+    return store.get(key)
+
+
+def _store(key: tuple, components: pd.DataFrame) -> None:
+    """Insert a decomposition and evict the least recently used ones."""
+    store = _stl_store()
+    store[key] = components
+    store.move_to_end(key)
+    while len(store) > STL_CACHE_SIZE:
+        store.popitem(last=False)
+
+
+def decompose(dataset: DatasetHandle, feat_name: str, price_area: str, group: str,
+              params: StlParams) -> pd.DataFrame:
+    """
+    Full-resolution STL of one series, from the store when available.
+
+    Args:
+        dataset: Handle of the Elhub data.
+        feat_name: Name of the group field.
+        price_area: Price area of the series.
+        group: Group of the series.
+        params: Parameters from stl_params.
+
+    Returns:
+        DataFrame with observed, trend, seasonal and resid columns (empty if the series has no data).
+    """
+    components = cached_decomposition(dataset, feat_name, price_area, group, params)
+    if components is None:
+        series = select_series(dataset.data, feat_name, price_area, group)
+        components = stl_components(series, params) if len(series) > 2 * params[0] else pd.DataFrame(columns=COMPONENTS)
+        _store((dataset.fingerprint, feat_name, price_area, group, params), components)
+    return components
+
+
+def precompute(dataset: DatasetHandle, feat_name: str, params: StlParams,
+               max_workers: Optional[int] = None) -> int:
+    """
+    Decompose every (price area, group) series of a dataset that is not stored yet.
+
+    Args:
+        dataset: Handle of the Elhub data.
+        feat_name: Name of the group field.
+        params: Parameters from stl_params.
+        max_workers: Number of worker processes. Defaults to the number of cores.
+
+    Returns:
+        Number of series that were decomposed.
+    """
+    data = dataset.data
+    pairs = data[["pricearea", feat_name]].drop_duplicates().itertuples(index=False, name=None)
+    missing = {(area, group): select_series(data, feat_name, area, group) for area, group in pairs
+               if cached_decomposition(dataset, feat_name, area, group, params) is None}
+    missing = {pair: series for pair, series in missing.items() if len(series) > 2 * params[0]}
+    if not missing:
+        return 0
+    with process_pool(min(max_workers or os.cpu_count() or 1, len(missing))) as executor:
+        futures = {pair: executor.submit(stl_components, series, params) for pair, series in missing.items()}
+        for (area, group), future in futures.items():
+            _store((dataset.fingerprint, feat_name, area, group, params), future.result())
+    return len(futures)
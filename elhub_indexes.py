@@ -0,0 +1,176 @@
+"""
+Index management for the Elhub collections.
+
+Ensures the compound indexes used by the query shapes of the pages and checks
+with explain() that none of those shapes fall back to a collection scan.
+
+Usage:
+    python elhub_indexes.py ensure --uri mongodb://...
+    python elhub_indexes.py check --uri mongodb://...
+"""
+import argparse
+import datetime
+import os
+from typing import Iterator
+
+from pymongo import ASCENDING
+
+from elhub_loader import collection_for, elhub_columns
+from utilities import elhub_pipeline
+
+
+def index_specs(feat_name: str) -> dict[str, list[tuple[str, int]]]:
+    """
+    Return the indexes every Elhub collection should have.
+
+    The starttime-first index serves the date range queries (optionally with a
+    group $in) and starttime sorts. The pricearea-first index follows the
+    equality-sort-range rule for queries on a single price area.
+
+    Args:
+        feat_name: Name of the group field ('productiongroup' or 'consumptiongroup').
+
+    Returns:
+        Mapping of index name to index keys.
+    """
+    return {
+        f"starttime_pricearea_{feat_name}": [("starttime", ASCENDING), ("pricearea", ASCENDING), (feat_name, ASCENDING)],
+        f"pricearea_{feat_name}_starttime": [("pricearea", ASCENDING), (feat_name, ASCENDING), ("starttime", ASCENDING)],
+    }
+
+
+def ensure_indexes(collection, feat_name: str) -> list[str]:
+    """
+    Create the missing indexes on a collection.
+
+    Args:
+        collection: pymongo collection (prod_data or cons_data).
+        feat_name: Name of the group field.
+
+    Returns:
+        Names of the indexes that were created.
+    """
+    existing = {tuple(info["key"]) for info in collection.index_information().values()}
+    created = []
+    for name, keys in index_specs(feat_name).items():
+        if tuple(keys) in existing:
+            continue
+        collection.create_index(keys, name=name)
+        created.append(name)
+    return created
+
+
+def query_shapes(feat_name: str, groups: list[str], price_area: str,
+                 dates: tuple[datetime.datetime, datetime.datetime]) -> dict[str, list[dict]]:
+    """
+    Return the aggregation pipelines the pages run, with representative parameters.
+
+    Args:
+        feat_name: Name of the group field.
+        groups: Groups used for the group filter.
+        price_area: Price area used for the area filter.
+        dates: Date range used for all shapes.
+
+    Returns:
+        Mapping of shape name to pipeline.
+    """
+    return {
+        "date range": elhub_pipeline(dates, feat_name=feat_name),
+        "date range, columnar": elhub_pipeline(dates, feat_name=feat_name, fields=list(elhub_columns(feat_name))),
+        "date range + groups": elhub_pipeline(dates, feat_name=feat_name, groups=groups),
+        "date range + groups, summed": elhub_pipeline(dates, feat_name=feat_name, groups=groups, aggregate_group=True),
+        "date range + price area": elhub_pipeline(dates, feat_name=feat_name, price_area=price_area),
+        "date range + groups + price area": elhub_pipeline(dates, feat_name=feat_name, groups=groups, price_area=price_area),
+    }
+
+
+def plan_stages(explain: dict) -> list[str]:
+    """
+    Collect the stage names of the winning plan(s) in an explain() result.
+
+    Works for find and aggregate explains, classic and slot-based plans, and
+    sharded outputs, by walking every winningPlan in the document.
+
+    Args:
+        explain: Output of the explain command.
+
+    Returns:
+        Stage names, outermost first.
+    """
+    def walk(node, in_plan: bool) -> Iterator[str]:
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == "rejectedPlans":
+                    continue
+                if key == "stage" and in_plan and isinstance(value, str):
+                    yield value
+                else:
+                    yield from walk(value, in_plan or key == "winningPlan")
+        elif isinstance(node, list):
+            for value in node:
+                yield from walk(value, in_plan)
+
+    return list(walk(explain, False))
+
+
+def explain_pipeline(collection, pipeline: list[dict]) -> dict:
+    """Run explain (queryPlanner verbosity) for an aggregation pipeline."""
+    return collection.database.command("explain",
+                                       {"aggregate": collection.name, "pipeline": pipeline, "cursor": {}},
+                                       verbosity="queryPlanner")
+
+
+def check_query_plans(
+    collection,
+    feat_name: str,
+    groups: list[str],
+    price_area: str = "NO1",
+    dates: tuple[datetime.datetime, datetime.datetime] = (datetime.datetime(2024, 1, 1), datetime.datetime(2024, 12, 31)),
+) -> list[dict]:
+    """
+    Explain every query shape of the pages and flag collection scans.
+
+    Args:
+        collection: pymongo collection (prod_data or cons_data).
+        feat_name: Name of the group field.
+        groups: Groups used for the group filter.
+        price_area: Price area used for the area filter.
+        dates: Date range used for all shapes.
+
+    Returns:
+        One dictionary per shape with the shape name, plan stages and a collscan flag.
+    """
+    report = []
+    for shape, pipeline in query_shapes(feat_name, groups, price_area, dates).items():
+        stages = plan_stages(explain_pipeline(collection, pipeline))
+        report.append({"shape": shape, "stages": stages, "collscan": "COLLSCAN" in stages})
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage and check the indexes of the Elhub collections.")
+    parser.add_argument("command", choices=["ensure", "check"])
+    parser.add_argument("--dataset", nargs="+", default=["production", "consumption"],
+                        choices=["production", "consumption"])
+    parser.add_argument("--uri", default=os.environ.get("MONGO_URI"), help="MongoDB URI (default: $MONGO_URI).")
+    args = parser.parse_args()
+
+    import pymongo
+    client = pymongo.MongoClient(args.uri)
+    failed = False
+    for dataset in args.dataset:
+        collection, feat_name = collection_for(client, dataset)
+        if args.command == "ensure":
+            created = ensure_indexes(collection, feat_name)
+            print(f"{dataset}: created {', '.join(created) if created else 'no indexes'}")
+            continue
+        groups = collection.distinct(feat_name)[:2]
+        for row in check_query_plans(collection, feat_name, groups):
+            failed |= row["collscan"]
+            flag = "COLLSCAN" if row["collscan"] else "ok"
+            print(f"{dataset:12} {row['shape']:34} {flag:9} {' <- '.join(row['stages'])}")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
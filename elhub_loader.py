@@ -0,0 +1,220 @@
+"""
+Columnar bulk loader for the Elhub collections.
+
+Instead of materializing the whole cursor as a list of dicts and letting pandas
+infer dtypes, documents are pulled from the cursor in batches and written
+straight into typed column buffers (int64 timestamps, dictionary encoded
+categories and float64 quantities). Only one batch of decoded documents is
+alive at any time, so peak memory stays close to the size of the final frame.
+
+apply_schema enforces the same layout on frames from any source, so every
+loader returns identical dtypes with unused fields (endtime, lastupdatedtime, ...) dropped.
+"""
+import datetime
+import itertools
+from typing import Iterable, Literal, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+ColumnKind = Literal["timestamp", "category", "float64"]
+
+
+def elhub_columns(feat_name: str, aggregate_group: bool = False) -> dict[str, ColumnKind]:
+    """
+    Return the column layout (schema) used for an Elhub query.
+
+    Args:
+        feat_name: Name of the group field ('productiongroup' or 'consumptiongroup').
+        aggregate_group: Whether the query sums quantitykwh per starttime.
+
+    Returns:
+        Mapping of field name to column kind.
+    """
+    if aggregate_group:
+        return {"starttime": "timestamp", "quantitykwh": "float64"}
+    return {"starttime": "timestamp",
+            "pricearea": "category",
+            feat_name: "category",
+            "quantitykwh": "float64"}
+
+
+class _ColumnBuffer:
+    """Typed, append-only buffer for a single column."""
+
+    def __init__(self, kind: ColumnKind):
+        self.kind = kind
+        self.chunks: list[np.ndarray] = []
+        self.categories: dict[str, int] = {}
+
+    def extend(self, values: list) -> None:
+        """Convert one batch of values to a typed array and store it."""
+        if self.kind == "timestamp":
+            chunk = np.array(values, dtype="datetime64[ns]").view(np.int64)
+        elif self.kind == "category":
+            lookup = self.categories
+            # missing values get code -1, which pandas and Arrow read as null
+            chunk = np.fromiter((-1 if v is None else lookup.setdefault(v, len(lookup)) for v in values),
+                                dtype=np.int32, count=len(values))
+        else:
+            chunk = np.fromiter((np.nan if v is None else v for v in values),
+                                dtype=np.float64, count=len(values))
+        self.chunks.append(chunk)
+
+    def values(self) -> np.ndarray:
+        """Concatenate the stored batches into one array."""
+        dtype = np.float64 if self.kind == "float64" else (np.int32 if self.kind == "category" else np.int64)
+        out = np.concatenate(self.chunks) if self.chunks else np.empty(0, dtype=dtype)
+        self.chunks = [out]
+        return out
+
+    def to_pandas(self) -> Union[np.ndarray, pd.Categorical]:
+        """Return the column as a pandas-ready array."""
+        values = self.values()
+        if self.kind == "timestamp":
+            return values.view("datetime64[ns]")
+        if self.kind == "category":
+            return pd.Categorical.from_codes(values, categories=list(self.categories))
+        return values
+
+    def to_arrow(self) -> pa.Array:
+        """Return the column as an Arrow array."""
+        values = self.values()
+        if self.kind == "timestamp":
+            return pa.array(values.view("datetime64[ns]"))
+        if self.kind == "category":
+            return pa.DictionaryArray.from_arrays(pa.array(values, mask=values < 0), pa.array(list(self.categories)))
+        return pa.array(values)
+
+
+def load_columnar(
+    cursor: Iterable[dict],
+    columns: dict[str, ColumnKind],
+    batch_size: int = 50_000,
+    set_time_index: bool = True,
+    as_arrow: bool = False,
+) -> Union[pd.DataFrame, pa.Table]:
+    """
+    Stream a MongoDB cursor into typed columns.
+
+    Args:
+        cursor: Cursor (or any iterable) yielding documents.
+        columns: Mapping of field name to column kind, see elhub_columns.
+        batch_size: Number of documents converted per batch.
+        set_time_index: Whether to set starttime as the DataFrame index.
+        as_arrow: Return a pyarrow Table instead of a DataFrame.
+
+    Returns:
+        DataFrame (or Arrow table) with one column per requested field.
+    """
+    buffers = {name: _ColumnBuffer(kind) for name, kind in columns.items()}
+    iterator = iter(cursor)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            break
+        for name, buffer in buffers.items():
+            buffer.extend([doc.get(name) for doc in batch])
+        del batch
+
+    if as_arrow:
+        return pa.table({name: buffer.to_arrow() for name, buffer in buffers.items()})
+
+    data = pd.DataFrame({name: buffer.to_pandas() for name, buffer in buffers.items()})
+    if set_time_index and "starttime" in data:
+        data.set_index("starttime", inplace=True)
+        data.sort_index(inplace=True)
+    return data
+
+
+def time_windows(
+    dates: tuple[datetime.datetime, datetime.datetime],
+    freq: str = "MS",
+) -> list[tuple[datetime.datetime, datetime.datetime]]:
+    """
+    Split a date range into consecutive windows, e.g. calendar months.
+
+    Windows are closed on both ends like the date filters of the queries, so
+    every window ends one millisecond (the MongoDB date resolution) before the
+    next one starts.
+
+    Args:
+        dates: Tuple of (start, end), both inclusive.
+        freq: pandas frequency of the window starts ('MS' for months, 'W-MON' for weeks...).
+
+    Returns:
+        List of (start, end) tuples covering the range.
+    """
+    start, end = pd.Timestamp(dates[0]), pd.Timestamp(dates[1])
+    starts = [start] + [t for t in pd.date_range(start, end, freq=freq) if t > start]
+    ends = [t - pd.Timedelta(milliseconds=1) for t in starts[1:]] + [end]
+    return [(s.to_pydatetime(), e.to_pydatetime()) for s, e in zip(starts, ends)]
+
+
+def apply_schema(
+    data: pd.DataFrame,
+    columns: dict[str, ColumnKind],
+    set_time_index: bool = True,
+    tz: str = "UTC",
+) -> pd.DataFrame:
+    """
+    Enforce the declared column layout on an Elhub frame.
+
+    Fields that are not declared are dropped, category columns become
+    categoricals, quantities float64 and starttime a tz-aware timestamp (naive
+    values are taken to be in tz, Elhub stores UTC). This is what every
+    loader returns, whichever path produced the frame.
+
+    Args:
+        data: Frame with starttime as a column or as the index.
+        columns: Mapping of field name to column kind, see elhub_columns.
+        set_time_index: Whether to set starttime as the sorted DataFrame index.
+        tz: Time zone of naive starttimes.
+
+    Returns:
+        DataFrame with exactly the declared columns.
+    """
+    if "starttime" not in data.columns and data.index.name == "starttime":
+        data = data.reset_index()
+    out = {}
+    for name, kind in columns.items():
+        values = data[name] if name in data.columns else pd.Series([], dtype=object)
+        if kind == "timestamp":
+            values = pd.to_datetime(values)
+            values = values.dt.tz_localize(tz) if values.dt.tz is None else values.dt.tz_convert(tz)
+        elif kind == "category":
+            values = values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype("category")
+        else:
+            values = values.astype(np.float64)
+        out[name] = values.to_numpy() if kind != "category" else values.array
+    data = pd.DataFrame(out)
+    if set_time_index:
+        data.set_index("starttime", inplace=True)
+        data.sort_index(inplace=True)
+    return data
+
+
+def group_field(dataset: str) -> str:
+    """Return the name of the group field for a dataset."""
+    if dataset == "production":
+        return "productiongroup"
+    if dataset == "consumption":
+        return "consumptiongroup"
+    raise ValueError("dataset must be either 'production' or 'consumption'")
+
+
+def collection_for(client, dataset: str) -> tuple:
+    """
+    Look up the collection and group field for a dataset.
+
+    Args:
+        client: MongoDB client connection.
+        dataset: 'production' or 'consumption'.
+
+    Returns:
+        Tuple of (collection, group field name).
+    """
+    feat_name = group_field(dataset)
+    collection = client.elhub.prod_data if dataset == "production" else client.elhub.cons_data
+    return collection, feat_name
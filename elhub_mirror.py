@@ -0,0 +1,321 @@
+"""
+Local Parquet mirror of the Elhub MongoDB collections.
+
+The mirror stores prod_data and cons_data as a hive-partitioned Parquet dataset
+(year/month/pricearea) and keeps a watermark with the newest synced starttime.
+A sync drops the rows at or after the watermark and fetches those documents
+again together with everything newer, and reads use partition pruning and
+predicate pushdown on the date range, group and price area.
+The CLI also brings the local rollups (see elhub_rollups) up to date after a sync.
+
+Usage:
+    python elhub_mirror.py sync --dataset production consumption --uri mongodb://...
+"""
+import argparse
+import datetime
+import itertools
+import json
+import glob
+import os
+import shutil
+import uuid
+from typing import Iterator, Literal, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from elhub_loader import collection_for, elhub_columns, group_field, load_columnar, time_windows
+
+MIRROR_DIR = os.environ.get("ELHUB_MIRROR_DIR", "data/mirror")
+PARTITIONING = ds.partitioning(
+    pa.schema([("year", pa.int16()), ("month", pa.int8()), ("pricearea", pa.string())]),
+    flavor="hive",
+)
+
+
+def dataset_path(dataset: str, root: str = MIRROR_DIR) -> str:
+    """Return the directory holding the mirror of a dataset."""
+    return os.path.join(root, dataset)
+
+
+def read_watermark(dataset: str, root: str = MIRROR_DIR) -> Optional[datetime.datetime]:
+    """
+    Read the newest starttime stored in the mirror.
+
+    Args:
+        dataset: 'production' or 'consumption'.
+        root: Root directory of the mirror.
+
+    Returns:
+        The watermark, or None if the dataset has never been synced.
+    """
+    try:
+        with open(os.path.join(dataset_path(dataset, root), "_watermark.json")) as f:
+            return datetime.datetime.fromisoformat(json.load(f)["starttime"])
+    except FileNotFoundError:
+        return None
+
+
+def write_watermark(dataset: str, starttime: datetime.datetime, root: str = MIRROR_DIR) -> None:
+    """Persist the newest synced starttime for a dataset."""
+    path = os.path.join(dataset_path(dataset, root), "_watermark.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"starttime": starttime.isoformat()}, f)
+    os.replace(tmp, path)
+
+
+def read_first_starttime(dataset: str, root: str = MIRROR_DIR) -> Optional[datetime.datetime]:
+    """
+    Return the oldest starttime stored in the mirror.
+
+    Args:
+        dataset: 'production' or 'consumption'.
+        root: Root directory of the mirror.
+
+    Returns:
+        The oldest starttime, or None if the mirror is empty.
+    """
+    if not mirror_available(dataset, root):
+        return None
+    parquet = ds.dataset(dataset_path(dataset, root), format="parquet", partitioning=PARTITIONING)
+    first_year = pc.min(parquet.to_table(columns=["year"])["year"]).as_py()
+    if first_year is None:
+        return None
+    first = pc.min(parquet.to_table(columns=["starttime"], filter=ds.field("year") == first_year)["starttime"])
+    return first.as_py()
+
+
+def mirror_available(dataset: str, root: str = MIRROR_DIR) -> bool:
+    """Whether the dataset has been synced at least once."""
+    return read_watermark(dataset, root) is not None
+
+
+def mirror_covers(client, dataset: str, end: datetime.datetime, root: str = MIRROR_DIR) -> bool:
+    """
+    Whether the mirror holds every document up to a starttime.
+
+    True if the watermark is at or after end, or if MongoDB has no documents
+    between the watermark and end (the collection itself ends earlier). The
+    second check is a single indexed lookup.
+
+    Args:
+        client: MongoDB client connection (pymongo or mongomock).
+        dataset: 'production' or 'consumption'.
+        end: Last starttime that is needed.
+        root: Root directory of the mirror.
+
+    Returns:
+        Whether reading up to end from the mirror gives the same rows as MongoDB.
+    """
+    watermark = read_watermark(dataset, root)
+    if watermark is None:
+        return False
+    if watermark >= end:
+        return True
+    collection, _ = collection_for(client, dataset)
+    return collection.find_one({"starttime": {"$gt": watermark, "$lte": end}}, {"_id": 0, "starttime": 1}) is None
+
+
+def clear(dataset: str, root: str = MIRROR_DIR) -> None:
+    """Remove all partitions of a dataset from the mirror (the watermark is left alone)."""
+    for partition in glob.glob(os.path.join(dataset_path(dataset, root), "year=*")):
+        shutil.rmtree(partition)
+
+
+def truncate(dataset: str, starttime: datetime.datetime, root: str = MIRROR_DIR) -> int:
+    """
+    Drop the rows at or after a starttime from the mirror.
+
+    Only the files of the months from starttime on are read, and only files
+    that contain such rows are rewritten (or removed when nothing is left).
+
+    Args:
+        dataset: 'production' or 'consumption'.
+        starttime: First starttime to drop.
+        root: Root directory of the mirror.
+
+    Returns:
+        Number of rows dropped.
+    """
+    parquet = ds.dataset(dataset_path(dataset, root), format="parquet", partitioning=PARTITIONING)
+    months = (ds.field("year") > starttime.year) | ((ds.field("year") == starttime.year)
+                                                    & (ds.field("month") >= starttime.month))
+    cutoff = pa.scalar(starttime, pa.timestamp("ns"))
+    dropped = 0
+    for fragment in parquet.get_fragments(filter=months):
+        table = pq.ParquetFile(fragment.path).read()  # file columns only, no partition fields
+        keep = pc.less(table["starttime"], cutoff.cast(table.schema.field("starttime").type))
+        n_keep = pc.sum(keep).as_py() or 0
+        if n_keep == table.num_rows:
+            continue
+        dropped += table.num_rows - n_keep
+        if n_keep:
+            tmp = f"{fragment.path}.tmp"
+            pq.write_table(table.filter(keep), tmp)
+            os.replace(tmp, fragment.path)
+        else:
+            os.remove(fragment.path)
+    return dropped
+
+
+def sync(
+    client,
+    dataset: Literal["production", "consumption"] = "production",
+    root: str = MIRROR_DIR,
+    batch_size: int = 500_000,
+) -> int:
+    """
+    Bring the local mirror up to date with the documents from the watermark on.
+
+    Documents are read in starttime order and written in batches, and the
+    watermark is advanced after every written batch. A batch may end inside an
+    hour, so the rows of the watermark hour (and any rows written after it by
+    an interrupted sync) are dropped first and read again with the rest. This
+    also picks up late documents for the watermark hour; late documents for
+    older hours need a fresh mirror. Without a watermark (first sync, or a
+    crash before the first watermark was written) any partitions on disk are
+    removed and everything is read.
+
+    Args:
+        client: MongoDB client connection (pymongo or mongomock).
+        dataset: 'production' or 'consumption'.
+        root: Root directory of the mirror.
+        batch_size: Number of documents per written batch.
+
+    Returns:
+        Number of documents written, including the re-read watermark hour.
+    """
+    collection, feat_name = collection_for(client, dataset)
+    columns = elhub_columns(feat_name)
+    path = dataset_path(dataset, root)
+    os.makedirs(path, exist_ok=True)
+
+    watermark = read_watermark(dataset, root)
+    if watermark:
+        truncate(dataset, watermark, root)
+    else:
+        clear(dataset, root)
+    query = {"starttime": {"$gte": watermark}} if watermark else {}
+    cursor = collection.find(query, {"_id": 0, **{name: 1 for name in columns}}).sort("starttime", 1)
+
+    token = uuid.uuid4().hex[:12]
+    written = 0
+    while True:
+        table = load_columnar(itertools.islice(cursor, batch_size), columns, as_arrow=True)
+        if table.num_rows == 0:
+            break
+        table = table.append_column("year", pc.year(table["starttime"]).cast(pa.int16()))
+        table = table.append_column("month", pc.month(table["starttime"]).cast(pa.int8()))
+        table = table.set_column(table.schema.get_field_index("pricearea"), "pricearea",
+                                 table["pricearea"].cast(pa.string()))
+        ds.write_dataset(table, path,
+                         format="parquet",
+                         partitioning=PARTITIONING,
+                         basename_template=f"part-{token}-{written}-{{i}}.parquet",
+                         existing_data_behavior="overwrite_or_ignore")
+        written += table.num_rows
+        write_watermark(dataset, pc.max(table["starttime"]).as_py(), root)
+    return written
+
+
+def read_mirror(
+    dataset: Literal["production", "consumption"] = "production",
+    dates: tuple[datetime.datetime, datetime.datetime] = (datetime.datetime(2024, 1, 1), datetime.datetime(2024, 12, 31)),
+    groups: Optional[list[str]] = None,
+    price_area: Optional[str] = None,
+    aggregate_group: bool = False,
+    set_time_index: bool = True,
+    root: str = MIRROR_DIR,
+) -> pd.DataFrame:
+    """
+    Read Elhub data from the local mirror.
+
+    Args:
+        dataset: 'production' or 'consumption'.
+        dates: Tuple of (start_date, end_date) for filtering.
+        groups: Group values to keep. No group filter is applied if None.
+        price_area: Price area to keep. All areas are returned if None.
+        aggregate_group: Whether to sum quantitykwh per starttime.
+        set_time_index: Whether to set starttime as the DataFrame index.
+        root: Root directory of the mirror.
+
+    Returns:
+        DataFrame with the same columns as the columnar loader.
+    """
+    feat_name = group_field(dataset)
+    columns = list(elhub_columns(feat_name))
+    parquet = ds.dataset(dataset_path(dataset, root), format="parquet", partitioning=PARTITIONING)
+
+    start, end = (pd.Timestamp(d) for d in dates)
+    expr = ((ds.field("year") >= start.year) & (ds.field("year") <= end.year)
+            & (ds.field("starttime") >= pa.scalar(start.to_pydatetime(), pa.timestamp("ns")))
+            & (ds.field("starttime") <= pa.scalar(end.to_pydatetime(), pa.timestamp("ns"))))
+    if groups is not None:
+        expr &= ds.field(feat_name).isin([groups] if isinstance(groups, str) else list(groups))
+    if price_area:
+        expr &= ds.field("pricearea") == price_area
+
+    data = parquet.to_table(columns=columns, filter=expr).to_pandas()
+    data["pricearea"] = data["pricearea"].astype("category")
+    if aggregate_group:
+        data = data.groupby("starttime")[["quantitykwh"]].sum().sort_index()
+        return data if set_time_index else data.reset_index()
+    if set_time_index:
+        data.set_index("starttime", inplace=True)
+        data.sort_index(inplace=True)
+    return data
+
+
+def iter_mirror(
+    dataset: Literal["production", "consumption"] = "production",
+    dates: tuple[datetime.datetime, datetime.datetime] = (datetime.datetime(2024, 1, 1), datetime.datetime(2024, 12, 31)),
+    groups: Optional[list[str]] = None,
+    price_area: Optional[str] = None,
+    freq: str = "MS",
+    set_time_index: bool = True,
+    root: str = MIRROR_DIR,
+) -> Iterator[pd.DataFrame]:
+    """
+    Read Elhub data from the local mirror one time window (by default one month) at a time.
+
+    Args:
+        dataset: 'production' or 'consumption'.
+        dates: Tuple of (start_date, end_date) for filtering.
+        groups: Group values to keep. No group filter is applied if None.
+        price_area: Price area to keep. All areas are returned if None.
+        freq: pandas frequency of the window starts, see time_windows.
+        set_time_index: Whether to set starttime as the DataFrame index.
+        root: Root directory of the mirror.
+
+    Returns:
+        Iterator over time-ordered DataFrames, like read_mirror.
+    """
+    for window in time_windows(dates, freq):
+        data = read_mirror(dataset, window, groups=groups, price_area=price_area, root=root)
+        yield data if set_time_index else data.reset_index()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain the local Parquet mirror of the Elhub collections.")
+    parser.add_argument("command", choices=["sync"])
+    parser.add_argument("--dataset", nargs="+", default=["production", "consumption"],
+                        choices=["production", "consumption"])
+    parser.add_argument("--root", default=MIRROR_DIR, help="Mirror directory (default: %(default)s).")
+    parser.add_argument("--uri", default=os.environ.get("MONGO_URI"), help="MongoDB URI (default: $MONGO_URI).")
+    args = parser.parse_args()
+
+    import pymongo
+    from elhub_rollups import update_local_rollups
+    client = pymongo.MongoClient(args.uri)
+    for dataset in args.dataset:
+        n = sync(client, dataset, root=args.root)
+        print(f"{dataset}: {n} new documents, watermark {read_watermark(dataset, args.root)}")
+        update_local_rollups(dataset, root=args.root)
+
+
+if __name__ == "__main__":
+    main()
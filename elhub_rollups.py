@@ -0,0 +1,381 @@
+"""
+Pre-aggregated rollups of the Elhub collections.
+
+Keeps sum, count and mean of quantitykwh per (period, pricearea, group) at
+daily, weekly and monthly grain, both as MongoDB collections next to the raw
+data and as Parquet files next to the local mirror. Updates are incremental:
+only periods at or after the period holding the previous watermark are
+recomputed, so a partially filled last period is completed by the next update.
+
+Periods are labelled by their start in UTC; weeks start on Monday.
+
+Usage:
+    python elhub_rollups.py update --target mongo local --dataset production consumption --uri mongodb://...
+"""
+import argparse
+import datetime
+import json
+import os
+import uuid
+from typing import Literal, Optional
+
+import pandas as pd
+
+from elhub_loader import collection_for, group_field
+from elhub_mirror import MIRROR_DIR, iter_mirror, read_first_starttime, read_watermark
+
+Grain = Literal["D", "W", "M"]
+GRAINS: dict[str, str] = {"D": "day", "W": "week", "M": "month"}
+ROLLUP_COLUMNS = ["starttime", "pricearea", "group", "sum", "count", "mean"]
+
+
+def period_start(times: pd.Series, grain: Grain) -> pd.Series:
+    """
+    Return the start of the period holding each timestamp.
+
+    Args:
+        times: Series of timestamps.
+        grain: 'D', 'W' or 'M'.
+
+    Returns:
+        Series of period starts.
+    """
+    if grain == "D":
+        return times.dt.floor("D")
+    if grain == "W":
+        days = times.dt.floor("D")
+        return days - pd.to_timedelta(days.dt.weekday, unit="D")
+    if grain == "M":
+        return times.dt.to_period("M").dt.start_time
+    raise ValueError("grain must be one of 'D', 'W' or 'M'")
+
+
+def _cutoff(watermark: Optional[datetime.datetime], grain: Grain) -> Optional[datetime.datetime]:
+    """Start of the first period that has to be recomputed after a watermark."""
+    if watermark is None:
+        return None
+    return period_start(pd.Series([pd.Timestamp(watermark)]), grain).iloc[0].to_pydatetime()
+
+
+class RollupAccumulator:
+    """
+    Sum, count and mean of quantitykwh, updated one chunk of hourly data at a time.
+
+    Only the running totals per key are kept, so memory is bounded by the number
+    of keys, not by the number of hours. Chunks may split a period (e.g. a week
+    across a month boundary); the partial totals are added up.
+
+    Args:
+        feat_name: Name of the group field ('productiongroup' or 'consumptiongroup').
+        grain: Period grain ('D', 'W' or 'M'), or None to aggregate over all hours.
+        by: Keys besides the period, any of 'pricearea' and 'group'.
+
+    Example:
+        Group sums over a streamed range:
+
+            sums = RollupAccumulator(feat_name, grain=None, by=("group",))
+            for chunk in iter_elhub_data(client, dataset, dates):
+                sums.update(chunk)
+            sums.result()
+    """
+
+    def __init__(self, feat_name: str, grain: Optional[Grain] = "D", by: tuple[str, ...] = ("pricearea", "group")):
+        self.feat_name = feat_name
+        self.grain = grain
+        self.by = tuple(by)
+        self.totals: Optional[pd.DataFrame] = None
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """Add one chunk of hourly data with starttime (column or index), pricearea, the group field and quantitykwh."""
+        if "starttime" not in chunk.columns:
+            chunk = chunk.reset_index()
+        if chunk.empty:
+            return
+        keys = []
+        if self.grain is not None:
+            keys.append(period_start(pd.to_datetime(chunk["starttime"]), self.grain).rename("starttime"))
+        for name in self.by:
+            keys.append(chunk[self.feat_name if name == "group" else name].astype(str).rename(name))
+        if not keys:
+            keys = [pd.Series(0, index=chunk.index, name="all")]
+        part = chunk.groupby(keys)["quantitykwh"].agg(["sum", "count"])
+        self.totals = part if self.totals is None else self.totals.add(part, fill_value=0)
+
+    def result(self) -> pd.DataFrame:
+        """
+        Return the totals so far.
+
+        Returns:
+            DataFrame with the period (starttime) and by-keys, followed by sum, count and mean.
+        """
+        keys = (["starttime"] if self.grain is not None else []) + list(self.by)
+        if self.totals is None:
+            return pd.DataFrame(columns=keys + ["sum", "count", "mean"])
+        data = self.totals.reset_index().drop(columns="all", errors="ignore")
+        data["count"] = data["count"].astype("int64")
+        data["mean"] = data["sum"] / data["count"]
+        return data.sort_values(keys, ignore_index=True) if keys else data
+
+
+def rollup_frame(df: pd.DataFrame, feat_name: str, grain: Grain) -> pd.DataFrame:
+    """
+    Aggregate hourly Elhub data to one grain.
+
+    Args:
+        df: Hourly data with starttime (column or index), pricearea, the group field and quantitykwh.
+        feat_name: Name of the group field ('productiongroup' or 'consumptiongroup').
+        grain: 'D', 'W' or 'M'.
+
+    Returns:
+        DataFrame with starttime (period start), pricearea, group, sum, count and mean.
+    """
+    rollup = RollupAccumulator(feat_name, grain)
+    rollup.update(df)
+    return rollup.result()[ROLLUP_COLUMNS]
+
+
+# =========================================
+#          MONGODB ROLLUPS
+# =========================================
+
+def rollup_collection(client, dataset: str, grain: Grain):
+    """Return the MongoDB collection holding a rollup, e.g. elhub.prod_data_rollup_day."""
+    collection, _ = collection_for(client, dataset)
+    return client.elhub[f"{collection.name}_rollup_{GRAINS[grain]}"]
+
+
+def rollup_pipeline(feat_name: str, grain: Grain, into: str,
+                    since: Optional[datetime.datetime] = None) -> list[dict]:
+    """
+    Build the aggregation pipeline that (re)computes a rollup and merges it into a collection.
+
+    Args:
+        feat_name: Name of the group field.
+        grain: 'D', 'W' or 'M'.
+        into: Name of the rollup collection.
+        since: Only aggregate documents from this starttime on. Everything is aggregated if None.
+
+    Returns:
+        Aggregation pipeline.
+    """
+    trunc = {"date": "$starttime", "unit": GRAINS[grain], "timezone": "UTC"}
+    if grain == "W":
+        trunc["startOfWeek"] = "monday"
+    pipeline = [{"$match": {"starttime": {"$gte": since}}}] if since else []
+    pipeline += [
+        {"$group": {"_id": {"starttime": {"$dateTrunc": trunc}, "pricearea": "$pricearea", "group": f"${feat_name}"},
+                    "sum": {"$sum": "$quantitykwh"},
+                    "count": {"$sum": {"$cond": [{"$isNumber": "$quantitykwh"}, 1, 0]}}}},
+        {"$project": {"_id": 0,
+                      "starttime": "$_id.starttime",
+                      "pricearea": "$_id.pricearea",
+                      "group": "$_id.group",
+                      "sum": 1,
+                      "count": 1,
+                      "mean": {"$cond": [{"$gt": ["$count", 0]}, {"$divide": ["$sum", "$count"]}, None]}}},
+        {"$merge": {"into": into,
+                    "on": ["starttime", "pricearea", "group"],
+                    "whenMatched": "replace",
+                    "whenNotMatched": "insert"}},
+    ]
+    return pipeline
+
+
+def update_mongo_rollups(client, dataset: Literal["production", "consumption"] = "production") -> Optional[datetime.datetime]:
+    """
+    Bring the MongoDB rollups of a dataset up to date with the raw collection.
+
+    Args:
+        client: MongoDB client connection.
+        dataset: 'production' or 'consumption'.
+
+    Returns:
+        The new watermark (newest aggregated starttime), or None if the collection is empty.
+    """
+    collection, feat_name = collection_for(client, dataset)
+    meta = client.elhub.rollup_meta
+    newest = collection.find_one({}, {"_id": 0, "starttime": 1}, sort=[("starttime", -1)])
+    if newest is None:
+        return None
+    state = meta.find_one({"_id": collection.name}) or {}
+    watermark = state.get("starttime")
+    if watermark is not None and watermark > newest["starttime"]:  # equal still recomputes, late documents at the watermark hour
+        return watermark
+
+    for grain in GRAINS:
+        target = rollup_collection(client, dataset, grain)
+        target.create_index([("starttime", 1), ("pricearea", 1), ("group", 1)], unique=True)
+        collection.aggregate(rollup_pipeline(feat_name, grain, target.name, since=_cutoff(watermark, grain)),
+                             allowDiskUse=True)
+    meta.replace_one({"_id": collection.name}, {"_id": collection.name, "starttime": newest["starttime"]}, upsert=True)
+    return newest["starttime"]
+
+
+def read_mongo_rollup(
+    client,
+    dataset: str,
+    grain: Grain,
+    dates: tuple[datetime.datetime, datetime.datetime],
+    groups: Optional[list[str]] = None,
+    price_area: Optional[str] = None,
+) -> Optional[pd.DataFrame]:
+    """Read a rollup from MongoDB, or None if it has not been built."""
+    if client.elhub.rollup_meta.find_one({"_id": collection_for(client, dataset)[0].name}) is None:
+        return None
+    query = {"starttime": {"$gte": _cutoff(dates[0], grain), "$lte": dates[1]}}
+    if groups is not None:
+        query["group"] = {"$in": [groups] if isinstance(groups, str) else list(groups)}
+    if price_area:
+        query["pricearea"] = price_area
+    docs = rollup_collection(client, dataset, grain).find(query, {"_id": 0})
+    return pd.DataFrame(list(docs), columns=ROLLUP_COLUMNS).sort_values(["starttime", "pricearea", "group"], ignore_index=True)
+
+
+# =========================================
+#          LOCAL ROLLUPS
+# =========================================
+
+def rollup_path(dataset: str, grain: Grain, root: str = MIRROR_DIR) -> str:
+    """Return the Parquet file holding a local rollup."""
+    return os.path.join(root, "rollups", dataset, f"{GRAINS[grain]}.parquet")
+
+
+def _read_local_watermark(dataset: str, root: str = MIRROR_DIR) -> Optional[datetime.datetime]:
+    try:
+        with open(os.path.join(root, "rollups", dataset, "_watermark.json")) as f:
+            return datetime.datetime.fromisoformat(json.load(f)["starttime"])
+    except FileNotFoundError:
+        return None
+
+
+def _write_local(path: str, data: pd.DataFrame) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    data.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def update_local_rollups(dataset: Literal["production", "consumption"] = "production",
+                         root: str = MIRROR_DIR) -> Optional[datetime.datetime]:
+    """
+    Bring the local rollups of a dataset up to date with the local mirror.
+
+    Args:
+        dataset: 'production' or 'consumption'.
+        root: Root directory of the mirror.
+
+    Returns:
+        The new watermark, or None if the mirror has not been synced.
+    """
+    newest = read_watermark(dataset, root)
+    if newest is None:
+        return None
+    watermark = _read_local_watermark(dataset, root)
+    if watermark is not None and watermark > newest:  # equal still recomputes, the watermark hour is re-synced
+        return watermark
+
+    feat_name = group_field(dataset)
+    cutoffs = {grain: _cutoff(watermark, grain) for grain in GRAINS}
+    since = min(cutoffs.values()) if watermark is not None else datetime.datetime(1970, 1, 1)
+    since = max(since, read_first_starttime(dataset, root) or since)
+    rollups = {grain: RollupAccumulator(feat_name, grain) for grain in GRAINS}
+    for chunk in iter_mirror(dataset, (since, newest), set_time_index=False, root=root):  # one month at a time
+        for grain, rollup in rollups.items():
+            cutoff = cutoffs[grain]
+            rollup.update(chunk if cutoff is None else chunk[chunk["starttime"] >= cutoff])
+    for grain, cutoff in cutoffs.items():
+        path = rollup_path(dataset, grain, root)
+        fresh = rollups[grain].result()[ROLLUP_COLUMNS]
+        if cutoff is not None and os.path.exists(path):
+            old = pd.read_parquet(path)
+            fresh = pd.concat([old[old["starttime"] < cutoff], fresh], ignore_index=True)
+        _write_local(path, fresh)
+
+    path = os.path.join(root, "rollups", dataset, "_watermark.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"starttime": newest.isoformat()}, f)
+    os.replace(tmp, path)
+    return newest
+
+
+def read_local_rollup(
+    dataset: str,
+    grain: Grain,
+    dates: tuple[datetime.datetime, datetime.datetime],
+    groups: Optional[list[str]] = None,
+    price_area: Optional[str] = None,
+    root: str = MIRROR_DIR,
+) -> Optional[pd.DataFrame]:
+    """Read a local rollup, or None if it has not been built or is behind the mirror."""
+    path = rollup_path(dataset, grain, root)
+    if not os.path.exists(path):
+        return None
+    watermark, synced = _read_local_watermark(dataset, root), read_watermark(dataset, root)
+    if watermark is None or (synced is not None and watermark < synced):
+        return None
+    filters = [("starttime", ">=", pd.Timestamp(_cutoff(dates[0], grain))), ("starttime", "<=", pd.Timestamp(dates[1]))]
+    if groups is not None:
+        filters.append(("group", "in", [groups] if isinstance(groups, str) else list(groups)))
+    if price_area:
+        filters.append(("pricearea", "==", price_area))
+    return pd.read_parquet(path, filters=filters).reset_index(drop=True)
+
+
+def read_rollup(
+    client,
+    dataset: Literal["production", "consumption"],
+    grain: Grain,
+    dates: tuple[datetime.datetime, datetime.datetime],
+    groups: Optional[list[str]] = None,
+    price_area: Optional[str] = None,
+    root: str = MIRROR_DIR,
+) -> Optional[pd.DataFrame]:
+    """
+    Read a rollup from the local files, or from MongoDB if they have not been built
+    or have not caught up with the last mirror sync.
+
+    Periods overlapping the date range are returned whole, so weekly and monthly
+    rollups may include days just outside the range.
+
+    Args:
+        client: MongoDB client connection, or None to only use local rollups.
+        dataset: 'production' or 'consumption'.
+        grain: 'D', 'W' or 'M'.
+        dates: Tuple of (start_date, end_date) for filtering.
+        groups: Groups to keep. All groups are returned if None.
+        price_area: Price area to keep. All areas are returned if None.
+        root: Root directory of the mirror.
+
+    Returns:
+        DataFrame with starttime (period start), pricearea, group, sum, count and mean,
+        or None if no rollup is available.
+    """
+    data = read_local_rollup(dataset, grain, dates, groups, price_area, root)
+    if data is None and client is not None:
+        data = read_mongo_rollup(client, dataset, grain, dates, groups, price_area)
+    return data
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain the Elhub rollup tables.")
+    parser.add_argument("command", choices=["update"])
+    parser.add_argument("--target", nargs="+", default=["mongo", "local"], choices=["mongo", "local"])
+    parser.add_argument("--dataset", nargs="+", default=["production", "consumption"],
+                        choices=["production", "consumption"])
+    parser.add_argument("--root", default=MIRROR_DIR, help="Mirror directory (default: %(default)s).")
+    parser.add_argument("--uri", default=os.environ.get("MONGO_URI"), help="MongoDB URI (default: $MONGO_URI).")
+    args = parser.parse_args()
+
+    if "mongo" in args.target:
+        import pymongo
+        client = pymongo.MongoClient(args.uri)
+        for dataset in args.dataset:
+            print(f"{dataset}: MongoDB rollups up to {update_mongo_rollups(client, dataset)}")
+    if "local" in args.target:
+        for dataset in args.dataset:
+            print(f"{dataset}: local rollups up to {update_local_rollups(dataset, args.root)}")
+
+
+if __name__ == "__main__":
+    main()
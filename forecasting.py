@@ -0,0 +1,616 @@
+"""
+SARIMAX model utilities shared by the forecasting pages.
+
+Contains the warm-started SARIMAX forecast used by the pages, a process-pool
+grid search over SARIMAX orders that streams results back as fits finish, the
+Streamlit widget used by the pages to run it, and a batch forecast of every
+(group, pricearea) series that can also be run headless.
+
+Usage:
+    python forecasting.py batch --dataset production --start 2024-01-01 --end 2024-12-31 --out forecasts.parquet
+"""
+import argparse
+import itertools
+import os
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Callable, Iterator, Literal, Optional
+
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+import streamlit as st
+
+from utilities import process_pool
+
+Order = tuple[int, int, int]
+SeasonalOrder = tuple[int, int, int, int]
+
+# Training/holdout data of the current search, set once per worker process.
+_worker_data: dict = {}
+
+
+MODEL_CACHE_SIZE = 16
+# Reused parameters are re-estimated (warm-started) once the training window
+# and the window they were estimated on differ in more than this share of
+# observations, or after this many appends/applies in a row.
+REESTIMATE_SHARE = 0.1
+REESTIMATE_AFTER = 10
+
+
+@st.cache_resource
+def _model_store() -> tuple[OrderedDict, threading.Lock]:
+    """
+    Fitted SARIMAX results shared across reruns and sessions, keyed by (series id, order, exog set).
+
+    Returns:
+        Tuple of (store, lock). The lock guards lookups, inserts and evictions, not the fits.
+    """
+    return OrderedDict(), threading.Lock()
+
+
+def fit_sarimax(
+    series_id: str,
+    y_train: pd.Series,
+    x_train: pd.DataFrame,
+    order: Order,
+    seasonal_order: SeasonalOrder,
+    refit: bool = False,
+) -> tuple:
+    """
+    Fit a SARIMAX model, reusing the previous fit of the same series when possible.
+
+    If the training window only grew at the end, the new observations are
+    appended to the cached results. If it moved in any other way, the cached
+    parameters are applied to the new window. Neither re-runs the MLE, so the
+    parameters are re-estimated with the cached ones as start_params once the
+    window and the one they were estimated on differ in more than
+    REESTIMATE_SHARE of their observations, or after REESTIMATE_AFTER
+    appends/applies. The parameters in use therefore always come from a window
+    close to the current one, however the slider got there. With refit=True
+    the model is re-estimated on every change. A full fit is only done on a
+    cache miss.
+
+    Args:
+        series_id: Identifier of the series and its preprocessing (dataset, dates, resampling...).
+        y_train: Training target.
+        x_train: Training exogenous variables.
+        order: (p, d, q) order.
+        seasonal_order: (P, D, Q, s) seasonal order.
+        refit: Whether to re-estimate the parameters (warm-started) on every change.
+
+    Returns:
+        Tuple of (results, how) where how is 'cached', 'appended', 'applied', 'refit' or 'fit'.
+    """
+    store, lock = _model_store()
+    key = (series_id, tuple(order), tuple(seasonal_order), tuple(map(str, x_train.columns)))
+    with lock:
+        entry = store.get(key)
+    y_values, x_values = y_train.to_numpy(), x_train.to_numpy()
+
+    how, fit_index, reuses = "fit", y_train.index, 0
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        if entry is not None:
+            prev_index, prev_y, prev_x, prev_res, fit_index, reuses = entry
+            n = min(len(prev_index), len(y_train))
+            extends = (len(y_train) >= len(prev_index)
+                       and y_train.index[:n].equals(prev_index)
+                       and np.array_equal(y_values[:n], prev_y, equal_nan=True)
+                       and np.array_equal(x_values[:n], prev_x, equal_nan=True))
+            moved = 1 - len(y_train.index.intersection(fit_index)) / max(len(y_train), len(fit_index), 1)
+            if extends and len(y_train) == len(prev_index):
+                res, how = prev_res, "cached"
+            elif refit or moved > REESTIMATE_SHARE or reuses >= REESTIMATE_AFTER:
+                mod = sm.tsa.statespace.SARIMAX(y_train, exog=x_train, order=order, seasonal_order=seasonal_order)
+                res, how = mod.fit(start_params=prev_res.params, disp=False), "refit"
+                fit_index, reuses = y_train.index, 0
+            elif extends:
+                res, how = prev_res.append(y_train.iloc[n:], exog=x_train.iloc[n:], refit=False), "appended"
+                reuses += 1
+            else:
+                res, how = prev_res.apply(y_train, exog=x_train, refit=False), "applied"
+                reuses += 1
+        else:
+            mod = sm.tsa.statespace.SARIMAX(y_train, exog=x_train, order=order, seasonal_order=seasonal_order)
+            res = mod.fit(disp=False)
+
+    with lock:
+        store[key] = (y_train.index, y_values, x_values, res, fit_index, reuses)
+        store.move_to_end(key)
+        while len(store) > MODEL_CACHE_SIZE:
+            store.popitem(last=False)
+    return res, how
+
+
+def sarimax_forecast(
+    series_id: str,
+    x_data: pd.DataFrame,
+    y_data: pd.Series,
+    start_idx: int,
+    end_idx: int,
+    order: Order = (1, 1, 1),
+    seasonal_order: SeasonalOrder = (1, 1, 1, 12),
+    refit: bool = False,
+) -> tuple:
+    """
+    Perform SARIMAX forecasting with exogenous variables.
+
+    Fitted models are kept per (series id, order, exog set), so moving the end of
+    the training window reuses the previous fit instead of a new MLE fit, see fit_sarimax.
+
+    Args:
+        series_id: Identifier of the series and its preprocessing.
+        x_data: DataFrame with exogenous variables.
+        y_data: Target time series to forecast.
+        start_idx: Index where training data starts.
+        end_idx: Index where training data ends.
+        order: (p, d, q) order.
+        seasonal_order: (P, D, Q, s) seasonal order.
+        refit: Whether to re-estimate the parameters (warm-started) when a previous fit exists.
+
+    Returns:
+        Tuple of (forecast object, confidence intervals DataFrame, forecast values, how the model was obtained).
+    """
+    # statsmodels cannot append to exog with MultiIndex columns, so flatten the labels
+    x_data = x_data.set_axis(list(map(str, x_data.columns)), axis=1)
+    res, how = fit_sarimax(series_id,
+                           y_data.iloc[start_idx:end_idx],
+                           x_data.iloc[start_idx:end_idx],
+                           order, seasonal_order, refit=refit)
+
+    steps = len(y_data) - end_idx
+    forecast = res.forecast(steps=steps, exog=x_data.iloc[end_idx:])
+
+    # For confidence intervals
+    predict_dy = res.get_forecast(steps=steps, exog=x_data.iloc[end_idx:])
+    predict_dy_ci = predict_dy.conf_int()
+
+    return predict_dy, predict_dy_ci, forecast, how
+
+
+def order_grid(
+    ar: range,
+    diff: range,
+    ma: range,
+    seasonal_ar: range,
+    seasonal_diff: range,
+    seasonal_ma: range,
+    seasonal_period: int,
+) -> list[tuple[Order, SeasonalOrder]]:
+    """
+    Enumerate all (order, seasonal_order) combinations in the given bounds.
+
+    Args:
+        ar: Candidate autoregressive orders.
+        diff: Candidate differencing orders.
+        ma: Candidate moving average orders.
+        seasonal_ar: Candidate seasonal autoregressive orders.
+        seasonal_diff: Candidate seasonal differencing orders.
+        seasonal_ma: Candidate seasonal moving average orders.
+        seasonal_period: Length of the seasonal cycle.
+
+    Returns:
+        List of (order, seasonal_order) tuples.
+    """
+    return [((p, d, q), (P, D, Q, seasonal_period))
+            for p, d, q, P, D, Q in itertools.product(ar, diff, ma, seasonal_ar, seasonal_diff, seasonal_ma)]
+
+
+def _init_worker(y_train, x_train, y_test, x_test) -> None:
+    """Store the search data in the worker so it is pickled once per process, not per fit."""
+    _worker_data.update(y_train=y_train, x_train=x_train, y_test=y_test, x_test=x_test)
+
+
+def _deadline(timeout: Optional[float]) -> Optional[Callable]:
+    """
+    Optimizer callback that aborts a fit after timeout seconds.
+
+    Checked once per optimizer iteration, so unlike SIGALRM it also works on
+    platforms without POSIX signals.
+
+    Args:
+        timeout: Maximum seconds per fit. No limit if None.
+
+    Returns:
+        Callback for SARIMAX.fit, or None without a limit.
+    """
+    if not timeout:
+        return None
+    end = time.perf_counter() + timeout
+
+    def check(params) -> None:
+        if time.perf_counter() > end:
+            raise TimeoutError
+
+    return check
+
+
+def _fit_candidate(order: Order, seasonal_order: SeasonalOrder, timeout: Optional[float]) -> dict:
+    """Fit one candidate in a worker process and score it on the holdout data."""
+    result = {"order": order, "seasonal_order": seasonal_order,
+              "aic": np.nan, "mse": np.nan, "status": "ok", "seconds": np.nan}
+    t0 = time.perf_counter()
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            mod = sm.tsa.statespace.SARIMAX(_worker_data["y_train"], exog=_worker_data["x_train"],
+                                            order=order, seasonal_order=seasonal_order)
+            res = mod.fit(disp=False, callback=_deadline(timeout))
+            result["aic"] = res.aic
+            y_test = _worker_data["y_test"]
+            if len(y_test):
+                forecast = res.forecast(steps=len(y_test), exog=_worker_data["x_test"])
+                result["mse"] = float(np.mean((np.asarray(y_test) - np.asarray(forecast)) ** 2))
+    except TimeoutError:
+        result["status"] = "timeout"
+    except Exception as e:
+        result["status"] = f"error: {e}"
+    result["seconds"] = time.perf_counter() - t0
+    return result
+
+
+def sarimax_grid_search(
+    x_data: pd.DataFrame,
+    y_data: pd.Series,
+    start_idx: int,
+    end_idx: int,
+    candidates: list[tuple[Order, SeasonalOrder]],
+    timeout: Optional[float] = None,
+    max_workers: Optional[int] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> Iterator[dict]:
+    """
+    Fit SARIMAX candidates in parallel and yield each result as soon as it finishes.
+
+    Every result holds the order, seasonal order, AIC, holdout MSE (on the data
+    after end_idx), status ('ok', 'timeout' or an error message) and fit time.
+    Closing the generator, or should_stop returning True, cancels all fits that
+    have not started yet.
+
+    Args:
+        x_data: DataFrame with exogenous variables.
+        y_data: Target time series.
+        start_idx: Index where training data starts.
+        end_idx: Index where training data ends.
+        candidates: (order, seasonal_order) tuples to fit, see order_grid.
+        timeout: Maximum seconds per fit. No limit if None.
+        max_workers: Number of worker processes. Defaults to the number of cores.
+        should_stop: Optional callback polled between results to cancel the search.
+
+    Returns:
+        Iterator over result dictionaries in completion order.
+    """
+    initargs = (y_data.iloc[start_idx:end_idx], x_data.iloc[start_idx:end_idx],
+                y_data.iloc[end_idx:], x_data.iloc[end_idx:])
+    executor = process_pool(max_workers, initializer=_init_worker, initargs=initargs)
+    futures = {executor.submit(_fit_candidate, order, seasonal_order, timeout): (order, seasonal_order)
+               for order, seasonal_order in candidates}
+    pending = set(futures)
+    try:
+        while pending:
+            if should_stop is not None and should_stop():
+                break
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.cancelled():
+                    continue
+                try:
+                    yield future.result()
+                except Exception as e:  # worker died
+                    order, seasonal_order = futures[future]
+                    yield {"order": order, "seasonal_order": seasonal_order,
+                           "aic": np.nan, "mse": np.nan, "status": f"error: {e}", "seconds": np.nan}
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def rank_results(results: list[dict], metric: Literal["aic", "mse"] = "aic") -> pd.DataFrame:
+    """
+    Rank grid search results, best first.
+
+    Args:
+        results: Result dictionaries from sarimax_grid_search.
+        metric: 'aic' or holdout 'mse'.
+
+    Returns:
+        DataFrame sorted by the metric, failed fits last.
+    """
+    df = pd.DataFrame(results, columns=["order", "seasonal_order", "aic", "mse", "status", "seconds"])
+    df["order"] = df["order"].astype(str)
+    df["seasonal_order"] = df["seasonal_order"].astype(str)
+    return df.sort_values(metric, na_position="last").reset_index(drop=True)
+
+
+def order_search(
+    x_data: pd.DataFrame,
+    y_data: pd.Series,
+    start_idx: int,
+    end_idx: int,
+    seasonal_period: int,
+) -> None:
+    """
+    Streamlit widget for searching SARIMAX orders on the current training window.
+
+    Args:
+        x_data: DataFrame with exogenous variables.
+        y_data: Target time series.
+        start_idx: Index where training data starts.
+        end_idx: Index where training data ends.
+        seasonal_period: Length of the seasonal cycle used for all candidates.
+    """
+    with st.expander("🔍 Search SARIMAX orders", expanded=False):
+        cols = st.columns(6)
+        names = ["Max AR", "Max differentiation", "Max MA", "Max seasonal AR", "Max seasonal differentiation", "Max seasonal MA"]
+        bounds = [col.number_input(name, min_value=0, max_value=3, value=1, step=1, key=f"search_{i}")
+                  for i, (col, name) in enumerate(zip(cols, names))]
+        cols = st.columns(3)
+        metric = cols[0].radio("Rank by", options=["aic", "mse"], format_func=lambda m: {"aic": "AIC", "mse": "Holdout MSE"}[m], horizontal=True)
+        timeout = cols[1].number_input("Timeout per fit (s)", min_value=1, max_value=600, value=60, step=1)
+        candidates = order_grid(*(range(b + 1) for b in bounds), seasonal_period=seasonal_period)
+        cols[2].markdown(f"**{len(candidates)}** candidate orders")
+
+        if not st.button("Run search", key="search_run"):
+            return
+        table = st.empty()
+        progress = st.progress(0.0)
+        results = []
+        for result in sarimax_grid_search(x_data, y_data, start_idx, end_idx, candidates, timeout=timeout):
+            results.append(result)
+            progress.progress(len(results) / len(candidates), text=f"{len(results)}/{len(candidates)} fits done")
+            table.dataframe(rank_results(results, metric), use_container_width=True)
+        best = rank_results(results, metric).iloc[0]
+        st.success(f"Best order {best['order']} × {best['seasonal_order']} ({metric.upper()} {best[metric]:.2f})")
+
+
+RESAMPLE_RULES = {"Hourly": None, "Daily": "D", "Weekly": "W", "Monthly": "M"}
+
+
+def prepare_series(
+    df: pd.DataFrame,
+    feat_name: str,
+    resample: Literal["Hourly", "Daily", "Weekly", "Monthly"] = "Daily",
+    impute: bool = True,
+) -> pd.DataFrame:
+    """
+    Pivot Elhub data into one column per (group, pricearea) series and resample it.
+
+    Args:
+        df: Elhub data indexed by starttime, see get_elhub_data.
+        feat_name: Name of the group field ('productiongroup' or 'consumptiongroup').
+        resample: Resampling frequency, the series are averaged per period.
+        impute: Whether to fill missing values with the column mean. Empty series are dropped.
+
+    Returns:
+        DataFrame with (group, pricearea) MultiIndex columns.
+    """
+    wide = pd.pivot_table(df, index=df.index, columns=[feat_name, "pricearea"], values="quantitykwh", observed=True)
+    rule = RESAMPLE_RULES[resample]
+    if rule:
+        wide = wide.resample(rule).mean()
+    if impute:
+        wide = wide.dropna(axis=1, how="all")
+        wide = wide.fillna(wide.mean())
+    return wide
+
+
+def prepare_aligned(
+    df: pd.DataFrame,
+    resample: Literal["Hourly", "Daily", "Weekly", "Monthly"] = "Weekly",
+) -> pd.DataFrame:
+    """
+    Resample the joined electricity and weather data and fill its gaps.
+
+    get_aligned_data keeps hours that are missing in either source as NaN.
+    SARIMAX rejects missing exogenous values and the scores missing targets,
+    but dropping the rows would break the regular time grid the (seasonal)
+    model relies on. Interior gaps are therefore interpolated in time and
+    incomplete rows at the start and end are trimmed. Columns without any
+    data are dropped first.
+
+    Args:
+        df: Result of get_aligned_data.
+        resample: Resampling frequency, the data is averaged per period.
+
+    Returns:
+        DataFrame without missing values on a regular time grid.
+    """
+    rule = RESAMPLE_RULES[resample]
+    if rule:
+        df = df.resample(rule).mean()
+    df = df.dropna(axis=1, how="all").interpolate(method="time", limit_area="inside")
+    complete = df.notna().all(axis=1).to_numpy().nonzero()[0]
+    if not len(complete):
+        return df.iloc[:0]
+    return df.iloc[complete[0]:complete[-1] + 1]  # slicing keeps the frequency of the index
+
+
+def exog_columns(columns: pd.MultiIndex, target: tuple[str, str]) -> list[tuple[str, str]]:
+    """
+    Default exogenous series for a target: all other groups in all other price areas.
+
+    Args:
+        columns: (group, pricearea) columns of the prepared frame.
+        target: (group, pricearea) of the target series.
+
+    Returns:
+        List of exogenous column labels.
+    """
+    group, pricearea = target
+    return [c for c in columns if c[0] != group and c[1] != pricearea]
+
+
+def _init_batch_worker(wide: pd.DataFrame) -> None:
+    """Store the prepared series in the worker so they are pickled once per process."""
+    _worker_data.update(wide=wide)
+
+
+def _forecast_series(
+    target: tuple[str, str],
+    start_idx: int,
+    end_idx: int,
+    steps: int,
+    order: Order,
+    seasonal_order: SeasonalOrder,
+    exog: bool,
+    alpha: float,
+    timeout: Optional[float],
+) -> tuple[pd.DataFrame, dict]:
+    """Fit and forecast one series in a worker process."""
+    wide = _worker_data["wide"]
+    y = wide[target]
+    x = wide[exog_columns(wide.columns, target)] if exog else None
+    if x is not None:
+        x = x.set_axis(list(map(str, x.columns)), axis=1)
+        if x.empty:
+            x = None
+    metrics = {"group": target[0], "pricearea": target[1],
+               "aic": np.nan, "mse": np.nan, "r2": np.nan, "status": "ok", "seconds": np.nan}
+    forecast = pd.DataFrame(columns=["time", "group", "pricearea", "actual", "forecast", "lower", "upper"])
+
+    t0 = time.perf_counter()
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            mod = sm.tsa.statespace.SARIMAX(y.iloc[start_idx:end_idx],
+                                            exog=None if x is None else x.iloc[start_idx:end_idx],
+                                            order=order, seasonal_order=seasonal_order)
+            res = mod.fit(disp=False, callback=_deadline(timeout))
+            pred = res.get_forecast(steps=steps, exog=None if x is None else x.iloc[end_idx:end_idx + steps])
+            ci = pred.conf_int(alpha=alpha)
+        actual = y.iloc[end_idx:end_idx + steps].to_numpy()
+        actual = np.concatenate([actual, np.full(steps - len(actual), np.nan)])
+        forecast = pd.DataFrame({"time": pred.predicted_mean.index,
+                                 "group": target[0],
+                                 "pricearea": target[1],
+                                 "actual": actual,
+                                 "forecast": pred.predicted_mean.to_numpy(),
+                                 "lower": ci.iloc[:, 0].to_numpy(),
+                                 "upper": ci.iloc[:, 1].to_numpy()})
+        metrics["aic"] = res.aic
+        observed = ~np.isnan(actual)
+        if observed.any():
+            err = actual[observed] - forecast["forecast"].to_numpy()[observed]
+            metrics["mse"] = float(np.mean(err ** 2))
+            ss_tot = np.sum((actual[observed] - actual[observed].mean()) ** 2)
+            metrics["r2"] = float(1 - np.sum(err ** 2) / ss_tot) if ss_tot > 0 else np.nan
+    except TimeoutError:
+        metrics["status"] = "timeout"
+    except Exception as e:
+        metrics["status"] = f"error: {e}"
+    metrics["seconds"] = time.perf_counter() - t0
+    return forecast, metrics
+
+
+def batch_forecast(
+    wide: pd.DataFrame,
+    end_idx: Optional[int] = None,
+    start_idx: int = 0,
+    horizon: Optional[int] = None,
+    order: Order = (1, 1, 1),
+    seasonal_order: SeasonalOrder = (1, 1, 1, 12),
+    exog: bool = True,
+    alpha: float = 0.05,
+    timeout: Optional[float] = None,
+    max_workers: Optional[int] = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Forecast every (group, pricearea) series of a prepared frame in parallel.
+
+    Each series is fitted in its own worker process. By default the exogenous
+    variables are all other groups in all other price areas, like on the
+    forecasting page. The prepared frame is sent to every worker once.
+
+    Args:
+        wide: Prepared series, see prepare_series.
+        end_idx: Index where training data ends. Defaults to 70% of the data.
+        start_idx: Index where training data starts.
+        horizon: Number of steps to forecast. Defaults to the rest of the data after end_idx.
+            Forecasting past the end of the data requires exog=False.
+        order: (p, d, q) order.
+        seasonal_order: (P, D, Q, s) seasonal order.
+        exog: Whether to use the other series as exogenous variables.
+        alpha: Significance level of the confidence intervals.
+        timeout: Maximum seconds per fit. No limit if None.
+        max_workers: Number of worker processes. Defaults to the number of cores.
+
+    Returns:
+        Tuple of (forecasts, metrics). forecasts has one row per series and time step
+        with the actual value, forecast and confidence interval. metrics has one row
+        per series with AIC, MSE, R2, status and fit time.
+    """
+    end_idx = int(len(wide) * 0.7) if end_idx is None else end_idx
+    steps = len(wide) - end_idx if horizon is None else horizon
+    if exog and end_idx + steps > len(wide):
+        raise ValueError("forecasting past the end of the data requires exog=False")
+
+    forecasts, metrics = [], []
+    with process_pool(max_workers, initializer=_init_batch_worker, initargs=(wide,)) as executor:
+        futures = [executor.submit(_forecast_series, target, start_idx, end_idx, steps,
+                                   order, seasonal_order, exog, alpha, timeout)
+                   for target in wide.columns]
+        for future in futures:
+            forecast, metric = future.result()
+            forecasts.append(forecast)
+            metrics.append(metric)
+
+    forecasts = pd.concat(forecasts, ignore_index=True) if forecasts else pd.DataFrame()
+    return forecasts, pd.DataFrame(metrics)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Forecast all Elhub (group, pricearea) series.")
+    parser.add_argument("command", choices=["batch"])
+    parser.add_argument("--dataset", nargs="+", default=["production", "consumption"],
+                        choices=["production", "consumption"])
+    parser.add_argument("--start", default="2024-01-01", help="First day of data (default: %(default)s).")
+    parser.add_argument("--end", default="2024-12-31", help="Last day of data (default: %(default)s).")
+    parser.add_argument("--resample", default="Daily", choices=list(RESAMPLE_RULES))
+    parser.add_argument("--train-end", type=float, default=0.7,
+                        help="Fraction of the data used for training (default: %(default)s).")
+    parser.add_argument("--horizon", type=int, default=None,
+                        help="Steps to forecast. Steps past the end of the data need --no-exog.")
+    parser.add_argument("--order", type=int, nargs=3, default=[1, 1, 1])
+    parser.add_argument("--seasonal-order", type=int, nargs=4, default=[1, 1, 1, 12])
+    parser.add_argument("--no-exog", action="store_true", help="Fit each series without exogenous variables.")
+    parser.add_argument("--timeout", type=float, default=None, help="Maximum seconds per fit.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes.")
+    parser.add_argument("--out", default="forecasts.parquet", help="Output file (default: %(default)s).")
+    parser.add_argument("--uri", default=os.environ.get("MONGO_URI"), help="MongoDB URI (default: $MONGO_URI).")
+    args = parser.parse_args()
+
+    import pymongo
+    from elhub_loader import group_field
+    from utilities import get_elhub_data
+
+    client = pymongo.MongoClient(args.uri)
+    dates = (pd.Timestamp(args.start).to_pydatetime(), pd.Timestamp(args.end).to_pydatetime())
+    forecasts, metrics = [], []
+    for dataset in args.dataset:
+        df = get_elhub_data(client, dataset=dataset, dates=dates, columnar=True)
+        wide = prepare_series(df, group_field(dataset), resample=args.resample)
+        forecast, metric = batch_forecast(wide,
+                                          end_idx=int(len(wide) * args.train_end),
+                                          horizon=args.horizon,
+                                          order=tuple(args.order),
+                                          seasonal_order=tuple(args.seasonal_order),
+                                          exog=not args.no_exog,
+                                          timeout=args.timeout,
+                                          max_workers=args.workers)
+        forecasts.append(forecast.assign(dataset=dataset))
+        metrics.append(metric.assign(dataset=dataset))
+        failed = (metric["status"] != "ok").sum()
+        print(f"{dataset}: {len(metric)} series forecast, {failed} failed")
+
+    forecasts = pd.concat(forecasts, ignore_index=True)
+    forecasts.to_parquet(args.out, index=False)
+    metrics = pd.concat(metrics, ignore_index=True)
+    metrics.to_csv(os.path.splitext(args.out)[0] + "_metrics.csv", index=False)
+    print(metrics.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+"""
+Simplified price-area geometry for the map page.
+
+data/file.geojson holds the full-resolution area polygons (~55k vertices). The
+map only needs a fraction of them at any zoom level, so the polygons are
+simplified once per zoom level and the result is stored next to the source:
+
+- The rings are split into arcs where the set of areas on either side
+  changes, and every shared border is simplified once (Douglas-Peucker), so
+  neighbouring areas keep identical borders without gaps or overlaps.
+- Douglas-Peucker is run once per arc to give every vertex the largest
+  tolerance it survives; every zoom level is then a threshold.
+- The tolerance of a zoom level is half a screen pixel, and coordinates are
+  rounded to the decimals that still resolve it.
+
+The levels carry only the area name as property. Values such as quantitymwh are
+merged per render with with_properties, which shares the geometry instead of
+copying it.
+
+AreaIndex answers which price area a coordinate lies in from the full-resolution
+polygons: points outside the bounding box are rejected first, the rest are
+grouped by latitude band and ray-cast only against the edges of their band.
+
+Usage:
+    python geodata.py [--source data/file.geojson] [--out data/file.levels.json]
+"""
+import argparse
+import json
+import math
+import os
+from typing import Optional
+
+import numpy as np
+
+GEOJSON = os.environ.get("GEOJSON", "data/file.geojson")
+GEODATA_LEVELS = os.environ.get("GEODATA_LEVELS", "data/file.levels.json")
+ZOOM_LEVELS = (4, 6, 8, 10)  # zoom levels with their own geometry, others use the nearest coarser one
+PIXEL_TOLERANCE = 0.5  # simplification tolerance in screen pixels
+AREA_KEY = "ElSpotOmr"
+INDEX_BANDS = 1024  # latitude bands of AreaIndex
+_INDEX_CHUNK = 2**20  # point × edge tests per block in AreaIndex
+
+Ring = np.ndarray  # (n, 2) lon/lat without the closing vertex
+Area = tuple[str, list[list[Ring]]]  # (price area, polygons as [exterior, *holes])
+
+
+def read_areas(path: str = GEOJSON) -> list[Area]:
+    """
+    Read the price-area polygons of a GeoJSON file.
+
+    Args:
+        path: GeoJSON FeatureCollection with the area name in properties.ElSpotOmr.
+
+    Returns:
+        List of (price area without spaces, polygons), one entry per feature.
+    """
+    with open(path) as f:
+        gj = json.load(f)
+    areas = []
+    for feature in gj.get("features", []):
+        name = feature.get("properties", {}).get(AREA_KEY, "").replace(" ", "")
+        geometry = feature["geometry"]
+        polygons = geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+        areas.append((name, [[np.asarray(ring, dtype=np.float64)[:-1] for ring in polygon] for polygon in polygons]))
+    return areas
+
+
+def _owners(areas: list[Area]) -> dict:
+    """Map each vertex, and each ring segment (as a set of its two end points), to the areas that share it."""
+    owners: dict = {}
+    for i, (_, polygons) in enumerate(areas):
+        for polygon in polygons:
+            for ring in polygon:
+                points = list(map(tuple, ring))
+                for p, q in zip(points, points[1:] + points[:1]):
+                    owners.setdefault(p, set()).add(i)
+                    owners.setdefault(frozenset((p, q)), set()).add(i)
+    return {key: frozenset(areas) for key, areas in owners.items()}
+
+
+def _split_ring(ring: Ring, owners: dict) -> tuple[list[np.ndarray], bool]:
+    """
+    Split a ring into arcs at the vertices where the areas on its segments change,
+    and at vertices that touch another area (pinch points).
+
+    Returns:
+        Tuple of (arcs with both end points, whether the ring is a single closed arc).
+    """
+    points = list(map(tuple, ring))
+    n = len(points)
+    keys = [owners[frozenset((points[i], points[(i + 1) % n]))] for i in range(n)]
+    cuts = [i for i in range(n) if keys[i] != keys[i - 1] or owners[points[i]] != keys[i] | keys[i - 1]]
+    if not cuts:
+        return [np.vstack([ring, ring[:1]])], True
+    closed = np.vstack([ring, ring])  # unrolled twice so arcs may wrap around the start
+    bounds = cuts + [cuts[0] + n]
+    return [closed[start:stop + 1] for start, stop in zip(bounds[:-1], bounds[1:])], False
+
+
+def _importance(arc: np.ndarray) -> np.ndarray:
+    """
+    Largest Douglas-Peucker tolerance at which each vertex of an arc is kept.
+
+    A vertex is kept at tolerance t iff its importance is > t; the end points are always kept.
+    """
+    n = len(arc)
+    importance = np.zeros(n)
+    importance[[0, n - 1]] = np.inf
+    stack = [(0, n - 1, np.inf)]
+    while stack:
+        start, stop, parent = stack.pop()
+        if stop - start < 2:
+            continue
+        a, b = arc[start], arc[stop]
+        ab = b - a
+        pts = arc[start + 1:stop] - a
+        length2 = ab @ ab
+        t = np.clip(pts @ ab / length2, 0.0, 1.0) if length2 > 0 else np.zeros(len(pts))
+        dist = np.hypot(*(pts - t[:, None] * ab).T)
+        i = int(dist.argmax())
+        keep = min(dist[i], parent)  # never above the split that made this sub-arc
+        importance[start + 1 + i] = keep
+        stack += [(start, start + 1 + i, keep), (start + 1 + i, stop, keep)]
+    return importance
+
+
+def _closed_importance(arc: np.ndarray) -> np.ndarray:
+    """Importance of a closed arc (first point == last), split at the vertex farthest from the start."""
+    far = int(np.hypot(*(arc - arc[0]).T).argmax())
+    first, second = _importance(arc[:far + 1]), _importance(arc[far:])
+    return np.concatenate([first[:-1], second])
+
+
+def tolerance(zoom: int, latitude: float = 65.0) -> float:
+    """Simplification tolerance of a zoom level, in degrees of latitude (Web Mercator)."""
+    return PIXEL_TOLERANCE * 360.0 / (256 * 2**zoom) * math.cos(math.radians(latitude))
+
+
+def simplify_levels(areas: list[Area], zoom_levels: tuple[int, ...] = ZOOM_LEVELS) -> dict[int, dict]:
+    """
+    Simplify the area polygons for every zoom level without breaking shared borders.
+
+    Args:
+        areas: Result of read_areas.
+        zoom_levels: Zoom levels to build.
+
+    Returns:
+        Mapping of zoom level to a GeoJSON FeatureCollection with only the area name as property.
+    """
+    lat0 = float(np.mean(np.vstack([ring for _, polygons in areas for polygon in polygons for ring in polygon])[:, 1]))
+    scale = np.array([math.cos(math.radians(lat0)), 1.0])  # lon degrees are shorter, keep the tolerance isotropic
+    owners = _owners(areas)
+
+    arcs: dict[bytes, np.ndarray] = {}  # importance per arc, keyed in a direction-independent way
+    layout = []  # per area, polygon, ring: list of (arc key, reversed)
+    for _, polygons in areas:
+        area_layout = []
+        for polygon in polygons:
+            polygon_layout = []
+            for ring in polygon:
+                ring_arcs, closed = _split_ring(ring, owners)
+                ring_layout = []
+                for arc in ring_arcs:
+                    forward, backward = arc.tobytes(), arc[::-1].tobytes()
+                    key, reverse = (forward, False) if forward <= backward else (backward, True)
+                    if key not in arcs:
+                        canonical = arc[::-1] if reverse else arc
+                        arcs[key] = (_closed_importance if closed else _importance)(canonical * scale)
+                    ring_layout.append((key, reverse))
+                polygon_layout.append(ring_layout)
+            area_layout.append(polygon_layout)
+        layout.append(area_layout)
+
+    levels = {}
+    for zoom in zoom_levels:
+        tol = tolerance(zoom, lat0)
+        decimals = max(0, math.ceil(-math.log10(tol)) + 1)
+        simplified = {}
+        for key, importance in arcs.items():
+            arc = np.frombuffer(key).reshape(-1, 2)
+            simplified[key] = np.round(arc[importance > tol], decimals)
+        features = []
+        for (name, _), area_layout in zip(areas, layout):
+            polygons = []
+            for polygon_layout in area_layout:
+                rings = [_join(simplified, ring_layout) for ring_layout in polygon_layout]
+                if rings[0] is None:  # exterior collapsed at this tolerance, drop the polygon
+                    continue
+                polygons.append([ring for ring in rings if ring is not None])
+            geometry = ({"type": "Polygon", "coordinates": polygons[0]} if len(polygons) == 1
+                        else {"type": "MultiPolygon", "coordinates": polygons})
+            features.append({"type": "Feature", "properties": {AREA_KEY: name}, "geometry": geometry})
+        levels[zoom] = {"type": "FeatureCollection", "features": features}
+    return levels
+
+
+def _join(simplified: dict[bytes, np.ndarray], ring_layout: list[tuple[bytes, bool]]) -> Optional[list]:
+    """Concatenate the simplified arcs of a ring into a closed coordinate list, None if it collapsed."""
+    parts = [simplified[key][::-1] if reverse else simplified[key] for key, reverse in ring_layout]
+    ring = np.vstack([part[:-1] for part in parts])
+    ring = ring[np.any(ring != np.roll(ring, 1, axis=0), axis=1)]  # drop repeats created by rounding
+    if len(ring) < 3:
+        return None
+    return np.vstack([ring, ring[:1]]).tolist()
+
+
+def write_levels(levels: dict[int, dict], source: str = GEOJSON, path: str = GEODATA_LEVELS) -> None:
+    """Store the levels as compact JSON together with the modification time of the source."""
+    payload = {"source_mtime": os.path.getmtime(source), "levels": levels}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(payload, f, separators=(",", ":"))
+
+
+def load_levels(source: str = GEOJSON, path: str = GEODATA_LEVELS) -> dict[int, dict]:
+    """
+    Simplified levels of the source, read from path or rebuilt when it is missing or stale.
+
+    Args:
+        source: Full-resolution GeoJSON.
+        path: Stored levels written by write_levels.
+
+    Returns:
+        Mapping of zoom level to FeatureCollection, as simplify_levels.
+    """
+    mtime = os.path.getmtime(source)
+    if os.path.exists(path):
+        with open(path) as f:
+            payload = json.load(f)
+        if payload.get("source_mtime") == mtime:
+            return {int(zoom): level for zoom, level in payload["levels"].items()}
+    levels = simplify_levels(read_areas(source))
+    try:
+        write_levels(levels, source, path)
+    except OSError:
+        pass  # read-only deployment, rebuilt on the next start
+    return levels
+
+
+def level_for_zoom(levels: dict[int, dict], zoom: Optional[float]) -> dict:
+    """The level of the largest built zoom <= zoom (the coarsest level if zoom is smaller or unknown)."""
+    candidates = [level for level in levels if zoom is not None and level <= zoom]
+    return levels[max(candidates) if candidates else min(levels)]
+
+
+def with_properties(level: dict, properties: dict[str, dict]) -> dict:
+    """
+    Add per-area properties to a level without copying its geometry.
+
+    Args:
+        level: FeatureCollection from load_levels.
+        properties: Extra properties per price area, e.g. {"NO1": {"quantitymwh": 1.0}}.
+
+    Returns:
+        New FeatureCollection whose features share the geometry objects of level.
+    """
+    features = [{"type": "Feature", "geometry": feature["geometry"],
+                 "properties": {**feature["properties"], **properties.get(feature["properties"][AREA_KEY], {})}}
+                for feature in level["features"]]
+    return {"type": "FeatureCollection", "features": features}
+
+
+class AreaIndex:
+    """
+    Point-in-polygon lookup of the price area of coordinates.
+
+    Every polygon edge is filed under the latitude bands it spans. A point is
+    inside an area if a ray from it towards east crosses an odd number of that
+    area's edges (holes included), and only the edges of the point's band can
+    be crossed. Points are processed in vectorized blocks per band.
+
+    Attributes:
+        areas: Price-area names; locate_many returns positions in this list.
+        bounds: (lat_min, lon_min, lat_max, lon_max) of all areas.
+    """
+
+    def __init__(self, areas: list[Area], bands: int = INDEX_BANDS):
+        self.areas = [name for name, _ in areas]
+        edges, owner = [], []
+        for i, (_, polygons) in enumerate(areas):
+            for polygon in polygons:
+                for ring in polygon:
+                    edges.append(np.hstack([ring, np.roll(ring, -1, axis=0)]))  # lon0, lat0, lon1, lat1
+                    owner.append(np.full(len(ring), i))
+        edges, owner = np.vstack(edges), np.concatenate(owner)
+        keep = edges[:, 1] != edges[:, 3]  # horizontal edges are never crossed
+        edges, owner = edges[keep], owner[keep]
+        lat_lo, lat_hi = np.minimum(edges[:, 1], edges[:, 3]), np.maximum(edges[:, 1], edges[:, 3])
+        lon = edges[:, [0, 2]]
+        self.bounds = (lat_lo.min(), lon.min(), lat_hi.max(), lon.max())
+
+        self._bands = bands
+        self._band_height = (self.bounds[2] - self.bounds[0]) / bands
+        first, last = self._band(lat_lo), self._band(lat_hi)
+        spans = last - first + 1
+        band = np.repeat(first, spans) + np.arange(spans.sum()) - np.repeat(np.cumsum(spans) - spans, spans)
+        order = np.argsort(band, kind="stable")
+        edge = np.repeat(np.arange(len(edges)), spans)[order]
+        self._offsets = np.searchsorted(band[order], np.arange(bands + 1))  # edges of band b: offsets[b]:offsets[b + 1]
+        self._lat_lo, self._lat_hi = lat_lo[edge], lat_hi[edge]
+        self._lon0, self._lat0 = edges[edge, 0], edges[edge, 1]
+        self._slope = (edges[edge, 2] - edges[edge, 0]) / (edges[edge, 3] - edges[edge, 1])  # lon per lat
+        self._owner = np.eye(len(self.areas), dtype=np.float32)[owner[edge]]  # one-hot, crossings @ owner counts per area
+
+    def _band(self, lat: np.ndarray) -> np.ndarray:
+        return np.clip(((lat - self.bounds[0]) / self._band_height).astype(np.int64), 0, self._bands - 1)
+
+    def _inside(self, edges: slice, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        """Whether points are inside each area, shape (..., len(areas)), from the edges of their band."""
+        crosses = ((self._lat_lo[edges] <= lat) & (lat < self._lat_hi[edges])
+                   & (lon < self._lon0[edges] + (lat - self._lat0[edges]) * self._slope[edges]))
+        return (crosses.astype(np.float32) @ self._owner[edges]) % 2 == 1
+
+    def locate_many(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        """
+        Price area of many points.
+
+        Args:
+            lat: Latitudes in degrees.
+            lon: Longitudes in degrees, same shape as lat.
+
+        Returns:
+            Positions in areas, -1 for points outside every area. Same shape as lat.
+        """
+        lat, lon = np.broadcast_arrays(np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64))
+        shape, lat, lon = lat.shape, lat.ravel(), lon.ravel()
+        result = np.full(len(lat), -1, dtype=np.int64)
+        lat_min, lon_min, lat_max, lon_max = self.bounds
+        candidates = np.flatnonzero((lat >= lat_min) & (lat < lat_max) & (lon >= lon_min) & (lon <= lon_max))
+        band = self._band(lat[candidates])
+        order = np.argsort(band, kind="stable")
+        candidates, band = candidates[order], band[order]
+        starts = np.searchsorted(band, np.arange(self._bands + 1))
+
+        for b in np.flatnonzero(np.diff(starts)):
+            edges = slice(self._offsets[b], self._offsets[b + 1])
+            n_edges = edges.stop - edges.start
+            if not n_edges:
+                continue
+            step = max(1, _INDEX_CHUNK // n_edges)
+            for start in range(starts[b], starts[b + 1], step):
+                points = candidates[start:min(start + step, starts[b + 1])]
+                inside = self._inside(edges, lat[points, None], lon[points, None])
+                result[points] = np.where(inside.any(axis=1), inside.argmax(axis=1), -1)
+        return result.reshape(shape)
+
+    def locate(self, lat: float, lon: float) -> Optional[str]:
+        """Price area of one point, None if it is outside every area."""
+        lat_min, lon_min, lat_max, lon_max = self.bounds
+        if not (lat_min <= lat < lat_max and lon_min <= lon <= lon_max):
+            return None
+        b = min(int((lat - lat_min) / self._band_height), self._bands - 1)
+        inside = self._inside(slice(self._offsets[b], self._offsets[b + 1]), lat, lon)
+        return self.areas[int(inside.argmax())] if inside.any() else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simplify the price-area polygons for every map zoom level.")
+    parser.add_argument("--source", default=GEOJSON, help="Full-resolution GeoJSON (default: %(default)s).")
+    parser.add_argument("--out", default=GEODATA_LEVELS, help="Output file (default: %(default)s).")
+    args = parser.parse_args()
+
+    source_size = os.path.getsize(args.source)
+    levels = simplify_levels(read_areas(args.source))
+    write_levels(levels, args.source, args.out)
+    for zoom, level in levels.items():
+        vertices = sum(len(ring) for feature in level["features"] for ring in _rings(feature["geometry"]))
+        size = len(json.dumps(level, separators=(",", ":")))
+        print(f"zoom {zoom:>2}: {vertices:6d} vertices, {size / 1e3:8.1f} kB (source {source_size / 1e3:.1f} kB)")
+
+
+def _rings(geometry: dict) -> list[list]:
+    polygons = geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+    return [ring for polygon in polygons for ring in polygon]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Batch outlier scan of the weather data of every price-area city.
+
+Runs the DCT high-pass/MAD detector and LOF over every (city, feature) pair,
+plus a multivariate LOF over all features of each city, on a process pool and
+writes one compact table of the flagged hours:
+
+    time, location, feature, score, method
+
+score is the distance from the band center in robust standard deviations for
+method 'highpass' and the local outlier factor (> 1 is less dense than the
+neighbours) for 'lof'. The multivariate LOF has feature 'all'. The scan
+parameters and date range are stored in the Parquet metadata, so the page can
+tell whether a stored scan matches what it shows.
+
+Usage:
+    python outlier_scan.py --start 2024-01-01 --end 2024-12-31 [--out data/outliers.parquet]
+"""
+import argparse
+import datetime
+import json
+import os
+import uuid
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from outliers import LofIndex, highpass_outliers
+from utilities import process_pool
+
+OUTLIER_TABLE = os.environ.get("OUTLIER_TABLE", "data/outliers.parquet")
+OUTLIER_COLUMNS = ["time", "location", "feature", "score", "method"]
+ALL_FEATURES = "all"  # feature label of the multivariate LOF
+DEFAULT_PARAMS = {"cutoff": 50, "nstd": 2.0, "n_neighbors": 20, "contamination": 0.01}
+
+
+def _flagged(times: np.ndarray, mask: np.ndarray, score: np.ndarray, location: str, feature: str,
+             method: str) -> pd.DataFrame:
+    """Rows of the outlier table for the flagged positions."""
+    return pd.DataFrame({"time": times[mask], "location": location, "feature": feature,
+                         "score": score[mask].astype(np.float32), "method": method})
+
+
+def scan_series(location: str, feature: str, times: np.ndarray, values: np.ndarray, cutoff: int = 50,
+                nstd: float = 2.0, n_neighbors: int = 20, contamination: float = 0.01) -> pd.DataFrame:
+    """
+    Run both detectors on one series.
+
+    Args:
+        location: City name.
+        feature: Feature name, or ALL_FEATURES for a multivariate (n, d) values array.
+        times: Timestamps of the values.
+        values: Shape (n,) for one feature, (n, d) for several (LOF only, standardized).
+        cutoff: Cutoff frequency of the high-pass filter.
+        nstd: Band width of the high-pass detector in robust standard deviations.
+        n_neighbors: Number of LOF neighbours.
+        contamination: Expected proportion of LOF outliers.
+
+    Returns:
+        Outlier table rows of this series.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values.reshape(len(values), -1)).any(axis=1)
+    times, values = np.asarray(times)[valid], values[valid]
+    if len(values) <= n_neighbors:
+        return pd.DataFrame(columns=OUTLIER_COLUMNS)
+
+    found = []
+    if values.ndim == 1:
+        score, mask, _ = highpass_outliers(values, cutoff, nstd)
+        found.append(_flagged(times, mask, score, location, feature, "highpass"))
+    else:
+        std = values.std(axis=0)
+        values = (values - values.mean(axis=0)) / np.where(std > 0, std, 1.0)
+    index = LofIndex(values, k_max=n_neighbors)
+    labels, _ = index.predict(index.k_max, contamination)
+    found.append(_flagged(times, labels == -1, -index.negative_outlier_factor(index.k_max), location, feature, "lof"))
+    return pd.concat(found, ignore_index=True)
+
+
+def scan(weather: dict[str, pd.DataFrame], features: Optional[list[str]] = None, multivariate: bool = True,
+         max_workers: Optional[int] = None, **params) -> pd.DataFrame:
+    """
+    Scan every (city, feature) series on a process pool.
+
+    Args:
+        weather: Weather data indexed by time, per city.
+        features: Features to scan. Defaults to all columns.
+        multivariate: Whether to add a LOF over all features of each city.
+        max_workers: Number of worker processes. Defaults to the number of cores.
+        **params: Detector parameters, see scan_series and DEFAULT_PARAMS.
+
+    Returns:
+        Outlier table sorted by location, feature, method and time.
+    """
+    params = {**DEFAULT_PARAMS, **params}
+    tasks = []
+    for location, df in weather.items():
+        if df.empty:
+            continue
+        columns = features or df.columns.tolist()
+        times = df.index.to_numpy()
+        tasks += [(location, feature, times, df[feature].to_numpy()) for feature in columns]
+        if multivariate and len(columns) > 1:
+            tasks.append((location, ALL_FEATURES, times, df[columns].to_numpy()))
+    if not tasks:
+        return pd.DataFrame(columns=OUTLIER_COLUMNS)
+
+    with process_pool(min(max_workers or os.cpu_count() or 1, len(tasks))) as executor:
+        futures = [executor.submit(scan_series, *task, **params) for task in tasks]
+        table = pd.concat([future.result() for future in futures], ignore_index=True)
+    for column in ["location", "feature", "method"]:
+        table[column] = table[column].astype("category")
+    return table.sort_values(["location", "feature", "method", "time"], ignore_index=True)
+
+
+def load_weather(cities: list[str], dates: tuple[datetime.datetime, datetime.datetime]) -> dict[str, pd.DataFrame]:
+    """Load the weather data of every city with the page loaders (disk cache, concurrent fetches)."""
+    from utilities import extract_coordinates, get_weather_data
+
+    return {city: get_weather_data(coordinates=extract_coordinates(city), dates=dates, set_time_index=True)
+            for city in cities}
+
+
+def write_table(table: pd.DataFrame, params: dict, path: str = OUTLIER_TABLE) -> None:
+    """
+    Write the outlier table with the scan parameters in the file metadata.
+
+    The table is written to a temporary file that replaces the old one, so a
+    page reading it meanwhile sees either the old or the new scan.
+
+    Args:
+        table: Result of scan.
+        params: Scan parameters, including 'start' and 'end' of the scanned range.
+        path: Output file.
+    """
+    arrow = pa.Table.from_pandas(table, preserve_index=False)
+    metadata = {**(arrow.schema.metadata or {}), b"outlier_scan": json.dumps(params, default=str).encode()}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    pq.write_table(arrow.replace_schema_metadata(metadata), tmp)
+    os.replace(tmp, path)
+
+
+def read_table(
+    path: str = OUTLIER_TABLE,
+    location: Optional[str] = None,
+    feature: Optional[str] = None,
+    method: Optional[str] = None,
+) -> Optional[tuple[pd.DataFrame, dict]]:
+    """
+    Read (part of) a stored outlier table.
+
+    Args:
+        path: Table written by write_table.
+        location: Only rows of this city.
+        feature: Only rows of this feature.
+        method: Only rows of this method.
+
+    Returns:
+        Tuple of (rows, scan parameters), or None if no scan has been written.
+    """
+    if not os.path.exists(path):
+        return None
+    filters = [(name, "==", value) for name, value in
+               [("location", location), ("feature", feature), ("method", method)] if value is not None]
+    table = pq.read_table(path, filters=filters or None)
+    params = json.loads((table.schema.metadata or {}).get(b"outlier_scan", b"{}"))
+    return table.to_pandas(), params
+
+
+def main() -> None:
+    from utilities import CITIES
+
+    parser = argparse.ArgumentParser(description="Scan the weather data of the price-area cities for outliers.")
+    parser.add_argument("--start", default="2024-01-01", help="First day of data (default: %(default)s).")
+    parser.add_argument("--end", default="2024-12-31", help="Last day of data (default: %(default)s).")
+    parser.add_argument("--cities", nargs="+", default=list(CITIES), choices=list(CITIES))
+    parser.add_argument("--features", nargs="+", default=None, help="Features to scan (default: all).")
+    parser.add_argument("--cutoff", type=int, default=DEFAULT_PARAMS["cutoff"])
+    parser.add_argument("--nstd", type=float, default=DEFAULT_PARAMS["nstd"])
+    parser.add_argument("--n-neighbors", type=int, default=DEFAULT_PARAMS["n_neighbors"])
+    parser.add_argument("--contamination", type=float, default=DEFAULT_PARAMS["contamination"])
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes.")
+    parser.add_argument("--out", default=OUTLIER_TABLE, help="Output file (default: %(default)s).")
+    args = parser.parse_args()
+
+    dates = (pd.Timestamp(args.start).to_pydatetime(), pd.Timestamp(args.end).to_pydatetime())
+    params = {"cutoff": args.cutoff, "nstd": args.nstd, "n_neighbors": args.n_neighbors,
+              "contamination": args.contamination}
+    table = scan(load_weather(args.cities, dates), features=args.features, max_workers=args.workers, **params)
+    write_table(table, {**params, "start": args.start, "end": args.end}, args.out)
+    print(table.groupby(["location", "method"], observed=True).size().unstack(fill_value=0).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+Local Outlier Factor engine.
+
+The k_max nearest neighbours of every observation are found once and kept, so
+the LOF for any n_neighbors <= k_max is a few vectorized array operations
+instead of a refit. For a single feature the neighbours come from the sorted
+values (the k nearest neighbours of a value are among the k values on either
+side of it); for several features from a KD-tree.
+
+Scores follow sklearn's LocalOutlierFactor: negative_outlier_factor is -LOF,
+and with a contamination c the observations below its c-quantile are outliers.
+StreamingLof scores new observations against a fitted reference window
+(sklearn's novelty mode) and only rebuilds the index every refit_every
+observations.
+
+highpass_outliers is the DCT high-pass + MAD detector of the weather_lof page.
+HighPassSpectrum keeps the DCT of a series so the detector can be re-run for
+another cutoff without transforming the series again: the low band of a nearby
+cached cutoff is corrected by the few cosines in between, and the scores of a
+cutoff are kept so a new nstd is only a comparison.
+"""
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+from scipy.fft import dct, idct
+from scipy.spatial import cKDTree
+from scipy.stats import median_abs_deviation
+
+K_MAX = 100  # largest n_neighbors offered on the page
+_CHUNK = 4096  # rows per block in the 1-D neighbour search
+_BAND_MAX = 8  # largest cutoff step summed as cosines, larger steps use an inverse DCT
+
+
+def calc_highpass(data: np.ndarray, cutoff: int) -> np.ndarray:
+    """
+    Apply high-pass filter using discrete cosine transform.
+
+    Args:
+        data: Input data array.
+        cutoff: Cutoff frequency for the high-pass filter.
+
+    Returns:
+        Filtered data array.
+    """
+    norm = None
+    fourier = dct(data, norm=norm)
+    satv = fourier.copy()
+    f = np.arange(0, len(satv))
+    satv[f < cutoff] = 0  # High-pass filter
+    return idct(satv, norm=norm)
+
+
+def highpass_outliers(values: np.ndarray, cutoff: int = 50, nstd: float = 2.0) -> tuple[np.ndarray, np.ndarray, float]:
+    """
+    Flag values whose high-frequency part is far from the bulk, in robust standard deviations.
+
+    The robust standard deviation is 1.4826 × MAD of the high-pass component
+    and the band is centered on the MAD, as on the weather_lof page.
+
+    Args:
+        values: Evenly spaced values without missing values.
+        cutoff: Cutoff frequency for the high-pass filter.
+        nstd: Width of the band in robust standard deviations.
+
+    Returns:
+        Tuple of (score, outlier mask, robust std). score is the distance from
+        the band center in robust standard deviations; outliers have |score| > nstd.
+    """
+    return HighPassSpectrum(values).threshold(cutoff, nstd)
+
+
+def _idct_weights(n: int, norm: Optional[str]) -> tuple[float, float]:
+    """Weight of cosine 0 and of the other cosines in scipy's inverse DCT-II of length n."""
+    if norm == "ortho":
+        return np.sqrt(1.0 / n), np.sqrt(2.0 / n)
+    if norm == "forward":
+        return 1.0, 2.0
+    return 1.0 / (2 * n), 1.0 / n
+
+
+class HighPassSpectrum:
+    """
+    DCT spectrum of one series, queried for the high-pass detector at any cutoff.
+
+    The low band (coefficients below the cutoff) of every queried cutoff is kept
+    in a small LRU store together with the scores of the detector. A cutoff
+    within _BAND_MAX of a stored one is reconstructed from it by adding or
+    removing the cosines in between, otherwise by one inverse DCT. Safe to share
+    between threads (sessions).
+
+    Attributes:
+        values: The series, float64.
+        norm: Normalization of the DCT, as scipy.fft.dct.
+        coefficients: DCT-II coefficients of values.
+    """
+
+    def __init__(self, values: np.ndarray, norm: Optional[str] = None, max_cached: int = 16):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.norm = norm
+        self.coefficients = dct(self.values, norm=norm)
+        self.max_cached = max_cached
+        n = len(self.values)
+        self._weights = _idct_weights(n, norm)
+        self._angles = np.pi * (2 * np.arange(n) + 1) / (2 * n)
+        self._store: OrderedDict[int, tuple[np.ndarray, np.ndarray, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _band(self, lo: int, hi: int) -> np.ndarray:
+        """Sum of the inverse-DCT cosines lo <= k < hi."""
+        band = np.zeros(len(self.values))
+        for k in range(lo, hi):
+            band += self._weights[k > 0] * self.coefficients[k] * np.cos(k * self._angles)
+        return band
+
+    def _lowpass(self, cutoff: int) -> np.ndarray:
+        """Low band of a cutoff, from the nearest stored cutoff or an inverse DCT."""
+        nearest = min([0, *self._store], key=lambda c: abs(c - cutoff))
+        if abs(cutoff - nearest) <= _BAND_MAX:
+            base = self._store[nearest][0] if nearest else np.zeros(len(self.values))
+            if cutoff >= nearest:
+                return base + self._band(nearest, cutoff)
+            return base - self._band(cutoff, nearest)
+        low = self.coefficients.copy()
+        low[cutoff:] = 0
+        return idct(low, norm=self.norm)
+
+    def _entry(self, cutoff: int) -> tuple[np.ndarray, np.ndarray, float]:
+        cutoff = int(np.clip(cutoff, 0, len(self.values)))
+        with self._lock:
+            if cutoff in self._store:
+                self._store.move_to_end(cutoff)
+                return self._store[cutoff]
+            lowpass = self._lowpass(cutoff)
+            satv = self.values - lowpass
+            mad = median_abs_deviation(satv)
+            std_robust = 1.4826 * mad
+            with np.errstate(divide="ignore", invalid="ignore"):
+                score = (satv - mad) / std_robust
+            self._store[cutoff] = (lowpass, score, float(std_robust))
+            if len(self._store) > self.max_cached:
+                self._store.popitem(last=False)
+            return self._store[cutoff]
+
+    def lowpass(self, cutoff: int) -> np.ndarray:
+        """Low-frequency part of the series (coefficients below cutoff)."""
+        return self._entry(cutoff)[0]
+
+    def highpass(self, cutoff: int) -> np.ndarray:
+        """High-pass filtered series, as calc_highpass."""
+        return self.values - self.lowpass(cutoff)
+
+    def threshold(self, cutoff: int, nstd: float) -> tuple[np.ndarray, np.ndarray, float]:
+        """
+        Run the high-pass detector.
+
+        Args:
+            cutoff: Cutoff frequency for the high-pass filter.
+            nstd: Width of the band in robust standard deviations.
+
+        Returns:
+            Tuple of (score, outlier mask, robust std), as highpass_outliers.
+        """
+        _, score, std_robust = self._entry(cutoff)
+        return score, np.abs(score) > nstd, std_robust
+
+
+def _sorted_neighbours(sorted_values: np.ndarray, ranks: np.ndarray, queries: np.ndarray, k: int,
+                       exclude_self: bool) -> tuple[np.ndarray, np.ndarray]:
+    """
+    k nearest neighbours of queries among sorted values.
+
+    Args:
+        sorted_values: Reference values in ascending order.
+        ranks: For each query, its position in sorted_values (exclude_self) or
+            its insertion point (otherwise).
+        queries: Query values.
+        k: Number of neighbours.
+        exclude_self: Whether each query is the reference value at its rank.
+
+    Returns:
+        Tuple of (distances, positions in sorted_values), both (len(queries), k) in ascending distance.
+    """
+    n = len(sorted_values)
+    if exclude_self:
+        offsets = np.concatenate([np.arange(-k, 0), np.arange(1, k + 1)])
+    else:
+        offsets = np.arange(-k, k)
+    cand = ranks[:, None] + offsets
+    valid = (cand >= 0) & (cand < n)
+    cand = np.clip(cand, 0, n - 1)
+    dist = np.where(valid, np.abs(sorted_values[cand] - queries[:, None]), np.inf)
+    part = np.argpartition(dist, k - 1, axis=1)[:, :k]
+    dist, cand = np.take_along_axis(dist, part, 1), np.take_along_axis(cand, part, 1)
+    order = np.argsort(dist, axis=1, kind="stable")
+    return np.take_along_axis(dist, order, 1), np.take_along_axis(cand, order, 1)
+
+
+class LofIndex:
+    """
+    Neighbour index of a feature set, queried for LOF scores at any k <= k_max.
+
+    Attributes:
+        X: Fitted observations, shape (n, d).
+        k_max: Number of neighbours kept per observation.
+        distances: Distance to the k_max nearest neighbours, shape (n, k_max), ascending.
+        neighbours: Row numbers of those neighbours, shape (n, k_max).
+    """
+
+    def __init__(self, X: np.ndarray, k_max: int = K_MAX):
+        X = np.asarray(X, dtype=np.float64)
+        self.X = X.reshape(len(X), -1)
+        n = len(self.X)
+        if n < 2:
+            raise ValueError("LOF needs at least two observations")
+        self.k_max = min(k_max, n - 1)
+        if self.X.shape[1] == 1:
+            values = self.X[:, 0]
+            self._order = np.argsort(values, kind="stable")
+            self._sorted = values[self._order]
+            self._tree = None
+            dist = np.empty((n, self.k_max))
+            nbrs = np.empty((n, self.k_max), dtype=np.int64)
+            for start in range(0, n, _CHUNK):
+                ranks = np.arange(start, min(start + _CHUNK, n))
+                d, pos = _sorted_neighbours(self._sorted, ranks, self._sorted[ranks], self.k_max, exclude_self=True)
+                dist[self._order[ranks]], nbrs[self._order[ranks]] = d, self._order[pos]
+        else:
+            self._tree = cKDTree(self.X)
+            dist, nbrs = self._tree.query(self.X, k=self.k_max + 1)
+            keep = nbrs != np.arange(n)[:, None]  # drop each point itself (not always column 0 with duplicates)
+            keep[keep.all(axis=1), -1] = False
+            dist, nbrs = dist[keep].reshape(n, self.k_max), nbrs[keep].reshape(n, self.k_max)
+        self.distances, self.neighbours = dist, nbrs
+        self._lrd: dict[int, np.ndarray] = {}
+
+    def _check_k(self, k: int) -> int:
+        if not 1 <= k <= self.k_max:
+            raise ValueError(f"n_neighbors must be between 1 and {self.k_max}")
+        return k
+
+    def lrd(self, k: int) -> np.ndarray:
+        """Local reachability density of every fitted observation for k neighbours."""
+        k = self._check_k(k)
+        if k not in self._lrd:
+            reach = np.maximum(self.distances[:, :k], self.distances[self.neighbours[:, :k], k - 1])
+            self._lrd[k] = 1.0 / (reach.mean(axis=1) + 1e-10)
+        return self._lrd[k]
+
+    def negative_outlier_factor(self, k: int) -> np.ndarray:
+        """-LOF of every fitted observation (lower is more abnormal), as sklearn's negative_outlier_factor_."""
+        lrd = self.lrd(k)
+        return -lrd[self.neighbours[:, :k]].mean(axis=1) / lrd
+
+    def predict(self, k: int, contamination: float) -> tuple[np.ndarray, float]:
+        """
+        Label the fitted observations.
+
+        Args:
+            k: Number of neighbours.
+            contamination: Expected proportion of outliers.
+
+        Returns:
+            Tuple of (labels, offset) with 1 for inliers and -1 for outliers, as sklearn's fit_predict and offset_.
+        """
+        scores = self.negative_outlier_factor(k)
+        offset = float(np.percentile(scores, 100.0 * contamination))
+        return np.where(scores < offset, -1, 1), offset
+
+    def kneighbors(self, X_new: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Distances and row numbers of the k nearest fitted observations of new observations."""
+        X_new = np.asarray(X_new, dtype=np.float64).reshape(-1, self.X.shape[1])
+        k = self._check_k(k)
+        if self._tree is not None:
+            dist, nbrs = self._tree.query(X_new, k=k)
+            return dist.reshape(len(X_new), k), nbrs.reshape(len(X_new), k)
+        queries = X_new[:, 0]
+        dist, pos = _sorted_neighbours(self._sorted, np.searchsorted(self._sorted, queries), queries, k,
+                                       exclude_self=False)
+        return dist, self._order[pos]
+
+    def score_samples(self, X_new: np.ndarray, k: int) -> np.ndarray:
+        """-LOF of new observations relative to the fitted ones, as sklearn's score_samples with novelty=True."""
+        dist, nbrs = self.kneighbors(X_new, k)
+        reach = np.maximum(dist, self.distances[nbrs, k - 1])
+        lrd_new = 1.0 / (reach.mean(axis=1) + 1e-10)
+        return -self.lrd(k)[nbrs].mean(axis=1) / lrd_new
+
+
+class StreamingLof:
+    """
+    Sliding-window LOF for observations that arrive over time.
+
+    New observations are scored against the reference window without touching
+    the index. They are buffered and the reference window (the last `window`
+    observations) is re-indexed once refit_every observations have arrived.
+
+    Attributes:
+        index: LofIndex of the current reference window.
+        k: Number of neighbours in use, n_neighbors clamped to the size of the
+            reference window (like sklearn's LocalOutlierFactor).
+        offset: Score threshold of the reference window; new scores below it are outliers.
+    """
+
+    def __init__(self, reference: np.ndarray, n_neighbors: int = 20, contamination: float = 0.01,
+                 window: Optional[int] = None, refit_every: int = 24 * 7):
+        self.n_neighbors = n_neighbors
+        self.contamination = contamination
+        self.window = window
+        self.refit_every = refit_every
+        reference = np.asarray(reference, dtype=np.float64)
+        self._reference = reference.reshape(len(reference), -1)
+        self._buffer: list[np.ndarray] = []
+        self._fit()
+
+    def _fit(self) -> None:
+        if self.window is not None:
+            self._reference = self._reference[-self.window:]
+        self.index = LofIndex(self._reference, k_max=self.n_neighbors)
+        self.k = self.index.k_max
+        _, self.offset = self.index.predict(self.k, self.contamination)
+
+    def update(self, X_new: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Score new observations and add them to the stream.
+
+        Args:
+            X_new: New observations, shape (m,) or (m, d).
+
+        Returns:
+            Tuple of (scores, labels) with labels 1 for inliers and -1 for outliers.
+        """
+        X_new = np.asarray(X_new, dtype=np.float64).reshape(-1, self._reference.shape[1])
+        scores = self.index.score_samples(X_new, self.k)
+        self._buffer.append(X_new)
+        if sum(len(block) for block in self._buffer) >= self.refit_every:
+            self._reference = np.concatenate([self._reference, *self._buffer])
+            self._buffer = []
+            self._fit()
+        return scores, np.where(scores < self.offset, -1, 1)
@@ -9,15 +9,64 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from utilities import (
-    init, sidebar_setup, get_elhub_data, init_connection,
-    el_sidebar, get_weather_data, extract_coordinates
+    init, sidebar_setup, get_aligned_dataset, init_connection,
+    el_sidebar, extract_coordinates
 )
+from correlation import lagged_rolling_corr, best_lag
+from datasets import DatasetHandle, HASH_FUNCS
 from plotly import subplots
 import plotly.graph_objects as go
+from plotting import scatter
 
 # =========================================
 #          FUNCTION DEFINITIONS & SETUP
 # =========================================
+MAX_LAG = 10000
+LAG_STEP = 10
+SURFACE_COLS = 1000 #time steps kept of the lag × time surface
+
+
+@st.cache_data(max_entries=16, show_spinner="Computing lagged correlations...", hash_funcs=HASH_FUNCS)
+def corr_surface(dataset: DatasetHandle, el_col: str, weather_col: str, window: int) -> tuple:
+    """
+    Rolling correlation between x shifted by every selectable lag and y, at every stride-th time step.
+
+    Args:
+        dataset: Handle of the joined electricity and weather data.
+        el_col: Electricity column (x, shifted by the lag).
+        weather_col: Weather column (y).
+        window: Window length in hours.
+
+    Returns:
+        Tuple of (lags, stride, correlation surface of shape (lags, time / stride),
+        best lag per kept time step, correlation at the best lag).
+    """
+    x, y = dataset.data[el_col], dataset.data[weather_col]
+    lags = np.arange(0, min(MAX_LAG, len(x) - 1) + 1, LAG_STEP)
+    stride = max(1, len(x) // SURFACE_COLS)
+    surface = lagged_rolling_corr(x.to_numpy(), y.to_numpy(), lags, window, time_stride=stride)
+    best, best_corr = best_lag(surface, lags)
+    return lags, stride, surface, best, best_corr
+
+
+@st.cache_data(max_entries=64, hash_funcs=HASH_FUNCS)
+def corr_at_lag(dataset: DatasetHandle, el_col: str, weather_col: str, window: int, lag: int) -> np.ndarray:
+    """
+    Rolling correlation between x shifted by one lag and y, at every time step.
+
+    Args:
+        dataset: Handle of the joined electricity and weather data.
+        el_col: Electricity column (x, shifted by the lag).
+        weather_col: Weather column (y).
+        window: Window length in hours.
+        lag: Lag in hours.
+
+    Returns:
+        Correlation per time step.
+    """
+    x, y = dataset.data[el_col], dataset.data[weather_col]
+    return lagged_rolling_corr(x.to_numpy(), y.to_numpy(), [lag], window)[0]
+
 st.set_page_config(
     page_title="Map Selection",
     page_icon="🗺️",
@@ -38,38 +87,32 @@ city = st.session_state.get("location",{}).get("city", None)
 price_area = st.session_state.get("location",{}).get("price_area", "NO1")
 
 #st.json(st.session_state)
-df_el = get_elhub_data(st.session_state["client"],
-                       dataset=st.session_state.group.get("name"),
-                       dates = st.session_state.dates,
-                       filter_group=True,
-                       aggregate_group=True)
-
-
-df_w = get_weather_data(coordinates=coordinates, dates = st.session_state.dates, set_time_index=True)
+merged = get_aligned_dataset(st.session_state["client"],
+                             dataset=st.session_state.group.get("name"),
+                             groups=st.session_state.group.get("values"),
+                             coordinates=coordinates,
+                             dates=st.session_state.dates) #joined once per selection on an hourly UTC grid
+df_merged = merged.data
+weather_cols = df_merged.columns.drop("quantitykwh").tolist()
 
 
 cols = st.columns(2)
 with cols[0]:
-    weather_col = st.selectbox("Select weather variable", options=df_w.columns.tolist(), index=1)
-    df_w = df_w[[weather_col]]
+    weather_col = st.selectbox("Select weather variable", options=weather_cols, index=1)
 with cols[1]:
-    el_col = st.selectbox("Select electricity variable", options=df_el.columns.tolist(), index=0)
-
-
-df_merged = pd.merge_asof(df_el.sort_index(), df_w.sort_index(), 
-                          left_index=True, right_index=True, 
-                          direction="nearest", )
+    el_col = st.selectbox("Select electricity variable", options=["quantitykwh"], index=0)
 
 # =========================================
 #                   CALCULATE
 # =========================================
 
-lag = st.slider("Select lag (hours)", min_value=0, max_value=10000, value=0, step=10)
+lag = st.slider("Select lag (hours)", min_value=0, max_value=MAX_LAG, value=0, step=LAG_STEP)
 time = st.select_slider("Select time", options=df_merged.index.tolist(), value=df_merged.index[len(df_merged)//2])
 window = st.slider("Window length (days)", min_value=1, max_value=365, value=30, step=1)*24
 
-rolling_corr = df_merged[el_col].shift(lag).rolling(window, center=True).corr(df_merged[weather_col])
-
+lags, stride, surface, best, best_corr = corr_surface(merged, el_col, weather_col, window) #all lags at once, strided in time
+rolling_corr = pd.Series(corr_at_lag(merged, el_col, weather_col, window, lag) if lag < len(df_merged) else np.nan,
+                         index=df_merged.index)
 
 center_idx = df_merged.index.get_loc(time)
 half_window = window // 2
@@ -82,22 +125,22 @@ fig = subplots.make_subplots(rows=3, cols=1, shared_xaxes=True)
 #           PLOTTING
 # =================================
 
-fig.add_trace(go.Scatter(x=df_merged.index, y=df_merged[el_col], 
+fig.add_trace(scatter(x=df_merged.index, y=df_merged[el_col], 
                          name=el_col, line=dict(color='lightgray')), row=1, col=1)
-fig.add_trace(go.Scatter(x=df_merged.index[start_idx+lag:end_idx+lag], 
+fig.add_trace(scatter(x=df_merged.index[start_idx+lag:end_idx+lag], 
                          y=df_merged[el_col].iloc[start_idx+lag:end_idx+lag], 
                          name=f'{el_col} shifted (used)', 
                          line=dict(color='red', width=3)), row=1, col=1)
 
-fig.add_trace(go.Scatter(x=df_merged.index, y=df_merged[weather_col], 
+fig.add_trace(scatter(x=df_merged.index, y=df_merged[weather_col], 
                          name=weather_col, line=dict(color='lightgray')), row=2, col=1)
-fig.add_trace(go.Scatter(x=df_merged.index[start_idx:end_idx], 
+fig.add_trace(scatter(x=df_merged.index[start_idx:end_idx], 
                          y=df_merged[weather_col].iloc[start_idx:end_idx], 
                          name=f'{weather_col} (used)', 
                          line=dict(color='blue', width=3)), row=2, col=1)
 
 # Plot 3: Rolling correlation
-fig.add_trace(go.Scatter(x=rolling_corr.index, y=rolling_corr, 
+fig.add_trace(scatter(x=rolling_corr.index, y=rolling_corr, 
                          name=f'Correlation (lag={lag}h)'), row=3, col=1)
 fig.add_vline(x=df_merged.index[center_idx], line_dash="dash", line_color="green", row=3, col=1)
 
@@ -106,6 +149,24 @@ fig.update_yaxes(title_text=weather_col, row=2, col=1)
 fig.update_yaxes(title_text="Correlation", row=3, col=1)
 st.plotly_chart(fig)
 
+# =================================
+#        LAG × TIME SURFACE
+# =================================
+col_idx = center_idx // stride #nearest kept time step of the surface
+best_now = best[col_idx]
+if not np.isnan(best_now):
+    st.markdown(f"**Strongest correlation at {df_merged.index[col_idx * stride]}:** {best_corr[col_idx]:.2f} at lag {best_now:.0f} h")
+
+fig = go.Figure()
+fig.add_trace(go.Heatmap(x=df_merged.index[::stride], y=lags, z=surface,
+                         colorscale="RdBu", zmin=-1, zmax=1, colorbar=dict(title="Correlation")))
+fig.add_trace(go.Scatter(x=df_merged.index[::stride], y=best, mode="lines",
+                         name="Best lag", line=dict(color="black", width=1)))
+fig.add_trace(go.Scatter(x=[df_merged.index[center_idx]], y=[lag], mode="markers",
+                         name="Selected", marker=dict(color="green", size=10, symbol="x")))
+fig.update_layout(xaxis_title="Time", yaxis_title="Lag (hours)")
+st.plotly_chart(fig)
+
 with st.expander("Data sources"):
     st.write(f'Meteo API https://archive-api.open-meteo.com')
     st.write(f'Elhub API https://api.elhub.no')
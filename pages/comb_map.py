@@ -6,14 +6,17 @@ and performs snow drift calculations based on meteorological data.
 """
 import streamlit as st
 import pandas as pd
+import numpy as np
 import folium
-import json
+import branca.colormap
 from streamlit_folium import st_folium
 import os
 from typing import Optional
+from geodata import GEOJSON, AreaIndex, level_for_zoom, load_levels, read_areas, with_properties
+from weather_cache import snap_to_tile
 from utilities import (
-    init, sidebar_setup, get_elhub_data, init_connection,
-    el_sidebar, get_weather_data, extract_coordinates
+    init, sidebar_setup, get_elhub_rollup, init_connection,
+    el_sidebar, get_weather_dataset, extract_coordinates
 )
 from Snow_drift import snowdrift
 import matplotlib.pyplot as plt
@@ -23,37 +26,53 @@ from matplotlib.colors import Normalize
 # =================================
 #          FUNCTION DEFINITIONS
 # =================================
-@st.cache_data(ttl=600)
-def load_geodata(dfg: pd.DataFrame) -> Optional[dict]:
+@st.cache_resource
+def geodata_levels() -> dict[int, dict]:
     """
-    Load and enrich GeoJSON data with electricity quantity values.
+    Load the price-area polygons simplified for every zoom level.
+
+    Returns:
+        Mapping of zoom level to GeoJSON FeatureCollection.
+    """
+    return load_levels(GEOJSON)
+
+
+@st.cache_resource
+def area_index() -> AreaIndex:
+    """
+    Build the point-in-polygon index of the full-resolution price areas.
+
+    Returns:
+        Index that maps coordinates to their price area.
+    """
+    return AreaIndex(read_areas(GEOJSON))
+
+
+def load_geodata(dfg: pd.DataFrame, zoom: Optional[float] = None) -> Optional[dict]:
+    """
+    Load the GeoJSON data of a zoom level and enrich it with electricity quantity values.
 
     Args:
         dfg: DataFrame with electricity data grouped by price area.
+        zoom: Current zoom level of the map.
 
     Returns:
         GeoJSON dictionary with enriched properties, or None if file not found.
     """
     try:
-        with open("data/file.geojson") as f:
-            gj = json.load(f)
+        levels = geodata_levels()
     except FileNotFoundError:
         st.error("GeoJSON file not found.")
         return None
     except Exception as e:
         st.error(f"An error occurred while loading the GeoJSON file: {e}")
         return None
-    
-    for feature in gj.get("features", []):
-        label = feature.get("properties", {}).get('ElSpotOmr','').replace(" ","")
-        feature.get("properties", {})['ElSpotOmr'] = label
-        kwh = dfg.loc[dfg['pricearea'] == label, 'quantitymwh'].values
-        if len(kwh) > 0:
-            feature['properties']['quantitymwh'] = float(kwh[0])
-        else:
-            feature['properties']['quantitymwh'] = 0.0
-
-    return gj
+
+    level = level_for_zoom(levels, zoom)
+    mwh = dfg.set_index("pricearea")["quantitymwh"]
+    properties = {feature["properties"]["ElSpotOmr"]: {"quantitymwh": float(mwh.get(feature["properties"]["ElSpotOmr"], 0.0))}
+                  for feature in level["features"]}
+    return with_properties(level, properties) #geometry is shared, only the properties are new
     
 def get_color(value: float) -> str:
     """
@@ -69,55 +88,45 @@ def get_color(value: float) -> str:
     return '#{:02x}{:02x}{:02x}'.format(int(rgba[0]*255), int(rgba[1]*255), int(rgba[2]*255))
 
 
-def load_map(gj: dict, coordinates: Optional[tuple[float, float]] = None) -> folium.Map:
+def load_map(gj: dict, coordinates: Optional[tuple[float, float]] = None, zoom: int = 4) -> folium.Map:
     """
     Create a Folium map with electricity data overlays.
 
     Args:
         gj: GeoJSON data for price areas.
         coordinates: Tuple of (latitude, longitude) for map center.
+        zoom: Initial zoom level.
 
     Returns:
         Folium Map object with choropleth and markers.
     """    
-    m = folium.Map(location=coordinates, zoom_start=4,tiles='CartoDB positron') #create map
+    m = folium.Map(location=coordinates, zoom_start=zoom,tiles='CartoDB positron') #create map
+
+    def style(feature: dict) -> dict:
+        selected = price_area == feature['properties']['ElSpotOmr']
+        return {
+            'fillColor': get_color(feature['properties']['quantitymwh']),
+            'fillOpacity': 0.7,
+            'color': 'black',
+            'weight': 3 if selected else 1,
+            'opacity': 1.0 if selected else 0.2,
+        }
 
-    folium.Choropleth(
-                geo_data=gj,
+    folium.GeoJson(
+                gj,
                 name='Production',
-                data=dfg,
-                columns=['pricearea', 'quantitymwh'],
-                key_on='feature.properties.ElSpotOmr',
-                fill_color=colormap.name,
-                fill_opacity=0.7,
-                line_opacity=0.2,
-                line_color='black',
-                legend_name='Average MWh',
+                style_function=style, #one layer, the selected area is drawn with a thicker border
                 popup=folium.features.GeoJsonPopup(
                     fields=['ElSpotOmr', 'quantitymwh'],
-                    aliases=['Price Area', 'MWh']
-                )
-            ).add_to(m)
-    
-    folium.GeoJson(
-                gj,
+                    aliases=['Price Area', 'MWh']),
                 tooltip=folium.features.GeoJsonTooltip(
                     fields=['ElSpotOmr', 'quantitymwh'],
                     aliases=['Price Area', 'MWh'])
             ).add_to(m)
-    for feature in gj.get("features", []):
-        if price_area == feature['properties']['ElSpotOmr'].replace(" ",""):
-            folium.GeoJson(
-                feature,
-                style_function=lambda x,: {
-                    'fillColor': colormap.name,
-                    'color': "black",
-                    'weight': 3,
-                    'fillOpacity': 0.4,
-                },
-                tooltip=folium.features.GeoJsonTooltip(
-                    fields=['ElSpotOmr', 'quantitymwh'],
-                    aliases=['Price Area', 'MWh'])
+    branca.colormap.LinearColormap(
+                [get_color(v) for v in np.linspace(norm.vmin, norm.vmax, 6)],
+                vmin=norm.vmin, vmax=norm.vmax,
+                caption='Average MWh'
             ).add_to(m)
 
     lat, lon = coordinates
@@ -134,18 +143,20 @@ def update_location() -> None:
     """
     Update session state with the selected location from the map click.
 
-    This callback function extracts coordinates and price area from the map
-    interaction and updates the session state.
+    This callback function looks up the price area of the clicked coordinates
+    and updates the session state. Coordinates are snapped to the weather
+    cache tile, so nearby clicks share cached weather data.
     """
     try:
-        prop = st.session_state.get("my_map",{}).get("last_active_drawing",{}).get("properties",{})
         coor = st.session_state.get("my_map",{}).get("last_clicked",{})
         lat,lon = coor.get("lat"), coor.get("lng")
-        selected_coordinates = (lat,lon)    
-        if prop and selected_coordinates != (None,None):
-            st.session_state.location.update({"coordinates": selected_coordinates,
+        if (lat,lon) == (None,None):
+            return
+        area = area_index().locate(lat, lon) #None outside the price areas
+        if area:
+            st.session_state.location.update({"coordinates": snap_to_tile(lat, lon),
                                       "city": None,
-                                      "price_area": prop.get("ElSpotOmr","").replace(" ","")})
+                                      "price_area": area})
         
         
     except (AttributeError, TypeError) as e:
@@ -176,9 +187,10 @@ coordinates = st.session_state.get("location",{}).get("coordinates", None)
 city = st.session_state.get("location",{}).get("city", None)
 price_area = st.session_state.get("location",{}).get("price_area", "NO1")
 
-df_el = get_elhub_data(st.session_state["client"],dataset=st.session_state.group.get("name"),dates = st.session_state.dates,filter_group=True,aggregate_group=False)
+df_el = get_elhub_rollup(st.session_state["client"],dataset=st.session_state.group.get("name"),grain="D",dates = st.session_state.dates,groups=st.session_state.group.get("values"))
 
-dfg = df_el.groupby("pricearea")["quantitykwh"].mean().reset_index()
+dfg = df_el.groupby("pricearea")[["sum", "count"]].sum()
+dfg = (dfg["sum"] / dfg["count"]).rename("quantitykwh").reset_index() #hourly mean per area from the daily sums
 dfg["quantitymwh"] = dfg["quantitykwh"] // 1e3  # Convert to kWh
 norm = Normalize(vmin=dfg["quantitymwh"].min(), vmax=dfg["quantitymwh"].max())
 #colormap = plt.cm.Blues  # eller RdYlGn, Viridis osv
@@ -193,8 +205,9 @@ st.info(f"Showing coordinates lat: {coordinates[0]:.3f}, lon: {coordinates[1]:.3
 cols = st.columns(2)
 with cols[0]:
     st.subheader("🗺️ Map Selection of Price Areas 🔋⚡️")
-    gj = load_geodata(dfg = dfg)
-    m = load_map(gj, coordinates=coordinates)
+    zoom = (st.session_state.get("my_map") or {}).get("zoom") or 4 #geometry detail follows the zoom level
+    gj = load_geodata(dfg = dfg, zoom = zoom)
+    m = load_map(gj, coordinates=coordinates, zoom=zoom)
     st_folium(m,width = "100%",height=600,
                 on_change=update_location,
                 key="my_map")
@@ -207,9 +220,9 @@ with cols[1]:
     st.subheader("❄️ Snow Drift Analysis")
     snow_container = st.container(width="stretch")
     with snow_container:
-        df_w = get_weather_data(coordinates=coordinates, dates = st.session_state.dates, set_time_index=False)
-        if isinstance(df_w, pd.DataFrame) and not df_w.empty:
-            plot, fence_df,yearly_df, overall_avg = snowdrift(df = df_w)
+        weather = get_weather_dataset(coordinates=coordinates, dates = st.session_state.dates)
+        if not weather.data.empty:
+            plot, fence_df,yearly_df, overall_avg = snowdrift(weather = weather)
             st.plotly_chart(plot,use_container_width=True)
             
             yearly_df_disp = yearly_df.copy()
@@ -9,67 +9,19 @@ import pandas as pd
 import statsmodels.api as sm
 import matplotlib.pyplot as plt
 from utilities import (
-    init, sidebar_setup, get_elhub_data, init_connection,
+    init, sidebar_setup, get_elhub_data, get_elhub_rollup, init_connection,
     el_sidebar, get_weather_data, extract_coordinates
 )
+from forecasting import RESAMPLE_RULES, batch_forecast, order_search, prepare_series, sarimax_forecast
 import streamlit as st
 import plotly.graph_objects as go
+from plotting import band, scatter
 from sklearn.metrics import r2_score, mean_squared_error
 from sklearn.impute import SimpleImputer
 
 # =========================================
 #          FUNCTION DEFINITIONS & SETUP
 # =========================================
-@st.cache_data(ttl=600)
-def sarimax_forecast(
-    x_data: pd.DataFrame,
-    y_data: pd.Series,
-    start_idx: int,
-    end_idx: int,
-    ar: int = 1,
-    diff: int = 1,
-    ma: int = 1,
-    seasonal_diff: int = 1,
-    seasonal_ma: int = 1,
-    seasonal_ar: int = 1,
-    seasonal_period: int = 12
-) -> tuple:
-    """
-    Perform SARIMAX forecasting on electricity data.
-
-    Args:
-        x_data: DataFrame with exogenous variables.
-        y_data: Target time series to forecast.
-        start_idx: Index where training data starts.
-        end_idx: Index where training data ends.
-        ar: Autoregressive order.
-        diff: Differencing order.
-        ma: Moving average order.
-        seasonal_ar: Seasonal autoregressive order.
-        seasonal_diff: Seasonal differencing order.
-        seasonal_ma: Seasonal moving average order.
-        seasonal_period: Length of the seasonal cycle.
-
-    Returns:
-        Tuple of (forecast object, confidence intervals DataFrame, forecast values).
-    """
-    mod = sm.tsa.statespace.SARIMAX(
-        y_data.iloc[start_idx:end_idx], 
-        exog=x_data.iloc[start_idx:end_idx],
-        order=(ar,diff,ma), 
-        seasonal_order=(seasonal_ar,seasonal_diff,seasonal_ma,seasonal_period)
-    )
-    res = mod.fit(disp=False)
-    
-    steps = len(y_data) - end_idx
-    forecast = res.forecast(steps=steps, exog=x_data.iloc[end_idx:])
-    
-    # For confidence intervals
-    predict_dy = res.get_forecast(steps=steps, exog=x_data.iloc[end_idx:])
-    predict_dy_ci = predict_dy.conf_int()
-    
-    return predict_dy, predict_dy_ci, forecast
-
 st.title("Electricity Supply/Demand Forecasting 📈")
 init()
 init_connection()
@@ -80,28 +32,23 @@ el_sidebar(radio_group=True)
 #          LOAD DATA
 # =========================================
 
-df = get_elhub_data(st.session_state["client"],
-                       dataset=st.session_state.group.get("name"),
-                       dates = st.session_state.dates,
-                       filter_group=False,
-                       aggregate_group=False,
-                       set_time_index=True
-                       )
-
-cols = ["productiongroup" , "pricearea"] if st.session_state.group.get("name") == "production" else ["consumptiongroup" , "pricearea"]
-df = pd.pivot_table(df, index=df.index, columns=cols, values='quantitykwh')
-
-# =========================================
-#         RESAMPLE DATA
-# =========================================
+feat_name = "productiongroup" if st.session_state.group.get("name") == "production" else "consumptiongroup"
 resample = st.radio("Resample data", options = ["Hourly", "Daily", "Weekly", "Monthly"], index=1,horizontal=True)
-if resample != "Hourly":
-    if resample == "Daily":
-        df = df.resample('D').mean()
-    elif resample == "Weekly":
-        df = df.resample('W').mean()
-    elif resample == "Monthly":
-        df = df.resample('M').mean()
+if resample == "Hourly":
+    df_raw = get_elhub_data(st.session_state["client"],
+                           dataset=st.session_state.group.get("name"),
+                           dates = st.session_state.dates,
+                           filter_group=False,
+                           aggregate_group=False,
+                           set_time_index=True
+                           )
+else: #read the precomputed mean per period instead of resampling the hourly data
+    df_raw = get_elhub_rollup(st.session_state["client"],
+                              dataset=st.session_state.group.get("name"),
+                              grain=RESAMPLE_RULES[resample],
+                              dates=st.session_state.dates)
+    df_raw = df_raw.rename(columns={"group": feat_name, "mean": "quantitykwh"}).set_index("starttime")
+df = prepare_series(df_raw, feat_name, resample=resample, impute=False) #pivot to one column per (group, pricearea)
 
 # =========================================
 #          PARAMETER SELECTION
@@ -140,6 +87,7 @@ with cols[1]:
     pricearea_x = st.pills("Select exogenous price areas", options=pricearea_options, selection_mode="multi", default=[x for x in pricearea_options if x != pricearea])
 with cols[2]:
     ci = st.toggle("Show Confidence Intervals", value=True)
+    refit = st.toggle("Re-estimate parameters when the training window changes", value=False)
 
 
 # =========================================
@@ -156,8 +104,13 @@ st.markdown("---")
 imputer = SimpleImputer(strategy='mean') 
 x_data[:] = imputer.fit_transform(x_data) #impute to handle missing values
 
-predict_dy, predict_dy_ci, forecast = sarimax_forecast(x_data, y_data, start_idx, end_idx,
-                                                       *params, *season_params) #forecast
+order_search(x_data, y_data, start_idx, end_idx, seasonal_period=season_params[3]) #optional grid search over orders
+
+series_id = f"elhub:{st.session_state.group.get('name')}:{st.session_state.dates}:{resample}:{group}:{pricearea}"
+predict_dy, predict_dy_ci, forecast, how = sarimax_forecast(series_id, x_data, y_data, start_idx, end_idx,
+                                                            order=tuple(params), seasonal_order=tuple(season_params),
+                                                            refit=refit) #forecast, reusing the previous fit of this series
+st.caption(f"Model: {how}" + (" (parameters of an earlier training window, re-estimated once the window has moved)" if how in ("appended", "applied") else "")) #appended/applied reuse the estimated parameters
 
 #metrics
 st.markdown(f'**MEAN Squared Error:** {mean_squared_error(y_data.iloc[end_idx:].values, forecast.values):.2f} ')
@@ -167,17 +120,29 @@ st.markdown("---")
 
 # Plot
 fig = go.Figure()
-fig.add_trace(go.Scatter(x=y_data.index, y=y_data, name='Actual'))
-fig.add_trace(go.Scatter(x=y_data.index[start_idx:end_idx], y=y_data.iloc[start_idx:end_idx], name='Training', line=dict(color='blue'), opacity=0.7))
-fig.add_trace(go.Scatter(x=y_data.index[end_idx:], y=forecast, name='Forecast', line=dict(color = "red"), opacity=0.7))
+fig.add_trace(scatter(x=y_data.index, y=y_data, name='Actual'))
+fig.add_trace(scatter(x=y_data.index[start_idx:end_idx], y=y_data.iloc[start_idx:end_idx], name='Training', line=dict(color='blue'), opacity=0.7))
+fig.add_trace(scatter(x=y_data.index[end_idx:], y=forecast, name='Forecast', line=dict(color = "red"), opacity=0.7))
 
 #Confidence intervals
 if ci:
-    fig.add_trace(go.Scatter(x=y_data.index[end_idx:], y=predict_dy_ci.iloc[:, 0], name='Lower CI', line=dict(width=0), showlegend=False))                    
-    fig.add_trace(go.Scatter(x=y_data.index[end_idx:], y=predict_dy_ci.iloc[:, 1], name='Upper CI', fill='tonexty', line=dict(width=0)))
+    fig.add_traces(band(x=y_data.index[end_idx:], lower=predict_dy_ci.iloc[:, 0], upper=predict_dy_ci.iloc[:, 1], name='CI', line=dict(width=0))) #both edges on the same samples
                             
 st.plotly_chart(fig, use_container_width=True)
 
+# =========================================
+#          ALL SERIES
+# =========================================
+with st.expander("📋 Forecast all series", expanded=False):
+    st.markdown("Fits every group and price area with the parameters and training window above.")
+    if st.button("Run batch forecast", key="batch_run"):
+        with st.spinner(f"Forecasting {df.shape[1]} series..."):
+            forecasts, metrics = batch_forecast(prepare_series(df_raw, feat_name, resample=resample),
+                                                end_idx=end_idx, start_idx=start_idx,
+                                                order=tuple(params), seasonal_order=tuple(season_params))
+        st.dataframe(metrics, use_container_width=True)
+        st.download_button("Download forecasts", forecasts.to_csv(index=False), file_name="forecasts.csv", mime="text/csv")
+
 with st.expander("Data sources"):
     st.markdown(f'Elhub API https://api.elhub.no')
 
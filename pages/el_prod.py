@@ -10,7 +10,7 @@ import os
 import pymongo
 import plotly.express as px
 import calendar
-from utilities import init, check_mongodb_connection, get_elhub_data, el_sidebar, sidebar_setup
+from utilities import init, check_mongodb_connection, get_elhub_rollup, el_sidebar, sidebar_setup
 
 
 # =========================================
@@ -31,15 +31,15 @@ coordinates = st.session_state.get("location",{}).get("coordinates", None)
 city = st.session_state.get("location",{}).get("city", None)
 price_area = st.session_state.get("location",{}).get("price_area", "NO1")
 
-data = get_elhub_data(st.session_state["client"], dataset=st.session_state.group.get("name"),dates = st.session_state.dates,filter_group=False,aggregate_group=False)
+data = get_elhub_rollup(st.session_state["client"], dataset=st.session_state.group.get("name"),grain="D",dates = st.session_state.dates,price_area=price_area) #daily sums per group
 
 #st.markdown("### ELECTRICITY PRODUCTION DATA")
 st.write("---")
 cols = st.columns(2) #split into two columns
 with cols[0]:
     st.markdown("## 🔋 Production by Group")        
-    data_pie = data[data["pricearea"] == price_area] #select price area NO2
-    data_pie = data_pie.groupby("productiongroup")["quantitykwh"].sum().reset_index() #create data
+    data_pie = data.groupby("group")["sum"].sum().reset_index() #create data
+    data_pie = data_pie.rename(columns={"group": "productiongroup", "sum": "quantitykwh"})
 
     fig = px.pie(
         data_pie,
@@ -53,11 +53,8 @@ with cols[0]:
 
 with cols[1]:
     st.markdown("## 📈 Production Over Time")
-    data_line = data[data["pricearea"] == price_area] #continue with selected price area
-
-    data_line = data_line.groupby(["productiongroup",
-                            pd.Grouper(level = "starttime", freq="D")]
-                                    )["quantitykwh"].sum().reset_index() #Aggregatate data for line plot. Same aggregation as in notebook
+    data_line = data.rename(columns={"group": "productiongroup", "sum": "quantitykwh"}) #daily sums per group, same aggregation as in notebook
+    data_line = data_line[["productiongroup", "starttime", "quantitykwh"]].sort_values(["productiongroup", "starttime"])
     
     if isinstance(st.session_state.group.get("values"), str):
         st.session_state.production_group = [st.session_state.production_group]
@@ -7,111 +7,73 @@ Users can adjust parameters like seasonal period, smoothers, window length, and
 import streamlit as st
 import pandas as pd
 import numpy as np
-from scipy import signal
-from statsmodels.tsa.seasonal import STL
 from typing import Literal
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from utilities import get_elhub_data, init, check_mongodb_connection, el_sidebar, sidebar_setup
+from plotting import scatter
+from datasets import DatasetHandle, HASH_FUNCS
+from decomposition import COMPONENTS, cached_decomposition, decompose, precompute, preview_components, select_series, stl_params
+from spectral import OVERLAPS, WINDOW_LENGTHS, downsample, spectrogram_grid, valid_grid
+from utilities import get_elhub_dataset, init, check_mongodb_connection, el_sidebar, sidebar_setup
 
 # =========================================
 #          FUNCTION DEFINITIONS & SETUP
 # =========================================
-@st.cache_data(ttl=3600)
-def loess(
-    data: pd.DataFrame,
-    price_area: Literal["NO1", "NO2", "NO3", "NO4", "NO5"] = "NO2",
-    production_group: Literal["hydro", "wind", "solar", "thermal"] = "hydro",
-    period: int = 24 * 7,
-    seasonal_smoother: int = 141,
-    trend_smoother: int = 141,
-    robust: bool = True,
-) -> go.Figure:
+def stl_figure(components: pd.DataFrame) -> go.Figure:
     """
-    Perform STL decomposition on electricity production data.
+    Plot an STL decomposition.
 
     Args:
-        data: DataFrame containing electricity production data.
-        price_area: Norwegian price area to analyze.
-        production_group: Type of energy production to analyze.
-        period: Seasonal period in hours.
-        seasonal_smoother: Length of seasonal smoothing window (must be odd).
-        trend_smoother: Length of trend smoothing window (must be odd).
-        robust: Whether to use robust STL.
+        components: DataFrame with observed, trend, seasonal and resid columns (see decomposition.decompose).
 
     Returns:
         Plotly figure with decomposition plots (Observed, Trend, Seasonal, Residual).
     """
-    if data.empty:
-        st.warning("No data available.")
-        return go.Figure()
-
-    if period > trend_smoother:
-        trend_smoother = period + 1 if period % 2 == 0 else period
-
-    data_filtered = data.loc[(data["pricearea"] == price_area) & (data["productiongroup"] == production_group), "quantitykwh"]
-    if data_filtered.empty:
-        st.warning(f"No data available for Area: {price_area}, Group: {production_group}")
-        return go.Figure()
-
-    stl = STL(data_filtered, 
-            period = period,
-            robust=robust, 
-            seasonal=seasonal_smoother, 
-            trend=trend_smoother,
-            )
-
-    res = stl.fit() 
-
     fig = make_subplots(rows=4, cols=1, shared_xaxes=True,
                         subplot_titles=("Observed", "Trend", "Seasonal", "Residual"))
 
-    fig.add_trace(go.Scatter(x=res.observed.index, y=res.observed, name="Observed"), row=1, col=1)
-    fig.add_trace(go.Scatter(x=res.trend.index, y=res.trend, name="Trend"), row=2, col=1)
-    fig.add_trace(go.Scatter(x=res.seasonal.index, y=res.seasonal, name="Seasonal"), row=3, col=1)
-    fig.add_trace(go.Scatter(x=res.resid.index, y=res.resid, name="Residual"), row=4, col=1)
+    for row, (column, name) in enumerate(zip(COMPONENTS, ["Observed", "Trend", "Seasonal", "Residual"]), start=1):
+        fig.add_trace(scatter(x=components.index, y=components[column], name=name), row=row, col=1)
     fig.update_layout(height=800, width=1400, 
                         )
-    #                 title_text = f"STL Decomposition. Area: {price_area}, Group: {production_group}, Period: {period}"
-    #                 
-                    
     return fig
 
-@st.cache_data(ttl=7200)
-def spectrogram(
-    data: pd.DataFrame,
+@st.cache_data(ttl=7200, hash_funcs=HASH_FUNCS)
+def spectrogram_bank(
+    dataset: DatasetHandle,
+    feat_name: str,
     price_area: Literal["NO1", "NO2", "NO3", "NO4", "NO5"] = "NO2",
     production_group: Literal["hydro", "wind", "solar", "thermal"] = "hydro",
-    window_length: int = 256,
-    overlap: int = 128,
-) -> go.Figure:
+) -> dict:
     """
-    Generate a spectrogram of electricity production data.
+    Compute the spectrograms of one series for every window length and overlap option.
 
     Args:
-        data: DataFrame containing electricity production data.
+        dataset: Handle of the electricity production data.
+        feat_name: Name of the group field.
         price_area: Norwegian price area to analyze.
         production_group: Type of energy production to analyze.
-        window_length: Length of FFT window.
-        overlap: Number of overlapping samples between windows.
 
     Returns:
-        Plotly heatmap figure showing the spectrogram.
+        Mapping of (window length, overlap) to (frequencies, times, power in dB), float32.
     """
+    series = select_series(dataset.data, feat_name, price_area, production_group)
+    return spectrogram_grid(series.to_numpy(), valid_grid(WINDOW_LENGTHS, OVERLAPS))
 
-    data = data.loc[(data["pricearea"] == price_area) & (data["productiongroup"] == production_group), "quantitykwh"]
-    if data.empty:
-        st.warning(f"No data available for Area: {price_area}, Group: {production_group}")
-        return go.Figure()
 
-    fs = 1.0 #sampling frequency for hourly data
-    f, t, Sxx = signal.spectrogram(data.to_numpy(), 
-                                   fs,
-                                   nperseg=window_length,
-                                   noverlap=overlap,)
+def spectrogram_figure(spectrogram: tuple) -> go.Figure:
+    """
+    Plot a spectrogram at display resolution.
+
+    Args:
+        spectrogram: Tuple of (frequencies, times, power in dB) from spectrogram_bank.
 
+    Returns:
+        Plotly heatmap figure showing the spectrogram.
+    """
+    f, t, power = downsample(spectrogram) #float32 and at most MAX_ROWS x MAX_COLS, sent as packed binary
     fig = go.Figure(data=go.Heatmap(
-        z=10 * np.log10(Sxx),  # convert to dB scale
+        z=power,
         x=t,
         y=f,
         colorscale='Viridis'
@@ -120,7 +82,6 @@ def spectrogram(
     fig.update_layout(
         width = 1400,
         height = 600,
-        #title='Spectrogram of Production Data. Area: ' + price_area + ', Group: ' + production_group,
         xaxis_title='Time',
         yaxis_title='Frequency'
     )
@@ -139,7 +100,7 @@ coordinates = st.session_state.get("location",{}).get("coordinates", None)
 city = st.session_state.get("location",{}).get("city", None)
 price_area = st.session_state.get("location",{}).get("price_area", "NO1")
 
-data = get_elhub_data(st.session_state["client"], dataset=st.session_state.group.get("name"),dates = st.session_state.dates,filter_group=False,aggregate_group=False) 
+dataset = get_elhub_dataset(st.session_state["client"], dataset=st.session_state.group.get("name"),dates = st.session_state.dates) #cached analyses are keyed on its fingerprint
 
 
 #===========================================
@@ -182,12 +143,25 @@ with tabs[0]:
 #===========================================
 #           STL DECOMPOSITION
 #===========================================
-    fig = loess(data = data,
-                period = period,
-        production_group=group,
-        price_area=price_area,
-        robust=robust) #Weekly seasonality for wind
-    st.plotly_chart(fig, key = "stl_plot")
+    feat_name = st.session_state.group.get("feat_name")
+    params = stl_params(period, seasonal_smoother, trend_smoother, robust)
+    stl_placeholder = st.empty()
+    components = cached_decomposition(dataset, feat_name, price_area, group, params)
+    if components is None:
+        series = select_series(dataset.data, feat_name, price_area, group)
+        if len(series) > 2 * params[0]: #draw a quick downsampled fit first, the full fit replaces it
+            stl_placeholder.plotly_chart(stl_figure(preview_components(series, params)), key = "stl_preview")
+        with st.spinner("Computing full-resolution STL..."):
+            components = decompose(dataset, feat_name, price_area, group, params)
+    if components.empty:
+        stl_placeholder.warning(f"No data available for Area: {price_area}, Group: {group}")
+    else:
+        stl_placeholder.plotly_chart(stl_figure(components), key = "stl_plot")
+
+    if st.button("Precompute all areas and groups", key = "stl_precompute"): #fill the cache for the current parameters
+        with st.spinner("Decomposing all series..."):
+            n_series = precompute(dataset, feat_name, params)
+        st.success(f"Decomposed {n_series} series")
 
 with tabs[1]:
     st.subheader("Spectrogram")
@@ -196,25 +170,26 @@ with tabs[1]:
     with spect_selections[0]:
         window_length = st.select_slider(
             "Select Window Length",
-            options=[128, 256, 512, 1024],
+            options=WINDOW_LENGTHS,
             value=256,
         ) #widget for selecting window length
     with spect_selections[1]:
         overlap = st.select_slider(
             "Select Overlap",
-            options=[64, 128, 256, 512],
+            options=OVERLAPS,
             value=128,
         ) #widget for selecting overlap
 
 #===========================================
 #           SPECTROGRAM
 #===========================================
-    fig = spectrogram(data = data, 
-                      production_group=group, 
-                      price_area=price_area,
-                      window_length=window_length,
-                      overlap=overlap)
-    st.plotly_chart(fig, key = "spectrogram_plot")
+    spectrograms = spectrogram_bank(dataset, feat_name, price_area=price_area, production_group=group) #whole option grid at once, sliders only pick one
+    if overlap >= window_length:
+        st.warning("Overlap must be shorter than the window length.")
+    elif (window_length, overlap) not in spectrograms:
+        st.warning(f"No data available for Area: {price_area}, Group: {group}")
+    else:
+        st.plotly_chart(spectrogram_figure(spectrograms[(window_length, overlap)]), key = "spectrogram_plot")
 
 with st.expander("Data sources"):
     st.write(f'Elhub API https://api.elhub.no')
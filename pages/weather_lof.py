@@ -6,71 +6,92 @@ and Local Outlier Factor (LOF) analysis.
 """
 import streamlit as st
 import pandas as pd
-from utilities import get_weather_data, extract_coordinates, init, sidebar_setup
+from utilities import CITIES, get_weather_dataset, extract_coordinates, init, sidebar_setup
+from datasets import DatasetHandle, HASH_FUNCS
 import plotly.graph_objects as go
+from plotting import scatter
 import numpy as np
-from scipy.fft import dct, idct
-from sklearn.neighbors import LocalOutlierFactor
-from scipy.stats import median_abs_deviation, trim_mean
+from outliers import K_MAX, HighPassSpectrum, LofIndex
+from outlier_scan import DEFAULT_PARAMS, read_table, scan, write_table
+from scipy.stats import trim_mean
+from typing import Optional
 
 # =========================================
 #          DEFINE FUNCTIONS & SETUP
 # =========================================
-@st.cache_data(ttl=600)
-def lof(df: pd.DataFrame, feature: str, n_neighbors: int = 20, contamination: float = 0.01) -> go.Figure:
+@st.cache_resource(max_entries=8, hash_funcs=HASH_FUNCS)
+def lof_index(dataset: DatasetHandle, features: tuple[str, ...]) -> tuple[np.ndarray, LofIndex]:
     """
-    Perform Local Outlier Factor (LOF) analysis on a weather feature.
+    Build the LOF neighbour index of a feature set once per location and date range.
 
     Args:
-        df: DataFrame containing weather data.
-        feature: Name of the feature column to analyze.
+        dataset: Handle of the weather data.
+        features: Feature columns. Several features are standardized so their units are comparable.
+
+    Returns:
+        Tuple of (mask of the rows without missing values, index over those rows).
+    """
+    data = dataset.data[list(features)]
+    valid = data.notna().all(axis=1).to_numpy()
+    X = data.to_numpy()[valid]
+    if len(features) > 1:
+        std = X.std(axis=0)
+        X = (X - X.mean(axis=0)) / np.where(std > 0, std, 1.0)
+    return valid, LofIndex(X, k_max=K_MAX)
+
+
+def lof(dataset: DatasetHandle, features: list[str], n_neighbors: int = 20, contamination: float = 0.01) -> go.Figure:
+    """
+    Perform Local Outlier Factor (LOF) analysis on one or more weather features.
+
+    Args:
+        dataset: Handle of the weather data.
+        features: Feature columns to analyze. The first one is plotted.
         n_neighbors: Number of neighbors for LOF algorithm.
         contamination: Expected proportion of outliers in the dataset.
 
     Returns:
         Plotly scatter plot showing inliers and outliers.
     """
-    lof = LocalOutlierFactor(n_neighbors=n_neighbors, contamination=contamination)
-    data = df[[feature]]
-    labels = lof.fit_predict(data)
+    valid, index = lof_index(dataset, tuple(features)) #built once, slider changes only query it
+    labels, _ = index.predict(min(n_neighbors, index.k_max), contamination)
+    feature = features[0]
+    data = dataset.data.loc[valid, [feature]]
     outliers = data[labels == -1]
     inliers = data[labels == 1]
     
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=outliers.index, y=outliers[feature], mode='markers',
                              name='Outliers'))
-    fig.add_trace(go.Scatter(x=inliers.index, y=inliers[feature], mode='markers',
+    fig.add_trace(scatter(x=inliers.index, y=inliers[feature], mode='markers',
                              name='Inliers'))
     fig.update_layout(title='',
                       xaxis_title='Time',
-                      yaxis_title='Precipitation')
+                      yaxis_title=feature)
     return fig
 
-def calc_highpass(data: np.ndarray, cutoff: int) -> np.ndarray:
+@st.cache_resource(max_entries=8, hash_funcs=HASH_FUNCS)
+def highpass_spectrum(dataset: DatasetHandle, feature: str, norm: Optional[str] = None) -> HighPassSpectrum:
     """
-    Apply high-pass filter using discrete cosine transform.
+    Transform a feature once per location and date range.
 
     Args:
-        data: Input data array.
-        cutoff: Cutoff frequency for the high-pass filter.
+        dataset: Handle of the weather data.
+        feature: Name of the feature column.
+        norm: Normalization of the DCT.
 
     Returns:
-        Filtered data array.
+        Spectrum that serves the high-pass detector for any cutoff.
     """
-    norm = None
-    fourier = dct(data, norm=norm)
-    satv = fourier.copy()
-    f = np.arange(0, len(satv))
-    satv[f < cutoff] = 0  # High-pass filter
-    return idct(satv, norm=norm)
-
-@st.cache_data(ttl=600)
-def high_pass(df: pd.DataFrame, feature: str, cutoff: int = 50, nstd: float = 2.0) -> go.Figure:
+    return HighPassSpectrum(dataset.data[feature].to_numpy(), norm=norm)
+
+
+def high_pass(dataset: DatasetHandle, feature: str, cutoff: int = 50, nstd: float = 2.0) -> go.Figure:
     """
     Detect outliers using high-pass filtering and robust statistics.
 
     Args:
-        df: DataFrame containing weather data.
+        dataset: Handle of the weather data.
         feature: Name of the feature column to analyze.
         cutoff: Cutoff frequency for high-pass filter.
         nstd: Number of standard deviations for outlier threshold.
@@ -78,26 +99,22 @@ def high_pass(df: pd.DataFrame, feature: str, cutoff: int = 50, nstd: float = 2.
     Returns:
         Plotly figure showing the data with outliers highlighted.
     """
-
-    temp = df[feature].to_numpy()    
+    df = dataset.data
     if df.empty:
         st.error("DataFrame is empty.")
         return None
-    satv_reconstructed = calc_highpass(temp, cutoff)
-    MAD = median_abs_deviation(satv_reconstructed)
-    std_robust = 1.4826 * MAD
+    spectrum = highpass_spectrum(dataset, feature) #cutoff changes reuse the DCT, nstd changes only re-threshold
+    _, outliers, std_robust = spectrum.threshold(cutoff, nstd)
+    n_outliers = int(outliers.sum())
+    df_outliers = df[outliers]
 
-    outliers = np.where((satv_reconstructed > MAD + nstd*std_robust) | (satv_reconstructed < MAD - nstd*std_robust))
-    n_outliers = len(outliers[0])
-    df_outliers = df.iloc[outliers]
-
-    low_pass_reconstructed = temp - satv_reconstructed
+    low_pass_reconstructed = spectrum.lowpass(cutoff)
     st.info(f"Number of outliers detected: {n_outliers}")
     
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=df.index, y=df[feature], mode='lines', name='Original'))
-    fig.add_trace(go.Scatter(x=df.index, y=low_pass_reconstructed + nstd*std_robust, mode='lines', name='Upper boundary', line=dict(color='orange')))
-    fig.add_trace(go.Scatter(x=df.index, y=low_pass_reconstructed - nstd*std_robust, mode='lines', name='Lower boundary', line=dict(color='orange')))
+    fig.add_trace(scatter(x=df.index, y=df[feature], mode='lines', name='Original'))
+    fig.add_trace(scatter(x=df.index, y=low_pass_reconstructed + nstd*std_robust, mode='lines', name='Upper boundary', line=dict(color='orange')))
+    fig.add_trace(scatter(x=df.index, y=low_pass_reconstructed - nstd*std_robust, mode='lines', name='Lower boundary', line=dict(color='orange')))
     fig.add_trace(go.Scatter(x=df_outliers.index, y=df_outliers[feature], mode='markers', name='Outliers', marker=dict(color='red')))
     fig.update_layout(title='Temperature Data with lower and upper boundaries',
                       xaxis_title='Time',
@@ -117,7 +134,8 @@ price_area = st.session_state.get("location",{}).get("price_area", "NO1")
 #           DATA LOADING
 # =================================
 
-df = get_weather_data(coordinates=coordinates, dates = st.session_state.dates, set_time_index=True)
+dataset = get_weather_dataset(coordinates=coordinates, dates = st.session_state.dates) #cached analyses are keyed on its fingerprint
+df = dataset.data
 
 #===========================================
 #   OUTLIER DETECTION AND LOF ANALYSIS
@@ -139,7 +157,7 @@ with tabs[0]:
     with spc_selection[1]:
         nstd = st.slider("Number of standard deviations for boundary", min_value=0.5, max_value=5.0, value=2.0, step=0.1)
 
-    fig = high_pass(df = df, feature = col, cutoff=cutoff,nstd=nstd)
+    fig = high_pass(dataset = dataset, feature = col, cutoff=cutoff,nstd=nstd)
     st.plotly_chart(fig)
 
 with tabs[1]:
@@ -151,21 +169,48 @@ with tabs[1]:
             label_visibility="collapsed",
             )
     
+    extra = st.multiselect("Additional features (multivariate LOF)", options = [c for c in df.columns if c != col]) #KD-tree index when several features are used
     st.subheader("LOF Analysis")
     
     lof_select = st.columns(2) #selections for LOF
     with lof_select[0]:
-        n_neighbors = st.slider("Number of neighbors", min_value=1, max_value=100, value=20, step=1)
+        n_neighbors = st.slider("Number of neighbors", min_value=1, max_value=K_MAX, value=20, step=1)
     with lof_select[1]:
         contamination = st.slider("Contamination", min_value=0.01, max_value=0.1, value=0.01, step=0.01)
 
     
     
     
-    fig = lof(df = df , feature = col, n_neighbors=n_neighbors, contamination=contamination)
+    fig = lof(dataset = dataset, features = [col, *extra], n_neighbors=n_neighbors, contamination=contamination)
     st.plotly_chart(fig)
 
 
 
+#===========================================
+#   ALL CITIES (STORED BATCH SCAN)
+#===========================================
+with st.expander("📋 Outliers in all price-area cities"):
+    if st.button("Scan all cities for the selected dates", key = "outlier_scan"): #same job as python outlier_scan.py
+        with st.spinner("Scanning all cities and features..."):
+            weather = {name: get_weather_dataset(coordinates=extract_coordinates(name), dates=st.session_state.dates).data
+                       for name in CITIES}
+            write_table(scan(weather), {**DEFAULT_PARAMS, "start": str(st.session_state.dates[0]), "end": str(st.session_state.dates[1])})
+    stored = read_table() #reads the stored table instead of recomputing
+    if stored is None:
+        st.caption("No scan stored yet. Press the button or run `python outlier_scan.py`.")
+    else:
+        table, scan_params = stored
+        st.caption(f"Scan of {scan_params.get('start')} to {scan_params.get('end')} "
+                   f"(cutoff {scan_params.get('cutoff')}, nstd {scan_params.get('nstd')}, "
+                   f"n_neighbors {scan_params.get('n_neighbors')}, contamination {scan_params.get('contamination')})")
+        st.dataframe(table.groupby(["location", "feature", "method"], observed=True).size().unstack(fill_value=0))
+        if city in CITIES:
+            top = table[table["location"] == city].assign(strength=lambda t: t["score"].abs())
+            top = (top.sort_values("strength", ascending=False)
+                      .groupby("method", observed=True).head(10) #highpass and LOF scores are on different scales, so rank within each method
+                      .sort_values(["method", "strength"], ascending=[True, False]))
+            st.markdown(f"**Strongest outliers in {city}** (top 10 per method)")
+            st.dataframe(top.drop(columns="strength"), hide_index=True)
+
 with st.expander("Data sources"):
     st.write(f'Meteo API https://archive-api.open-meteo.com')
\ No newline at end of file
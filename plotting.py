@@ -0,0 +1,173 @@
+"""
+Downsampling for Plotly time-series traces.
+
+A chart is only a couple of thousand pixels wide, so sending every hourly
+sample of a multi-year series only makes the payload and the browser slower.
+scatter() is a drop-in replacement for go.Scatter that reduces x/y to at most
+MAX_POINTS points before the trace is built:
+
+- "minmax" keeps the smallest and largest sample of every bucket, so peaks,
+  dips and outliers survive exactly (the default).
+- "lttb" (Largest-Triangle-Three-Buckets) keeps one sample per bucket chosen to
+  preserve the visual shape of the line.
+
+Series that are already short enough are passed through unchanged, and gaps
+(all-NaN buckets) stay gaps. band() builds the two edges of a filled band
+(fill='tonexty') on one set of positions, so the fill joins matching samples.
+"""
+from typing import Literal, Union
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+MAX_POINTS = 2000  # points per trace, about two per pixel column of a wide chart
+
+Method = Literal["minmax", "lttb"]
+ArrayLike = Union[pd.Series, pd.Index, np.ndarray, list]
+
+
+def _numeric(x: ArrayLike) -> np.ndarray:
+    """x as float64, with datetimes as nanoseconds since the epoch."""
+    if isinstance(x, (pd.Series, pd.Index)) and pd.api.types.is_datetime64_any_dtype(x.dtype):
+        return pd.DatetimeIndex(x).asi8.astype(np.float64)
+    values = np.asarray(x)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[ns]").view(np.int64).astype(np.float64)
+    return values.astype(np.float64)
+
+
+def _take(values: ArrayLike, idx: np.ndarray) -> ArrayLike:
+    """Select positions from a Series, Index or array-like."""
+    if isinstance(values, pd.Series):
+        return values.iloc[idx]
+    if isinstance(values, pd.Index):
+        return values[idx]
+    return np.asarray(values)[idx]
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Positions of the minimum and maximum of each of n_out // 2 equal buckets.
+
+    Args:
+        y: Values.
+        n_out: Maximum number of positions to return.
+
+    Returns:
+        Sorted, unique positions, always including the first and last sample.
+    """
+    n = len(y)
+    buckets = max(1, n_out // 2)
+    k = -(-n // buckets)
+    padded = np.full(buckets * k, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, k)
+    nan = np.isnan(padded)
+    lo = np.where(nan, np.inf, padded).argmin(axis=1)  # all-NaN buckets pick their first (NaN) sample
+    hi = np.where(nan, -np.inf, padded).argmax(axis=1)
+    offsets = np.arange(buckets) * k
+    idx = np.concatenate([offsets + lo, offsets + hi, [0, n - 1]])
+    return np.unique(idx[idx < n])
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Positions selected by Largest-Triangle-Three-Buckets.
+
+    Args:
+        x: Numeric x values (increasing).
+        y: Values.
+        n_out: Number of positions to return (at least 3).
+
+    Returns:
+        Sorted positions, including the first and last sample.
+    """
+    n = len(y)
+    n_out = max(3, n_out)
+    if n <= n_out:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)  # n_out - 2 buckets between the end points
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        nxt = slice(stop, edges[i + 2]) if i + 2 < len(edges) else slice(n - 1, n)
+        with np.errstate(invalid="ignore"):
+            cx, cy = x[nxt].mean(), np.nanmean(y[nxt]) if not np.isnan(y[nxt]).all() else np.nan
+            area = np.abs((x[a] - cx) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (cy - y[a]))
+        a = start + int(np.where(np.isnan(area), -1.0, area).argmax())
+        idx[i + 1] = a
+    return idx
+
+
+def downsample_indices(x: ArrayLike, y: ArrayLike, n_out: int = MAX_POINTS, method: Method = "minmax") -> np.ndarray:
+    """
+    Positions of the samples to plot.
+
+    Args:
+        x: x values (numbers or datetimes).
+        y: y values.
+        n_out: Maximum number of points.
+        method: 'minmax' or 'lttb'.
+
+    Returns:
+        Sorted positions into x and y.
+    """
+    values = np.asarray(y, dtype=np.float64)
+    if len(values) <= n_out:
+        return np.arange(len(values))
+    if method == "lttb":
+        return lttb_indices(_numeric(x), values, n_out)
+    return minmax_indices(values, n_out)
+
+
+def scatter(x: ArrayLike, y: ArrayLike, n_out: int = MAX_POINTS, method: Method = "minmax", **kwargs) -> go.Scatter:
+    """
+    Build a go.Scatter from a downsampled copy of x and y.
+
+    Args:
+        x: x values (numbers or datetimes).
+        y: y values, same length as x.
+        n_out: Maximum number of points sent to the browser.
+        method: 'minmax' or 'lttb'.
+        **kwargs: Passed on to go.Scatter (name, mode, line, ...).
+
+    Returns:
+        Scatter trace.
+    """
+    idx = downsample_indices(x, y, n_out, method)
+    if len(idx) < len(y):
+        x, y = _take(x, idx), _take(y, idx)
+    return go.Scatter(x=x, y=y, **kwargs)
+
+
+def band(x: ArrayLike, lower: ArrayLike, upper: ArrayLike, name: str, n_out: int = MAX_POINTS,
+         method: Method = "minmax", **kwargs) -> list[go.Scatter]:
+    """
+    Build the lower and upper trace of a filled band from the same downsampled positions.
+
+    Downsampling the edges separately would pick different samples for each,
+    and the fill between them would connect unrelated points. The positions are
+    the union of those picked for each edge (n_out / 2 each), so the dips of the
+    lower and the peaks of the upper edge both survive.
+
+    Args:
+        x: x values (numbers or datetimes).
+        lower: Lower edge, same length as x.
+        upper: Upper edge, same length as x.
+        name: Band name; the traces are named 'Lower <name>' and 'Upper <name>'.
+        n_out: Maximum number of points per trace.
+        method: 'minmax' or 'lttb'.
+        **kwargs: Passed on to both go.Scatter traces (line, ...).
+
+    Returns:
+        [lower trace, upper trace]; add them in this order so the upper one fills to the lower.
+    """
+    idx = np.union1d(downsample_indices(x, lower, max(n_out // 2, 2), method),
+                     downsample_indices(x, upper, max(n_out // 2, 2), method))
+    if len(idx) < len(lower):
+        x, lower, upper = _take(x, idx), _take(lower, idx), _take(upper, idx)
+    return [go.Scatter(x=x, y=lower, name=f"Lower {name}", showlegend=False, **kwargs),
+            go.Scatter(x=x, y=upper, name=f"Upper {name}", fill="tonexty", **kwargs)]
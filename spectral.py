@@ -0,0 +1,112 @@
+"""
+Spectrogram engine.
+
+Computes the spectrograms of a series for the whole window length × overlap
+grid of the page in one pass (the STFTs run on a thread pool, scipy's FFT
+releases the GIL), keeps them as float32 dB arrays and shrinks them to the
+display resolution before they are plotted. Plotly sends float32 arrays as
+packed binary, so the payload is at most MAX_ROWS × MAX_COLS × 4 bytes.
+"""
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Sequence
+
+import numpy as np
+from scipy import signal
+
+WINDOW_LENGTHS = [128, 256, 512, 1024]
+OVERLAPS = [64, 128, 256, 512]
+MAX_ROWS = 256  # frequency bins sent to the browser
+MAX_COLS = 1000  # time bins sent to the browser
+
+Spectrogram = tuple[np.ndarray, np.ndarray, np.ndarray]  # (frequencies, times, power in dB of shape (f, t))
+
+
+def valid_grid(window_lengths: Sequence[int] = WINDOW_LENGTHS,
+               overlaps: Sequence[int] = OVERLAPS) -> list[tuple[int, int]]:
+    """Return the (window length, overlap) pairs with an overlap shorter than the window."""
+    return [(window, overlap) for window in window_lengths for overlap in overlaps if overlap < window]
+
+
+def spectrogram_db(values: np.ndarray, window_length: int, overlap: int, fs: float = 1.0) -> Spectrogram:
+    """
+    Spectrogram of a series in dB.
+
+    Args:
+        values: Evenly spaced samples.
+        window_length: Length of the FFT window.
+        overlap: Number of overlapping samples between windows.
+        fs: Sampling frequency (1 per hour for hourly data).
+
+    Returns:
+        Tuple of (frequencies, segment times, power in dB), all float32. Bins
+        without power are NaN instead of -inf.
+    """
+    f, t, sxx = signal.spectrogram(values, fs, nperseg=window_length, noverlap=overlap)
+    with np.errstate(divide="ignore"):
+        power = 10 * np.log10(sxx, dtype=np.float32)
+    power[np.isneginf(power)] = np.nan
+    return f.astype(np.float32), t.astype(np.float32), power
+
+
+def spectrogram_grid(
+    values: np.ndarray,
+    pairs: Optional[list[tuple[int, int]]] = None,
+    fs: float = 1.0,
+    max_workers: Optional[int] = None,
+) -> dict[tuple[int, int], Spectrogram]:
+    """
+    Spectrograms for every (window length, overlap) pair.
+
+    Args:
+        values: Evenly spaced samples.
+        pairs: Pairs to compute. Defaults to valid_grid().
+        fs: Sampling frequency.
+        max_workers: Number of threads. Defaults to one per pair.
+
+    Returns:
+        Mapping of (window length, overlap) to the result of spectrogram_db. Pairs
+        with a window longer than the series are left out.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    pairs = [pair for pair in (pairs or valid_grid()) if pair[0] <= len(values)]
+    if not pairs:
+        return {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(pairs)) as executor:
+        results = executor.map(lambda pair: spectrogram_db(values, *pair, fs=fs), pairs)
+        return dict(zip(pairs, results))
+
+
+def _block_mean(values: np.ndarray, axis: int, max_size: int) -> np.ndarray:
+    """Average consecutive blocks along an axis so at most max_size entries remain."""
+    size = values.shape[axis]
+    k = -(-size // max_size)
+    if k <= 1:
+        return values
+    pad = -size % k
+    if pad:
+        widths = [(0, 0)] * values.ndim
+        widths[axis] = (0, pad)
+        values = np.pad(values, widths, constant_values=np.nan)
+    shape = list(values.shape)
+    shape[axis:axis + 1] = [shape[axis] // k, k]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN blocks stay NaN
+        return np.nanmean(values.reshape(shape), axis=axis + 1).astype(values.dtype)
+
+
+def downsample(spectrogram: Spectrogram, max_rows: int = MAX_ROWS, max_cols: int = MAX_COLS) -> Spectrogram:
+    """
+    Shrink a spectrogram to the display resolution by averaging neighbouring bins.
+
+    Args:
+        spectrogram: Result of spectrogram_db.
+        max_rows: Maximum number of frequency bins.
+        max_cols: Maximum number of time bins.
+
+    Returns:
+        Spectrogram of at most max_rows × max_cols bins, with the mean frequency and time of every block.
+    """
+    f, t, power = spectrogram
+    return (_block_mean(f, 0, max_rows), _block_mean(t, 0, max_cols),
+            _block_mean(_block_mean(power, 0, max_rows), 1, max_cols))
@@ -0,0 +1,37 @@
+"""Columnar loading of Elhub documents."""
+import datetime
+import unittest
+
+import pandas as pd
+
+from elhub_loader import elhub_columns, load_columnar
+
+START = datetime.datetime(2024, 1, 1)
+
+
+def documents() -> list[dict]:
+    """Hourly documents, one lacking the group field and one with it set to None."""
+    docs = [{"starttime": START + datetime.timedelta(hours=h), "pricearea": "NO1",
+             "productiongroup": ["hydro", "wind"][h % 2], "quantitykwh": float(h)} for h in range(6)]
+    del docs[2]["productiongroup"]
+    docs[3]["productiongroup"] = None
+    return docs
+
+
+class LoadColumnarTest(unittest.TestCase):
+    def test_missing_category_is_null(self):
+        data = load_columnar(documents(), elhub_columns("productiongroup"), batch_size=4)
+        self.assertEqual(list(data["productiongroup"].cat.categories), ["hydro", "wind"])
+        self.assertEqual(data["productiongroup"].isna().tolist(), [False, False, True, True, False, False])
+        self.assertEqual(data["productiongroup"].iloc[4], "hydro")
+
+    def test_missing_category_is_null_in_arrow(self):
+        table = load_columnar(documents(), elhub_columns("productiongroup"), as_arrow=True)
+        self.assertEqual(table["productiongroup"].to_pylist(), ["hydro", "wind", None, None, "hydro", "wind"])
+        pd.testing.assert_series_equal(table.to_pandas()["productiongroup"],
+                                       load_columnar(documents(), elhub_columns("productiongroup"),
+                                                     set_time_index=False)["productiongroup"])
+
+
+if __name__ == "__main__":
+    unittest.main()
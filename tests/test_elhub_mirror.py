@@ -0,0 +1,138 @@
+"""Sync of the local Elhub mirror against a mongomock stand-in."""
+import datetime
+import functools
+import tempfile
+import unittest
+from unittest import mock
+
+import elhub_mirror
+from elhub_mirror import mirror_covers, read_mirror, read_watermark, sync
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+AREAS = ["NO1", "NO2", "NO3"]
+GROUPS = ["hydro", "wind"]
+START = datetime.datetime(2024, 1, 31, 20)  # the hours cross a month (partition) boundary
+
+
+def production_docs(hours: range) -> list[dict]:
+    """One document per hour, price area and production group."""
+    return [{"starttime": START + datetime.timedelta(hours=h), "pricearea": area, "productiongroup": group,
+             "quantitykwh": float(h)}
+            for h in hours for area in AREAS for group in GROUPS]
+
+
+@unittest.skipIf(mongomock is None, "mongomock is not installed")
+class SyncTest(unittest.TestCase):
+    def setUp(self):
+        self.client = mongomock.MongoClient()
+        self.collection = self.client.elhub.prod_data
+        self.root = tempfile.mkdtemp()
+
+    def mirror(self):
+        return read_mirror("production", (START - datetime.timedelta(days=1), START + datetime.timedelta(days=2)),
+                           set_time_index=False, root=self.root)
+
+    def assert_mirrors_collection(self):
+        data = self.mirror()
+        self.assertEqual(len(data), self.collection.count_documents({}))
+        self.assertFalse(data.duplicated(["starttime", "pricearea", "productiongroup"]).any())
+
+    def test_two_syncs(self):
+        self.collection.insert_many(production_docs(range(6)))
+        sync(self.client, "production", root=self.root, batch_size=7)  # batches end inside hours
+        self.assert_mirrors_collection()
+        self.assertEqual(read_watermark("production", self.root), START + datetime.timedelta(hours=5))
+
+        self.collection.insert_many(production_docs(range(6, 10)))
+        sync(self.client, "production", root=self.root, batch_size=7)
+        self.assert_mirrors_collection()
+        self.assertEqual(read_watermark("production", self.root), START + datetime.timedelta(hours=9))
+
+    def test_late_documents_for_the_watermark_hour(self):
+        docs = production_docs(range(4))
+        last_hour = [doc for doc in docs if doc["starttime"] == START + datetime.timedelta(hours=3)]
+        self.collection.insert_many([doc for doc in docs if doc not in last_hour[1:]])
+        sync(self.client, "production", root=self.root)
+        self.collection.insert_many(last_hour[1:])
+        sync(self.client, "production", root=self.root)
+        self.assert_mirrors_collection()
+
+    def test_interrupted_sync_resumes(self):
+        self.collection.insert_many(production_docs(range(8)))
+        write_dataset = elhub_mirror.ds.write_dataset
+        calls = []
+
+        def fail_on_third_batch(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 3:
+                raise KeyboardInterrupt
+            return write_dataset(*args, **kwargs)
+
+        with mock.patch.object(elhub_mirror.ds, "write_dataset", side_effect=fail_on_third_batch):
+            with self.assertRaises(KeyboardInterrupt):
+                sync(self.client, "production", root=self.root, batch_size=10)
+        self.assertLess(len(self.mirror()), self.collection.count_documents({}))
+        sync(self.client, "production", root=self.root, batch_size=10)
+        self.assert_mirrors_collection()
+
+    def test_crash_before_the_watermark_is_written(self):
+        self.collection.insert_many(production_docs(range(8)))
+        write_watermark = elhub_mirror.write_watermark
+        calls = []
+
+        def fail_on_second_watermark(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise KeyboardInterrupt  # the second batch is on disk, the watermark still at the first
+            return write_watermark(*args, **kwargs)
+
+        with mock.patch.object(elhub_mirror, "write_watermark", side_effect=fail_on_second_watermark):
+            with self.assertRaises(KeyboardInterrupt):
+                sync(self.client, "production", root=self.root, batch_size=10)
+        sync(self.client, "production", root=self.root, batch_size=10)
+        self.assert_mirrors_collection()
+
+    def test_crash_before_the_first_watermark(self):
+        self.collection.insert_many(production_docs(range(8)))
+        with mock.patch.object(elhub_mirror, "write_watermark", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                sync(self.client, "production", root=self.root, batch_size=10)  # first batch on disk, no watermark
+        self.assertIsNone(read_watermark("production", self.root))
+        sync(self.client, "production", root=self.root, batch_size=10)
+        self.assert_mirrors_collection()
+
+    def test_mirror_covers(self):
+        self.collection.insert_many(production_docs(range(6)))
+        sync(self.client, "production", root=self.root)
+        watermark = read_watermark("production", self.root)
+        self.assertTrue(mirror_covers(self.client, "production", watermark, root=self.root))
+        self.assertTrue(mirror_covers(self.client, "production", watermark + datetime.timedelta(days=30), root=self.root))
+        self.collection.insert_many(production_docs(range(6, 8)))
+        self.assertFalse(mirror_covers(self.client, "production", watermark + datetime.timedelta(hours=1), root=self.root))
+        self.assertTrue(mirror_covers(self.client, "production", watermark, root=self.root))
+
+    def test_get_elhub_data_falls_back_to_mongo_when_the_mirror_is_behind(self):
+        import utilities
+
+        self.collection.insert_many(production_docs(range(6)))
+        sync(self.client, "production", root=self.root)
+        self.collection.insert_many(production_docs(range(6, 10)))
+        day = START.replace(hour=0)  # get_elhub_data takes days, the end day at midnight
+        read = mock.Mock(side_effect=functools.partial(read_mirror, root=self.root))
+        with mock.patch("utilities.mirror_covers", functools.partial(mirror_covers, root=self.root)), \
+             mock.patch("utilities.read_mirror", read):
+            behind = utilities.get_elhub_data.__wrapped__(self.client, "production",
+                                                          (day, day + datetime.timedelta(days=2)), columnar=True)
+            self.assertEqual(read.call_count, 0)
+            covered = utilities.get_elhub_data.__wrapped__(self.client, "production",
+                                                           (day, day + datetime.timedelta(days=1)), columnar=True)
+            self.assertEqual(read.call_count, 1)
+        self.assertEqual(len(behind), self.collection.count_documents({}))
+        self.assertEqual(len(covered), 5 * len(AREAS) * len(GROUPS))  # 20:00 to midnight
+
+if __name__ == "__main__":
+    unittest.main()
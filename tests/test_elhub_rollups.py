@@ -0,0 +1,55 @@
+"""Incremental rollups against the local mirror and a mongomock stand-in."""
+import datetime
+import tempfile
+import unittest
+from unittest import mock
+
+from elhub_mirror import sync
+from elhub_rollups import read_rollup, update_local_rollups, update_mongo_rollups
+from tests.test_elhub_mirror import START, production_docs
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+DATES = (START - datetime.timedelta(days=1), START + datetime.timedelta(days=2))
+
+
+@unittest.skipIf(mongomock is None, "mongomock is not installed")
+class RollupTest(unittest.TestCase):
+    def setUp(self):
+        self.client = mongomock.MongoClient()
+        self.collection = self.client.elhub.prod_data
+        self.root = tempfile.mkdtemp()
+
+    def test_local_rollup_behind_the_mirror_is_not_used(self):
+        self.collection.insert_many(production_docs(range(6)))
+        sync(self.client, "production", root=self.root)
+        update_local_rollups("production", self.root)
+        self.assertEqual(read_rollup(None, "production", "D", DATES, root=self.root)["count"].sum(), 36)
+
+        self.collection.insert_many(production_docs(range(6, 10)))
+        sync(self.client, "production", root=self.root)
+        self.assertIsNone(read_rollup(None, "production", "D", DATES, root=self.root))
+        with mock.patch("elhub_rollups.read_mongo_rollup") as read_mongo_rollup:
+            read_rollup(self.client, "production", "D", DATES, root=self.root)
+        read_mongo_rollup.assert_called_once()
+
+        update_local_rollups("production", self.root)
+        self.assertEqual(read_rollup(None, "production", "D", DATES, root=self.root)["count"].sum(), 60)
+
+    def test_mongo_rollups_recompute_the_watermark_period(self):
+        self.collection.insert_many(production_docs(range(6)))
+        self.client.elhub.rollup_meta.insert_one({"_id": "prod_data", "starttime": START + datetime.timedelta(hours=5)})
+        with mock.patch.object(mongomock.collection.Collection, "aggregate") as aggregate:
+            self.assertEqual(update_mongo_rollups(self.client, "production"), START + datetime.timedelta(hours=5))
+        # late documents for the watermark hour: every grain is recomputed from the period holding it
+        self.assertEqual(aggregate.call_count, 3)
+        since = [call.args[0][0]["$match"]["starttime"]["$gte"] for call in aggregate.call_args_list]
+        self.assertEqual(since, [datetime.datetime(2024, 2, 1), datetime.datetime(2024, 1, 29),
+                                 datetime.datetime(2024, 2, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""Preparation of the joined electricity and weather data for SARIMAX, and reuse of fits."""
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_squared_error, r2_score
+
+from forecasting import MODEL_CACHE_SIZE, REESTIMATE_AFTER, REESTIMATE_SHARE, _model_store, fit_sarimax, prepare_aligned, sarimax_forecast
+
+
+def aligned_with_gaps(hours: int = 24 * 14) -> pd.DataFrame:
+    """Hourly frame shaped like get_aligned_data, with gaps as a partial join leaves them."""
+    index = pd.date_range("2024-01-01", periods=hours, freq="h", tz="UTC")
+    rng = np.random.default_rng(0)
+    t = np.arange(hours)
+    df = pd.DataFrame({"quantitykwh": 100 + 10 * np.sin(2 * np.pi * t / 24) + rng.standard_normal(hours),
+                       "temperature_2m": np.cos(2 * np.pi * t / 24) + rng.standard_normal(hours) * 0.1,
+                       "wind_speed_10m": rng.random(hours)},
+                      index=index)
+    df.iloc[100:106, 1:] = np.nan  # weather hours missing inside the grid
+    df.iloc[150, 0] = np.nan  # electricity hour missing
+    df.iloc[-1, 2] = np.nan  # trailing row with only some weather columns null
+    return df
+
+
+class PrepareAlignedTest(unittest.TestCase):
+    def test_hourly_fills_gaps_on_the_grid(self):
+        df = aligned_with_gaps()
+        prepared = prepare_aligned(df, "Hourly")
+        self.assertFalse(prepared.isna().any().any())
+        self.assertEqual(len(prepared), len(df) - 1)  # only the incomplete trailing row is trimmed
+        self.assertEqual(prepared.index.freq, pd.offsets.Hour())
+        self.assertTrue(prepared.iloc[:100].equals(df.iloc[:100]))
+
+    def test_resampled_keeps_periods_with_data(self):
+        prepared = prepare_aligned(aligned_with_gaps(), "Daily")
+        self.assertEqual(len(prepared), 14)
+        self.assertFalse(prepared.isna().any().any())
+
+    def test_columns_without_data_are_dropped(self):
+        df = aligned_with_gaps()
+        df["snowfall"] = np.nan
+        prepared = prepare_aligned(df, "Hourly")
+        self.assertNotIn("snowfall", prepared.columns)
+        self.assertGreater(len(prepared), 0)
+
+    def test_hourly_forecast_and_scores(self):
+        df = prepare_aligned(aligned_with_gaps(), "Hourly")
+        y, x = df["quantitykwh"], df.drop(columns="quantitykwh")
+        end_idx = int(len(df) * 0.7)
+        _, ci, forecast, _ = sarimax_forecast("test:hourly-gaps", x, y, 0, end_idx,
+                                              order=(1, 0, 0), seasonal_order=(0, 0, 0, 0))
+        self.assertEqual(len(forecast), len(df) - end_idx)
+        self.assertFalse(ci.isna().any().any())
+        mean_squared_error(y.iloc[end_idx:].values, forecast.values)
+        r2_score(y.iloc[end_idx:].values, forecast.values)
+
+
+class FitReuseTest(unittest.TestCase):
+    def setUp(self):
+        df = prepare_aligned(aligned_with_gaps(), "Hourly")
+        self.y, self.x = df["quantitykwh"], df.drop(columns="quantitykwh")
+
+    def fit(self, series_id, start, end):
+        return fit_sarimax(series_id, self.y.iloc[start:end], self.x.iloc[start:end],
+                           (1, 0, 0), (0, 0, 0, 0))[1]
+
+    def test_small_moves_reuse_parameters(self):
+        self.assertEqual(self.fit("test:small", 0, 200), "fit")
+        self.assertEqual(self.fit("test:small", 0, 200), "cached")
+        self.assertEqual(self.fit("test:small", 0, 205), "appended")
+        self.assertEqual(self.fit("test:small", 3, 205), "applied")
+
+    def test_large_move_reestimates(self):
+        self.fit("test:large", 0, 200)
+        self.assertEqual(self.fit("test:large", 0, 260), "refit")
+        self.assertEqual(self.fit("test:large", 100, 260), "refit")
+
+    def test_many_small_moves_reestimate(self):
+        self.fit("test:many", 0, 200)
+        hows = [self.fit("test:many", 0, 200 + step) for step in range(1, REESTIMATE_AFTER + 2)]
+        self.assertEqual(hows[:REESTIMATE_AFTER], ["appended"] * REESTIMATE_AFTER)
+        self.assertEqual(hows[-1], "refit")
+
+    def test_parameters_follow_the_window(self):
+        self.fit("test:follow", 0, 200)
+        for end in range(205, 300, 5):
+            self.fit("test:follow", 0, end)
+        _, _, _, _, fit_index, _ = _model_store()[0][("test:follow", (1, 0, 0), (0, 0, 0, 0), tuple(self.x.columns))]
+        self.assertGreaterEqual(len(fit_index), 295 * (1 - REESTIMATE_SHARE))
+
+    def test_concurrent_sessions_share_the_store(self):
+        # sessions run on separate script threads, more series than the store holds
+        with ThreadPoolExecutor(8) as executor:
+            hows = list(executor.map(lambda i: self.fit(f"test:thread{i % 20}", 0, 200), range(40)))
+        self.assertTrue(set(hows) <= {"fit", "cached"})
+        self.assertLessEqual(len(_model_store()[0]), MODEL_CACHE_SIZE)
+
+if __name__ == "__main__":
+    unittest.main()
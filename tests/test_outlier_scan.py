@@ -0,0 +1,55 @@
+"""Writing and reading the stored outlier table."""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from outlier_scan import read_table, scan, write_table
+
+
+def weather(hours: int = 24 * 30) -> dict[str, pd.DataFrame]:
+    """Hourly weather of two cities with a spike in each series."""
+    index = pd.date_range("2024-01-01", periods=hours, freq="h", name="time")
+    rng = np.random.default_rng(0)
+    data = {}
+    for city in ["Oslo", "Bergen"]:
+        df = pd.DataFrame({"temperature_2m": np.sin(np.arange(hours) * 2 * np.pi / 24) + rng.normal(0, 0.1, hours),
+                           "wind_speed_10m": rng.random(hours)}, index=index)
+        df.iloc[hours // 2] += 10
+        data[city] = df
+    return data
+
+
+class WriteTableTest(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "outliers.parquet")
+        self.table = scan(weather(), max_workers=2)
+
+    def test_round_trip(self):
+        write_table(self.table, {"start": "2024-01-01"}, self.path)
+        rows, params = read_table(self.path, location="Oslo")
+        self.assertEqual(params, {"start": "2024-01-01"})
+        self.assertEqual(len(rows), (self.table["location"] == "Oslo").sum())
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["outliers.parquet"])
+
+    def test_failed_write_keeps_the_previous_table(self):
+        write_table(self.table, {"start": "2024-01-01"}, self.path)
+
+        def broken_write(table, where):
+            with open(where, "wb") as f:
+                f.write(b"PAR1 half a file")
+            raise OSError("disk full")
+
+        with mock.patch("outlier_scan.pq.write_table", broken_write):
+            with self.assertRaises(OSError):
+                write_table(self.table.iloc[:1], {"start": "2024-02-01"}, self.path)
+        rows, params = read_table(self.path)
+        self.assertEqual(params, {"start": "2024-01-01"})
+        self.assertEqual(len(rows), len(self.table))
+
+
+if __name__ == "__main__":
+    unittest.main()
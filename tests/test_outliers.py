@@ -0,0 +1,39 @@
+"""Sliding-window LOF on short reference windows."""
+import unittest
+
+import numpy as np
+from sklearn.neighbors import LocalOutlierFactor
+
+from outliers import StreamingLof
+
+
+class StreamingLofTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.reference = rng.standard_normal((8, 2))
+        self.new = rng.standard_normal((5, 2))
+
+    def test_short_reference_clamps_neighbours(self):
+        lof = StreamingLof(self.reference, n_neighbors=20)
+        self.assertEqual(lof.k, len(self.reference) - 1)
+        scores, labels = lof.update(self.new)
+        expected = LocalOutlierFactor(n_neighbors=len(self.reference) - 1, novelty=True).fit(self.reference)
+        np.testing.assert_allclose(scores, expected.score_samples(self.new), rtol=1e-6)
+        self.assertEqual(len(labels), len(self.new))
+
+    def test_reference_as_large_as_n_neighbors(self):
+        lof = StreamingLof(self.reference, n_neighbors=len(self.reference))
+        self.assertEqual(lof.k, len(self.reference) - 1)
+
+    def test_neighbours_grow_with_the_reference(self):
+        lof = StreamingLof(self.reference, n_neighbors=10, refit_every=5)
+        lof.update(self.new)
+        self.assertEqual(lof.k, 10)
+
+    def test_single_observation_is_rejected(self):
+        with self.assertRaises(ValueError):
+            StreamingLof(self.reference[:1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+"""Smoke run of every page with AppTest, against mongomock and a fake weather API."""
+import datetime
+import functools
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+import outlier_scan
+import utilities
+import weather_cache
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = sorted(os.path.join("pages", name) for name in os.listdir(os.path.join(ROOT, "pages")) if name.endswith(".py"))
+START = datetime.datetime(2024, 1, 1)
+DAYS = 60
+AREAS = ["NO1", "NO2", "NO3", "NO4", "NO5"]
+GROUPS = {"production": ["hydro", "wind", "solar", "thermal", "other"],
+          "consumption": ["household", "cabin", "primary", "secondary", "tertiary"]}
+
+
+def elhub_client() -> "mongomock.MongoClient":
+    """Client with DAYS of hourly production and consumption data for every price area and group."""
+    rng = random.Random(0)
+    client = mongomock.MongoClient()
+    for dataset, collection in [("production", client.elhub.prod_data), ("consumption", client.elhub.cons_data)]:
+        feat_name = f"{dataset}group"
+        collection.insert_many([{"starttime": START + datetime.timedelta(hours=h), "pricearea": area,
+                                 feat_name: group, "quantitykwh": rng.random() * 1e6}
+                                for h in range(DAYS * 24) for area in AREAS for group in GROUPS[dataset]])
+    return client
+
+
+def fake_request(url: str, params: dict = None) -> dict:
+    """Stand-in for utilities.mk_request: geocoding and Open-Meteo archive responses."""
+    if "geocoding" in url:
+        return {"results": [{"latitude": 59.91, "longitude": 10.75}]}
+    time = pd.date_range(params["start_date"], pd.Timestamp(params["end_date"]) + pd.Timedelta(hours=23), freq="h")
+    rng = np.random.default_rng(len(time))
+    hourly = {"time": time.strftime("%Y-%m-%dT%H:%M").tolist()}
+    for name in params["hourly"].split(","):
+        hourly[name] = (rng.random(len(time)) * (360 if "direction" in name else 10)).tolist()
+    return {"hourly": hourly}
+
+
+@unittest.skipIf(mongomock is None, "mongomock is not installed")
+class PagesTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        client = elhub_client()
+        cls.patches = [mock.patch("utilities.pymongo.MongoClient", lambda *args, **kwargs: client),
+                       mock.patch("utilities.mk_request", fake_request),
+                       mock.patch("utilities.mirror_covers", lambda client, dataset, end: False),
+                       mock.patch.object(weather_cache.default_cache(), "root", tempfile.mkdtemp())]
+        for patch in cls.patches:
+            patch.start()
+        utilities.init_connection.clear()
+
+    @classmethod
+    def tearDownClass(cls):
+        for patch in cls.patches:
+            patch.stop()
+        utilities.init_connection.clear()
+
+    def run_page(self, page: str) -> AppTest:
+        at = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=300)
+        at.secrets["mongo"] = {"uri": "mongodb://localhost"}
+        at.session_state["dates"] = (START.date(), (START + datetime.timedelta(days=DAYS - 1)).date())
+        at.run()
+        if page != "main.py":
+            at.switch_page(page)
+            at.run()
+        return at
+
+    def assert_ran(self, at: AppTest) -> None:
+        self.assertEqual([exception.value for exception in at.exception], [])
+        self.assertEqual([error.value for error in at.error], [])
+
+    def click(self, page: str, key: str, **number_inputs) -> AppTest:
+        """Run a page, set number inputs by key and press a button."""
+        at = self.run_page(page)
+        for input_key, value in number_inputs.items():
+            at.number_input(key=input_key).set_value(value)
+        at.button(key=key).click()
+        at.run()
+        self.assert_ran(at)
+        return at
+
+    def test_pages_run_without_exceptions(self):
+        for page in ["main.py", *PAGES]:
+            with self.subTest(page=page):
+                self.assert_ran(self.run_page(page))
+
+    def test_order_search(self):
+        at = self.click("pages/comb_forecasting_weather.py", "search_run", **{f"search_{i}": 0 for i in range(1, 6)})
+        results = [table.value for table in at.dataframe if "status" in table.value]
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["status"].tolist(), ["ok", "ok"])
+
+    def test_batch_forecast(self):
+        at = self.click("pages/el_forecasting.py", "batch_run")
+        metrics = [table.value for table in at.dataframe if "status" in table.value]
+        self.assertEqual(len(metrics), 1)
+        self.assertEqual(len(metrics[0]), len(AREAS) * len(GROUPS["production"]))
+        self.assertTrue((metrics[0]["status"] == "ok").all())
+
+    def test_outlier_scan(self):
+        path = os.path.join(tempfile.mkdtemp(), "outliers.parquet")
+        with mock.patch("outlier_scan.write_table", functools.partial(outlier_scan.write_table, path=path)), \
+             mock.patch("outlier_scan.read_table", functools.partial(outlier_scan.read_table, path=path)):
+            at = self.click("pages/weather_lof.py", "outlier_scan")
+        table, params = outlier_scan.read_table(path)
+        self.assertEqual(set(table["location"]), set(utilities.CITIES))
+        self.assertEqual(params["start"], str(START.date()))
+        self.assertIn("**Strongest outliers in Oslo** (top 10 per method)", [markdown.value for markdown in at.markdown])
+
+    def test_stl_precompute(self):
+        at = self.click("pages/el_stl_spect.py", "stl_precompute")
+        # every (price area, group) series except the one the page already decomposed
+        self.assertIn(f"Decomposed {len(AREAS) * len(GROUPS['production']) - 1} series",
+                      [success.value for success in at.success])
+
+
+if __name__ == "__main__":
+    unittest.main()
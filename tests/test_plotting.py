@@ -0,0 +1,34 @@
+"""Downsampled filled bands."""
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from plotting import band
+
+
+class BandTest(unittest.TestCase):
+    def test_edges_share_positions(self):
+        x = pd.date_range("2024-01-01", periods=10_000, freq="h")
+        rng = np.random.default_rng(0)
+        center = rng.standard_normal(len(x)).cumsum()
+        lower = pd.Series(center - 1 - rng.random(len(x)), index=x)
+        upper = pd.Series(center + 1 + rng.random(len(x)) * 5, index=x)
+        lower_trace, upper_trace = band(x, lower, upper, name="CI", n_out=500)
+        self.assertLessEqual(len(lower_trace.x), 500)
+        np.testing.assert_array_equal(lower_trace.x, upper_trace.x)
+        positions = x.get_indexer(pd.DatetimeIndex(lower_trace.x))
+        np.testing.assert_array_equal(lower_trace.y, lower.to_numpy()[positions])
+        np.testing.assert_array_equal(upper_trace.y, upper.to_numpy()[positions])
+        self.assertEqual(upper_trace.y.max(), upper.max())
+        self.assertEqual(lower_trace.y.min(), lower.min())
+        self.assertEqual((lower_trace.name, upper_trace.name, upper_trace.fill), ("Lower CI", "Upper CI", "tonexty"))
+
+    def test_short_band_is_unchanged(self):
+        lower_trace, upper_trace = band(np.arange(10), np.zeros(10), np.ones(10), name="CI")
+        self.assertEqual(len(lower_trace.x), 10)
+        self.assertEqual(len(upper_trace.y), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
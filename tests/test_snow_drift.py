@@ -0,0 +1,84 @@
+"""Array-based snow drift kernels against the per-row reference."""
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from Snow_drift import (FENCE_FACTORS, compute_average_sector, compute_fence_height, compute_seasonal_transport,
+                        compute_yearly_results, snowdrift_batch)
+
+T, F, THETA = 3000, 30000, 0.5
+
+
+def hourly_weather(start: str = "2020-07-01", hours: int = 24 * 400, seed: int = 0) -> pd.DataFrame:
+    """Hourly weather over a bit more than one season, with the season column the reference expects."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"time": pd.date_range(start, periods=hours, freq="h"),
+                       "temperature_2m": rng.normal(0, 5, hours),
+                       "precipitation": rng.exponential(0.3, hours),
+                       "wind_speed_10m": rng.gamma(2, 3, hours),
+                       "wind_direction_10m": rng.uniform(0, 360, hours)})
+    df["season"] = np.where(df["time"].dt.month >= 7, df["time"].dt.year, df["time"].dt.year - 1)
+    return df
+
+
+class SeasonalTransportTest(unittest.TestCase):
+    def test_matches_reference(self):
+        df = hourly_weather()
+        yearly, sectors = compute_seasonal_transport(df, T, F, THETA)
+        pd.testing.assert_frame_equal(yearly, compute_yearly_results(df, T, F, THETA), check_dtype=False)
+        np.testing.assert_allclose(sectors.mean(axis=0), compute_average_sector(df))
+
+    def test_gappy_data_matches_reference(self):
+        df = hourly_weather()
+        df.loc[100:300, "temperature_2m"] = np.nan
+        df.loc[250:500, "precipitation"] = np.nan
+        df.loc[df.index[df["temperature_2m"] < 1][-50:], "precipitation"] = np.nan  # snowfall hours
+        yearly, sectors = compute_seasonal_transport(df, T, F, THETA)
+        expected = compute_yearly_results(df, T, F, THETA)
+        self.assertFalse(yearly["Qt (kg/m)"].isna().any())
+        pd.testing.assert_frame_equal(yearly, expected, check_dtype=False)
+
+        # a missing wind speed makes its season NaN in both, the other season is unaffected
+        df.loc[df.index[-10], "wind_speed_10m"] = np.nan
+        yearly, sectors = compute_seasonal_transport(df, T, F, THETA)
+        expected = compute_yearly_results(df, T, F, THETA)
+        pd.testing.assert_frame_equal(yearly, expected, check_dtype=False)
+        self.assertEqual(yearly["Qt (kg/m)"].isna().tolist(), [False, True])
+        np.testing.assert_allclose(sectors.mean(axis=0), compute_average_sector(df))
+
+    def test_missing_directions_are_left_out_of_the_sectors(self):
+        df = hourly_weather()
+        df.loc[:99, "wind_direction_10m"] = np.nan
+        yearly, sectors = compute_seasonal_transport(df, T, F, THETA)
+        _, complete = compute_seasonal_transport(df.iloc[100:], T, F, THETA)
+        np.testing.assert_allclose(sectors, complete)
+        pd.testing.assert_frame_equal(yearly, compute_yearly_results(df, T, F, THETA), check_dtype=False)
+
+
+class SnowdriftBatchTest(unittest.TestCase):
+    def test_batch_matches_a_loop_over_sites(self):
+        sites = [hourly_weather(seed=seed) for seed in range(5)]
+        sites[3].loc[200:260, ["temperature_2m", "precipitation"]] = np.nan
+        columns = ["temperature_2m", "precipitation", "wind_speed_10m", "wind_direction_10m"]
+        T = np.array([1000, 2000, 3000, 4000, 5000])
+        # chunks of two sites, so sites 2 and 4 start a new chunk
+        results, sectors = snowdrift_batch(sites[0]["time"], *(np.stack([df[c].to_numpy() for df in sites])
+                                                               for c in columns),
+                                           T=T, F=F, theta=THETA, chunk_size=2)
+        self.assertEqual(sectors.shape, (5, 2, 16))
+        for site, df in enumerate(sites):
+            with self.subTest(site=site):
+                yearly, site_sectors = compute_seasonal_transport(df, T[site], F, THETA)
+                batch = results.xs(site, level="site")
+                pd.testing.assert_frame_equal(batch[yearly.columns.drop("season")].reset_index(drop=True),
+                                              yearly.drop(columns="season"), check_dtype=False)
+                self.assertEqual(batch.index.tolist(), yearly["season"].tolist())
+                np.testing.assert_allclose(sectors[site], site_sectors)
+                for fence_type in FENCE_FACTORS:
+                    np.testing.assert_allclose(batch[f"{fence_type} (m)"],
+                                               [compute_fence_height(qt, fence_type) for qt in yearly["Qt (kg/m)"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
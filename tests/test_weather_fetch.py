@@ -0,0 +1,113 @@
+"""HTTP retries, timeouts and chunked weather fetches against a local server."""
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+import utilities
+import weather_cache
+from utilities import get_weather_data, http_session, mk_request
+from weather_cache import snap_to_tile
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Answers every GET with server.respond(query) -> (status, body, delay)."""
+
+    def do_GET(self):
+        query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        with self.server.lock:
+            self.server.requests.append(query)
+        status, body, delay = self.server.respond(query)
+        time.sleep(delay)
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(json.dumps(body).encode())
+        except OSError:  # the client timed out and went away
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+def archive_response(query: dict) -> dict:
+    """Hourly archive response for the requested days, the value being the hour since 2024."""
+    time = pd.date_range(query["start_date"], pd.Timestamp(query["end_date"]) + pd.Timedelta(hours=23), freq="h")
+    hours = ((time - pd.Timestamp("2024-01-01")) / pd.Timedelta(hours=1)).tolist()
+    hourly = {"time": time.strftime("%Y-%m-%dT%H:%M").tolist()}
+    hourly.update({name: hours for name in query["hourly"].split(",")})
+    return {"hourly": hourly}
+
+
+class WeatherFetchTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1/archive"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        # the configured retries without the backoff sleeps
+        patch = mock.patch("utilities.HTTP_RETRIES", utilities.HTTP_RETRIES.new(backoff_factor=0))
+        patch.start()
+        self.addCleanup(patch.stop)
+        http_session.cache_clear()
+        self.addCleanup(http_session.cache_clear)
+
+    def test_retries_failed_responses(self):
+        statuses = iter([503, 502])
+        self.server.respond = lambda query: (next(statuses, 200), {"ok": True}, 0)
+        self.assertEqual(mk_request(self.url), {"ok": True})
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_gives_up_after_the_retries(self):
+        self.server.respond = lambda query: (500, {}, 0)
+        with self.assertLogs("utilities", "WARNING"):
+            self.assertIsNone(mk_request(self.url))
+        self.assertEqual(len(self.server.requests), 1 + utilities.HTTP_RETRIES.total)
+
+    def test_read_timeout(self):
+        self.server.respond = lambda query: (200, {}, 2)
+        with mock.patch("utilities.HTTP_TIMEOUT", (1, 0.1)), self.assertLogs("utilities", "WARNING"):
+            started = time.perf_counter()
+            self.assertIsNone(mk_request(self.url))
+            elapsed = time.perf_counter() - started
+        # every attempt is cut off after the read timeout instead of waiting for the server
+        self.assertEqual(len(self.server.requests), 1 + utilities.HTTP_RETRIES.total)
+        self.assertLess(elapsed, 1.5)
+
+    def test_chunks_are_concatenated_in_order(self):
+        # later chunks are answered first
+        self.server.respond = lambda query: (200, archive_response(query), 0.4 - int(query["start_date"][5:7]) * 0.1)
+        dates = (datetime.datetime(2024, 1, 10), datetime.datetime(2024, 4, 20))
+        cache = weather_cache.default_cache()
+        with mock.patch("utilities.WEATHER_ARCHIVE_URL", self.url), \
+             mock.patch.object(cache, "root", tempfile.mkdtemp()), \
+             mock.patch.object(cache, "evict", wraps=cache.evict) as evict:
+            get_weather_data.clear()
+            data = get_weather_data((59.91, 10.75), dates, chunk_months=1, max_workers=4)
+            get_weather_data.clear()
+            self.assertEqual(len(os.listdir(os.path.dirname(cache.path(snap_to_tile(59.91, 10.75), pd.Period("2024-01"))))), 4)
+        evict.assert_called_once()  # not once per stored month
+        self.assertEqual(sorted(query["start_date"] for query in self.server.requests),
+                         ["2024-01-01", "2024-02-01", "2024-03-01", "2024-04-01"])
+        expected = pd.date_range("2024-01-10", "2024-04-20 23:00", freq="h")
+        pd.testing.assert_index_equal(data.index, expected, check_names=False)
+        self.assertEqual(data["temperature_2m"].tolist(),
+                         ((expected - pd.Timestamp("2024-01-01")) / pd.Timedelta(hours=1)).tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+"""Worker pools started while a page is registered as __main__."""
+import os
+import sys
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+from utilities import process_pool
+
+
+class ProcessPoolTest(unittest.TestCase):
+    def setUp(self):
+        # A page that must not run again in the workers, registered as __main__ like Streamlit does.
+        path = os.path.join(tempfile.mkdtemp(), "page.py")
+        with open(path, "w") as f:
+            f.write("raise RuntimeError('the page was re-run in a worker')\n")
+        self.page = types.ModuleType("__main__")
+        self.page.__file__ = path
+        patch = mock.patch.dict(sys.modules, {"__main__": self.page})
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_workers_started_from_a_page_do_not_import_it(self):
+        with mock.patch("utilities.get_script_run_ctx", lambda suppress_warning=False: object()):
+            with process_pool(2) as executor:
+                pids = {future.result() for future in [executor.submit(os.getpid) for _ in range(4)]}
+        self.assertNotIn(os.getpid(), pids)
+        self.assertIs(sys.modules["__main__"], self.page)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,14 +5,31 @@ This module provides shared functions for data loading, MongoDB connection,
 sidebar setup, and API requests used across the Streamlit application.
 """
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pymongo
 from pymongo import MongoClient
 from dotenv import load_dotenv
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
 import datetime
-from typing import Literal, Optional
+import functools
+import logging
+import multiprocessing as mp
+import sys
+import threading
+import types
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Iterator, Literal, Optional
+from datasets import DatasetHandle, versioned
+from elhub_loader import apply_schema, collection_for, elhub_columns, load_columnar, time_windows
+from elhub_mirror import iter_mirror, mirror_covers, read_mirror
+from elhub_rollups import Grain, RollupAccumulator, read_rollup
+from weather_cache import default_cache, is_final, month_range, snap_to_tile
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
@@ -23,6 +40,62 @@ def init_connection() -> MongoClient:
     return pymongo.MongoClient(st.secrets["mongo"]["uri"])
 
 
+# Start method of worker pools: forking the multithreaded Streamlit server is unsafe.
+_START_METHOD = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+_WORKER_CONTEXT = mp.get_context(_START_METHOD)
+_LIBRARY_MAIN = types.ModuleType("__main__")  # no __file__ or __spec__, so workers import nothing for it
+_MAIN_LOCK = threading.Lock()
+
+
+class _LibraryProcess(_WORKER_CONTEXT.Process):
+    """Worker process started with __main__ swapped out, so it does not re-run the page."""
+
+    @staticmethod
+    def _Popen(process_obj):
+        with _MAIN_LOCK:
+            page = sys.modules["__main__"]
+            sys.modules["__main__"] = _LIBRARY_MAIN
+            try:
+                return _WORKER_CONTEXT.Process._Popen(process_obj)
+            finally:
+                if sys.modules["__main__"] is _LIBRARY_MAIN:  # Streamlit may have started another run meanwhile
+                    sys.modules["__main__"] = page
+
+
+class _LibraryContext(type(_WORKER_CONTEXT)):
+    Process = _LibraryProcess
+
+
+def process_pool(
+    max_workers: Optional[int] = None,
+    initializer: Optional[Callable] = None,
+    initargs: tuple = (),
+) -> ProcessPoolExecutor:
+    """
+    Create a process pool for CPU-bound work.
+
+    Workers are started with forkserver (spawn where it is not available):
+    the Streamlit server runs many threads, and a forked child can inherit a
+    lock one of them held. Spawned workers re-import __main__, which during a
+    script run is the page itself, so inside a run the workers are launched
+    with __main__ swapped for an empty module and only import the library
+    modules of the functions they run. Worker functions must therefore live
+    in library modules, not in pages.
+
+    Args:
+        max_workers: Number of worker processes. Defaults to the number of cores.
+        initializer: Optional callable run once in every worker.
+        initargs: Arguments for the initializer.
+
+    Returns:
+        ProcessPoolExecutor.
+    """
+    in_page = get_script_run_ctx(suppress_warning=True) is not None
+    return ProcessPoolExecutor(max_workers=max_workers,
+                               mp_context=_LibraryContext() if in_page else _WORKER_CONTEXT,
+                               initializer=initializer, initargs=initargs)
+
+
 def init() -> None:
     """Initialize session state with default values for client, dates, group, and location."""
     st.session_state['client'] = init_connection()
@@ -45,7 +118,54 @@ def check_mongodb_connection() -> None:
         st.sidebar.error(f"Error connecting to MongoDB: {e}")
         st.stop()
 
+def elhub_pipeline(
+    dates: tuple[datetime.datetime, datetime.datetime],
+    feat_name: Optional[str] = None,
+    groups: Optional[list[str]] = None,
+    price_area: Optional[str] = None,
+    aggregate_group: bool = False,
+    fields: Optional[list[str]] = None,
+) -> list[dict]:
+    """
+    Build the MongoDB aggregation pipeline for an Elhub query.
+
+    Filtering, projection and the per-hour sum are done by the server, so only
+    the documents (or hourly totals) the page needs are sent over the wire.
+
+    Args:
+        dates: Tuple of (start_date, end_date) for filtering.
+        feat_name: Name of the group field ('productiongroup' or 'consumptiongroup').
+        groups: Group values to keep. No group filter is applied if None.
+        price_area: Price area to keep. No area filter is applied if None.
+        aggregate_group: Whether to sum quantitykwh per starttime.
+        fields: Fields to return. All fields except _id are returned if None.
+
+    Returns:
+        List of pipeline stages.
+    """
+    match = {"starttime": {"$gte": dates[0], "$lte": dates[1]}}
+    if feat_name and groups is not None:
+        match[feat_name] = {"$in": [groups] if isinstance(groups, str) else list(groups)}
+    if price_area:
+        match["pricearea"] = price_area
+
+    pipeline = [{"$match": match}]
+    if aggregate_group:
+        pipeline += [
+            {"$project": {"_id": 0, "starttime": 1, "quantitykwh": 1}},
+            {"$group": {"_id": "$starttime", "quantitykwh": {"$sum": "$quantitykwh"}}},
+            {"$project": {"_id": 0, "starttime": "$_id", "quantitykwh": 1}},
+            {"$sort": {"starttime": 1}},
+        ]
+    elif fields:
+        pipeline.append({"$project": {"_id": 0, **{field: 1 for field in fields}}})
+    else:
+        pipeline.append({"$project": {"_id": 0}})
+    return pipeline
+
+
 @st.cache_data(ttl=600, show_spinner=False)
+@versioned
 def get_elhub_data(
     _client: MongoClient,
     dataset: Literal["production", "consumption"] = "production",
@@ -53,6 +173,10 @@ def get_elhub_data(
     filter_group: bool = False,
     aggregate_group: bool = False,
     set_time_index: bool = True,
+    groups: Optional[list[str]] = None,
+    price_area: Optional[str] = None,
+    columnar: bool = False,
+    use_mirror: bool = True,
 ) -> pd.DataFrame:
     """
     Fetch electricity data from MongoDB.
@@ -64,9 +188,15 @@ def get_elhub_data(
         filter_group: Whether to filter by production/consumption group.
         aggregate_group: Whether to aggregate data by timestamp.
         set_time_index: Whether to set starttime as the DataFrame index.
+        groups: Groups to keep when filter_group is set. Defaults to the groups in session state.
+        price_area: Price area to keep. All areas are returned if None.
+        columnar: Whether to stream the cursor into typed columns instead of a list of dicts.
+        use_mirror: Whether to read from the local Parquet mirror when it has been synced up to dates[1].
 
     Returns:
-        DataFrame containing the electricity data.
+        DataFrame in the Elhub schema (see elhub_loader.apply_schema): starttime as a
+        UTC timestamp, pricearea and the group field as categoricals and quantitykwh
+        as float64. Other fields are dropped, whichever source was used.
     """
     
     if isinstance(dates[0], datetime.date) or isinstance(dates[1], datetime.date):
@@ -75,36 +205,143 @@ def get_elhub_data(
     if not isinstance(dates[0], datetime.datetime):
         raise ValueError("dates[0] must be a datetime.date or datetime.datetime object")
 
-    db = _client.elhub
-    if dataset == "production":
-        items = db.prod_data.find({"starttime": {"$gte": dates[0], "$lte": dates[1]}})
-    elif dataset == "consumption":
-        items = db.cons_data.find({"starttime": {"$gte": dates[0], "$lte": dates[1]}})
-    else:
-        raise ValueError("dataset must be either 'production' or 'consumption'")
+    collection, feat_name = collection_for(_client, dataset)
+    columns = elhub_columns(feat_name, aggregate_group=aggregate_group)
+
+    if filter_group and groups is None:
+        groups = st.session_state.group.get("values")
+
+    if use_mirror and mirror_covers(_client, dataset, dates[1]):
+        data = read_mirror(dataset, dates,
+                           groups=groups if filter_group else None,
+                           price_area=price_area,
+                           aggregate_group=aggregate_group,
+                           set_time_index=False)
+        return apply_schema(data, columns, set_time_index=set_time_index, tz=ELHUB_TZ)
+
+    pipeline = elhub_pipeline(dates,
+                              feat_name=feat_name,
+                              groups=groups if filter_group else None,
+                              price_area=price_area,
+                              aggregate_group=aggregate_group,
+                              fields=list(columns) if columnar else None)
     
     with st.spinner("Fetching data from electricity data from database..."):
-        data = pd.DataFrame(list(items))
-        if set_time_index:
-            data.set_index("starttime", inplace=True)
-            data.sort_index(inplace=True)
-        data.drop(columns=["_id"], inplace=True,errors='ignore')
+        items = collection.aggregate(pipeline, allowDiskUse=True)
+        if columnar:
+            data = load_columnar(items, columns, set_time_index=False)
+        else:
+            data = pd.DataFrame(list(items))
 
-    if filter_group:
-        feat_name = st.session_state.group.get("feat_name")
-        values = st.session_state.group.get("values")
-        data = data[data[feat_name].isin(values)]
+    return apply_schema(data, columns, set_time_index=set_time_index, tz=ELHUB_TZ)
 
 
-    if aggregate_group:
-        data = data.groupby(data.index)['quantitykwh'].sum().reset_index().set_index("starttime").sort_index()
+def iter_elhub_data(
+    client: MongoClient,
+    dataset: Literal["production", "consumption"] = "production",
+    dates: tuple[datetime.datetime, datetime.datetime] = (datetime.datetime(2024, 1, 1), datetime.datetime(2024, 12, 31)),
+    groups: Optional[list[str]] = None,
+    price_area: Optional[str] = None,
+    freq: str = "MS",
+    use_mirror: bool = True,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream electricity data one time window (by default one calendar month) at a time.
+
+    Every window is a separate query loaded with the columnar loader, so only
+    one window is in memory at a time, whatever the length of the date range.
+    Feed the chunks to a RollupAccumulator to aggregate them incrementally.
+
+    Args:
+        client: MongoDB client connection.
+        dataset: Type of data to fetch ('production' or 'consumption').
+        dates: Tuple of (start_date, end_date) for filtering.
+        groups: Groups to keep. All groups are returned if None.
+        price_area: Price area to keep. All areas are returned if None.
+        freq: pandas frequency of the window starts, e.g. 'MS' (months) or 'W-MON' (weeks).
+        use_mirror: Whether to read from the local Parquet mirror when it has been synced up to dates[1].
+
+    Returns:
+        Iterator over time-ordered DataFrames indexed by starttime, with pricearea,
+        the group field and quantitykwh.
+    """
+    dates = tuple(d if isinstance(d, datetime.datetime) else datetime.datetime.combine(d, datetime.time())
+                  for d in dates)
+    if use_mirror and mirror_covers(client, dataset, dates[1]):
+        yield from iter_mirror(dataset, dates, groups=groups, price_area=price_area, freq=freq)
+        return
+
+    collection, feat_name = collection_for(client, dataset)
+    columns = elhub_columns(feat_name)
+    for window in time_windows(dates, freq):
+        pipeline = elhub_pipeline(window, feat_name=feat_name, groups=groups, price_area=price_area,
+                                  fields=list(columns))
+        yield load_columnar(collection.aggregate(pipeline, allowDiskUse=True), columns)
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def get_elhub_rollup(
+    _client: MongoClient,
+    dataset: Literal["production", "consumption"] = "production",
+    grain: Grain = "D",
+    dates: tuple[datetime.datetime, datetime.datetime] = (datetime.datetime(2024, 1, 1), datetime.datetime(2024, 12, 31)),
+    groups: Optional[list[str]] = None,
+    price_area: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Fetch daily, weekly or monthly Elhub aggregates per (pricearea, group).
+
+    Reads the precomputed rollups (local first, then MongoDB) and falls back to
+    aggregating the hourly data month by month when no rollup has been built.
+
+    Args:
+        _client: MongoDB client connection.
+        dataset: Type of data to fetch ('production' or 'consumption').
+        grain: 'D', 'W' or 'M'.
+        dates: Tuple of (start_date, end_date) for filtering.
+        groups: Groups to keep. All groups are returned if None.
+        price_area: Price area to keep. All areas are returned if None.
+
+    Returns:
+        DataFrame with starttime (period start), pricearea, group, sum, count and mean.
+    """
+    dates = tuple(d if isinstance(d, datetime.datetime) else datetime.datetime.combine(d, datetime.time())
+                  for d in dates)
+    data = read_rollup(_client, dataset, grain, dates, groups=groups, price_area=price_area)
+    if data is not None:
+        return data
+    rollup = RollupAccumulator(collection_for(_client, dataset)[1], grain)
+    with st.spinner("Aggregating electricity data from database..."):
+        for chunk in iter_elhub_data(_client, dataset, dates, groups=groups, price_area=price_area):
+            rollup.update(chunk)
+    return rollup.result()
+
+
+HTTP_TIMEOUT = (5, 60)  # (connect, read) seconds
+HTTP_RETRIES = Retry(total=4,
+                     backoff_factor=0.5,
+                     status_forcelist=(429, 500, 502, 503, 504),
+                     allowed_methods=frozenset({"GET"}))
+
+
+@functools.lru_cache(maxsize=None)
+def http_session() -> requests.Session:
+    """Return the shared HTTP session with keep-alive pooling and retries."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=HTTP_RETRIES)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
-    return data
 
 def mk_request(url: str, params: Optional[dict] = None) -> Optional[dict]:
     """
     Make a GET request to the specified URL.
 
+    Requests go through the shared session, are retried with exponential
+    backoff on connection errors and 429/5xx responses, and time out after
+    HTTP_TIMEOUT.
+
     Args:
         url: The API endpoint URL.
         params: Optional query parameters.
@@ -113,49 +350,313 @@ def mk_request(url: str, params: Optional[dict] = None) -> Optional[dict]:
         JSON response as a dictionary, or None if request fails.
     """
     try:
-        response = requests.get(url, params=params)
+        response = http_session().get(url, params=params, timeout=HTTP_TIMEOUT)
         response.raise_for_status()
         data = response.json()
         return data
     except requests.exceptions.RequestException as e:
-        print(f"Error fetching data: {e}")
+        logger.warning("Error fetching data: %s", e)
+        return None
+
+WEATHER_VARIABLES = "temperature_2m,precipitation,wind_speed_10m,wind_gusts_10m_spread,wind_direction_10m"
+WEATHER_ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive?"
+WEATHER_CHUNK_MONTHS = int(os.environ.get("WEATHER_CHUNK_MONTHS", 6))
+WEATHER_MAX_WORKERS = int(os.environ.get("WEATHER_MAX_WORKERS", 4))
+
+
+def fetch_weather(
+    coordinates: tuple[float, float],
+    start: datetime.date,
+    end: datetime.date,
+) -> Optional[pd.DataFrame]:
+    """
+    Fetch hourly ERA5 data for a date range from the Open-Meteo archive API.
+
+    Args:
+        coordinates: Tuple of (latitude, longitude).
+        start: First day to fetch.
+        end: Last day to fetch (inclusive).
+
+    Returns:
+        DataFrame with a time column, or None if the request fails.
+    """
+    lat, lon = coordinates
+    params = {"latitude" : lat, "longitude": lon, 
+              "start_date": start.strftime("%Y-%m-%d"),
+              "end_date": end.strftime("%Y-%m-%d"),
+              "hourly": WEATHER_VARIABLES,
+              "models" : "era5"
+              }
+    response = mk_request(WEATHER_ARCHIVE_URL,params=params)
+    if not response:
         return None
+    df_w = pd.DataFrame(response.get("hourly"))
+    df_w["time"] = pd.to_datetime(df_w["time"])
+    return df_w
+
+
+def _missing_runs(months: list[pd.Period], chunk_months: int = 0) -> list[list[pd.Period]]:
+    """
+    Group missing months into runs of consecutive months, fetched with one request each.
+
+    Args:
+        months: Sorted list of months to fetch.
+        chunk_months: Maximum number of months per run. Runs are not split if 0.
+
+    Returns:
+        List of runs.
+    """
+    runs = []
+    for month in months:
+        if runs and runs[-1][-1] + 1 == month and (not chunk_months or len(runs[-1]) < chunk_months):
+            runs[-1].append(month)
+        else:
+            runs.append([month])
+    return runs
+
 
 @st.cache_data(ttl=7200, show_spinner=False)
+@versioned
 def get_weather_data(
     coordinates: tuple[float, float],
     dates: tuple[datetime.datetime, datetime.datetime],
-    set_time_index: bool = True
+    set_time_index: bool = True,
+    chunk_months: int = WEATHER_CHUNK_MONTHS,
+    max_workers: int = WEATHER_MAX_WORKERS,
 ) -> pd.DataFrame:
     """
     Fetch weather data from the Open-Meteo API.
 
+    Coordinates are snapped to a cache tile and data is cached on disk per
+    (tile, month), so only months that are not cached yet are requested.
+    Missing months are split into chunks that are fetched concurrently.
+
     Args:
         coordinates: Tuple of (latitude, longitude).
         dates: Tuple of (start_date, end_date).
         set_time_index: Whether to set time as the DataFrame index.
+        chunk_months: Maximum number of months per request. 0 fetches each run of missing months in one request.
+        max_workers: Number of requests in flight at the same time.
 
     Returns:
         DataFrame containing weather data.
     """
-    lat, lon = coordinates
-    params = {"latitude" : lat, "longitude": lon, 
-              "start_date": dates[0].strftime("%Y-%m-%d"),
-              "end_date": dates[1].strftime("%Y-%m-%d"),
-              "hourly": "temperature_2m,precipitation,wind_speed_10m,wind_gusts_10m_spread,wind_direction_10m",
-              "models" : "era5"
-              }
-    base_url = "https://archive-api.open-meteo.com/v1/archive?"
+    tile = snap_to_tile(*coordinates)
+    start, end = pd.Timestamp(dates[0]).date(), pd.Timestamp(dates[1]).date()
+    cache = default_cache()
+
+    months = {month: cache.get(tile, month) for month in month_range(start, end)}
+    missing = [month for month, data in months.items() if data is None]
+
+    def fetch_run(run: list[pd.Period]) -> Optional[pd.DataFrame]:
+        # Complete months are fetched whole so they can be cached, the
+        # current (still changing) month only for the requested days.
+        run_start = run[0].start_time.date() if is_final(run[0]) else max(run[0].start_time.date(), start)
+        run_end = run[-1].end_time.date() if is_final(run[-1]) else min(run[-1].end_time.date(), end)
+        return fetch_weather(tile, run_start, run_end)
+
     with st.spinner("Fetching weather data from API..."):
-        response = mk_request(base_url,params=params)
-        if response:
-            df_w = pd.DataFrame(response.get("hourly"))
-            df_w["time"] = pd.to_datetime(df_w["time"])
-            if set_time_index:
-                return df_w.set_index("time")
-            return df_w
-        st.warning("No weather data retrieved from API.")
+        runs = _missing_runs(missing, chunk_months)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(runs)))) as executor:
+            responses = list(executor.map(fetch_run, runs))
+        try:
+            for data in responses:
+                if data is None:
+                    st.warning("No weather data retrieved from API.")
+                    return pd.DataFrame()
+                for month, data_month in data.groupby(data["time"].dt.to_period("M")):
+                    data_month = data_month.reset_index(drop=True)
+                    months[month] = data_month
+                    if is_final(month):
+                        cache.put(tile, month, data_month, evict=False)
+        finally:
+            if missing:
+                cache.evict()  # once for all the months stored above
+
+    df_w = pd.concat([months[month] for month in sorted(months) if months[month] is not None], ignore_index=True)
+    df_w = df_w[(df_w["time"] >= pd.Timestamp(start)) & (df_w["time"] < pd.Timestamp(end) + pd.Timedelta(days=1))]
+    df_w = df_w.reset_index(drop=True)
+    if set_time_index:
+        return df_w.set_index("time")
+    return df_w
+
+
+ELHUB_TZ = "UTC"  # Elhub starttimes are stored in UTC (converted from the API's local offsets)
+WEATHER_TZ = "UTC"  # Open-Meteo returns GMT when no timezone is requested
+
+
+def to_hourly_utc(df: pd.DataFrame, source_tz: str = "UTC") -> pd.DataFrame:
+    """
+    Normalize a time-indexed frame to tz-aware UTC hours.
+
+    Naive timestamps are interpreted in source_tz. For local time zones the
+    repeated hour when DST ends is resolved from the order of the rows, and
+    the skipped hour when DST starts is shifted forward, so every row ends up
+    on a unique UTC hour. Rows that fall into the same hour are averaged.
+
+    Args:
+        df: DataFrame with a DatetimeIndex.
+        source_tz: Time zone of naive timestamps, e.g. 'UTC' or 'Europe/Oslo'.
+
+    Returns:
+        DataFrame indexed by UTC hours, sorted.
+    """
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is None:
+        index = index.tz_localize(source_tz, ambiguous="infer", nonexistent="shift_forward")
+    index = index.tz_convert("UTC").floor("h")
+    data = df.set_axis(index, axis=0)
+    if not index.is_unique:
+        data = data.groupby(level=0).mean()
+    elif not index.is_monotonic_increasing:
+        data = data.sort_index()
+    return data
+
+
+def hourly_grid(dates: tuple[datetime.datetime, datetime.datetime]) -> pd.DatetimeIndex:
+    """Return every UTC hour of the selected days, from the first hour of dates[0] to the last hour of dates[1]."""
+    start = pd.Timestamp(dates[0]).normalize().tz_localize("UTC")
+    end = pd.Timestamp(dates[1]).normalize().tz_localize("UTC") + pd.Timedelta(hours=23)
+    return pd.date_range(start, end, freq="h", name="time")
+
+
+@st.cache_data(ttl=7200, show_spinner=False)
+@versioned
+def get_aligned_data(
+    _client: MongoClient,
+    dataset: Literal["production", "consumption"],
+    groups: Optional[list[str]],
+    coordinates: tuple[float, float],
+    dates: tuple[datetime.datetime, datetime.datetime],
+    price_area: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Load Elhub and weather data for a selection and join them on one hourly UTC grid.
+
+    Both sources are normalized with to_hourly_utc and reindexed onto the same
+    grid, so the join is a column concatenation instead of a merge. Hours that
+    are missing in one source stay NaN; the grid is only trimmed at the start
+    and end to the range where both sources have data. The result is cached per
+    selection, so widget changes on the combined pages do not re-join the data.
+
+    Args:
+        _client: MongoDB client connection.
+        dataset: 'production' or 'consumption'.
+        groups: Groups summed into the quantitykwh column.
+        coordinates: Tuple of (latitude, longitude) for the weather data.
+        dates: Tuple of (start_date, end_date).
+        price_area: Price area to keep. All areas are summed if None.
+
+    Returns:
+        DataFrame indexed by UTC hour with quantitykwh followed by the weather variables.
+    """
+    df_el = get_elhub_data(_client,
+                           dataset=dataset,
+                           dates=dates,
+                           filter_group=True,
+                           aggregate_group=True,
+                           groups=groups,
+                           price_area=price_area)
+    df_w = get_weather_data(coordinates=coordinates, dates=dates, set_time_index=True)
+    if df_el.empty or df_w.empty:
+        return pd.DataFrame()
+
+    grid = hourly_grid(dates)
+    df_el = to_hourly_utc(df_el[["quantitykwh"]], source_tz=ELHUB_TZ).reindex(grid)
+    df_w = to_hourly_utc(df_w, source_tz=WEATHER_TZ).reindex(grid)
+
+    has_el, has_w = df_el.notna().any(axis=1).to_numpy(), df_w.notna().any(axis=1).to_numpy()
+    both = has_el.nonzero()[0], has_w.nonzero()[0]
+    if not len(both[0]) or not len(both[1]):
         return pd.DataFrame()
+    first, last = max(both[0][0], both[1][0]), min(both[0][-1], both[1][-1])
+    columns = {"quantitykwh": df_el["quantitykwh"].to_numpy()[first:last + 1]}
+    columns.update({name: df_w[name].to_numpy()[first:last + 1] for name in df_w.columns})
+    return pd.DataFrame(columns, index=grid[first:last + 1])
+
+
+# Handle loaders: the frames of the cached loaders above, wrapped in a
+# DatasetHandle so that cached analysis functions are keyed on its fingerprint
+# (see datasets.py). They are not cached themselves, so each frame is cached
+# once; the data version comes with the cached frame (see datasets.versioned).
+
+def get_elhub_dataset(
+    _client: MongoClient,
+    dataset: Literal["production", "consumption"] = "production",
+    dates: tuple[datetime.datetime, datetime.datetime] = (datetime.datetime(2024, 1, 1), datetime.datetime(2024, 12, 31)),
+    aggregate_group: bool = False,
+    groups: Optional[list[str]] = None,
+    price_area: Optional[str] = None,
+) -> DatasetHandle:
+    """
+    Fetch electricity data (columnar, in the Elhub schema) as a dataset handle.
+
+    Args:
+        _client: MongoDB client connection.
+        dataset: Type of data to fetch ('production' or 'consumption').
+        dates: Tuple of (start_date, end_date) for filtering.
+        aggregate_group: Whether to aggregate data by timestamp.
+        groups: Groups to keep. All groups are returned if None.
+        price_area: Price area to keep. All areas are returned if None.
+
+    Returns:
+        DatasetHandle with the frame get_elhub_data returns for the same arguments.
+    """
+    data = get_elhub_data(_client, dataset=dataset, dates=dates,
+                          filter_group=groups is not None,
+                          aggregate_group=aggregate_group,
+                          groups=groups,
+                          price_area=price_area,
+                          columnar=True)
+    return DatasetHandle.create(data, "elhub", dataset=dataset, dates=dates, aggregate_group=aggregate_group,
+                                groups=groups, price_area=price_area)
+
+
+def get_weather_dataset(
+    coordinates: tuple[float, float],
+    dates: tuple[datetime.datetime, datetime.datetime],
+) -> DatasetHandle:
+    """
+    Fetch weather data indexed by time as a dataset handle.
+
+    Args:
+        coordinates: Tuple of (latitude, longitude).
+        dates: Tuple of (start_date, end_date).
+
+    Returns:
+        DatasetHandle with the frame get_weather_data returns for the same arguments.
+    """
+    data = get_weather_data(coordinates=coordinates, dates=dates, set_time_index=True)
+    return DatasetHandle.create(data, "weather", coordinates=coordinates, dates=dates)
+
+
+def get_aligned_dataset(
+    _client: MongoClient,
+    dataset: Literal["production", "consumption"],
+    groups: Optional[list[str]],
+    coordinates: tuple[float, float],
+    dates: tuple[datetime.datetime, datetime.datetime],
+    price_area: Optional[str] = None,
+) -> DatasetHandle:
+    """
+    Load the joined electricity and weather data as a dataset handle.
+
+    Args:
+        _client: MongoDB client connection.
+        dataset: 'production' or 'consumption'.
+        groups: Groups summed into the quantitykwh column.
+        coordinates: Tuple of (latitude, longitude) for the weather data.
+        dates: Tuple of (start_date, end_date).
+        price_area: Price area to keep. All areas are summed if None.
+
+    Returns:
+        DatasetHandle with the frame get_aligned_data returns for the same arguments.
+    """
+    data = get_aligned_data(_client, dataset=dataset, groups=groups, coordinates=coordinates,
+                            dates=dates, price_area=price_area)
+    return DatasetHandle.create(data, "aligned", dataset=dataset, groups=groups, coordinates=coordinates,
+                                dates=dates, price_area=price_area)
+
 
 def geocode(city: str) -> Optional[dict]:
     """
@@ -202,6 +703,13 @@ def select_price_area(disable_location: bool = False) -> None:
     if price_area:
         st.session_state.location["price_area"] = price_area
 
+CITIES = {"Oslo" : "NO1", 
+          "Kristiansand" : "NO2", 
+          "Trondheim" : "NO3", 
+          "Tromsø" : "NO4", 
+          "Bergen" : "NO5"}  # one reference city per price area
+
+
 def select_city(disable_location: bool = False) -> None:
     """
     Display city selector in sidebar and update session state.
@@ -209,15 +717,10 @@ def select_city(disable_location: bool = False) -> None:
     Args:
         disable_location: Whether to disable the selector.
     """
-    locations = {"Oslo" : "NO1", 
-                "Kristiansand" : "NO2", 
-                "Trondheim" : "NO3", 
-                "Tromsø" : "NO4", 
-                "Bergen" : "NO5"}
-    city = st.selectbox("Select city", options=list(locations.keys()), index=None, disabled=disable_location)
+    city = st.selectbox("Select city", options=list(CITIES.keys()), index=None, disabled=disable_location)
     if city:
         st.session_state.location["city"] = city
-        st.session_state.location["price_area"] = locations.get(city)
+        st.session_state.location["price_area"] = CITIES.get(city)
         coord = extract_coordinates(city)
         st.session_state.location["coordinates"] = coord
                           
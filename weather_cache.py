@@ -0,0 +1,138 @@
+"""
+Persistent on-disk cache for Open-Meteo archive responses.
+
+Hourly ERA5 data is stored as one Parquet file per coordinate tile and calendar
+month. Archive months are immutable once ERA5 has caught up, so any date range
+can be answered by stitching cached months, and only the missing months have to
+be fetched from the API. The cache is bounded by total size and evicts the
+least recently used months first.
+"""
+import datetime
+import functools
+import os
+import uuid
+from typing import Optional
+
+import pandas as pd
+
+WEATHER_CACHE_DIR = os.environ.get("WEATHER_CACHE_DIR", "data/cache/weather")
+WEATHER_CACHE_MAX_BYTES = int(os.environ.get("WEATHER_CACHE_MAX_BYTES", 512 * 2**20))
+TILE_DEGREES = float(os.environ.get("WEATHER_TILE_DEGREES", 0.05))
+ERA5_DELAY = datetime.timedelta(days=7)  # ERA5 lags real time by ~5 days
+
+
+def snap_to_tile(lat: float, lon: float, size: float = TILE_DEGREES) -> tuple[float, float]:
+    """
+    Snap coordinates to the centre of their cache tile.
+
+    Args:
+        lat: Latitude in degrees.
+        lon: Longitude in degrees.
+        size: Tile size in degrees.
+
+    Returns:
+        Tuple of (latitude, longitude) rounded to the tile grid.
+    """
+    decimals = max(0, len(f"{size:g}".partition(".")[2]))
+    return (round(round(lat / size) * size, decimals),
+            round(round(lon / size) * size, decimals))
+
+
+def month_range(start: datetime.date, end: datetime.date) -> list[pd.Period]:
+    """Return the calendar months overlapping [start, end]."""
+    return list(pd.period_range(pd.Timestamp(start).to_period("M"), pd.Timestamp(end).to_period("M"), freq="M"))
+
+
+def is_final(month: pd.Period, today: Optional[datetime.date] = None) -> bool:
+    """Whether ERA5 data for a month is complete and will not change anymore."""
+    today = today or datetime.date.today()
+    return month.end_time.date() + ERA5_DELAY < today
+
+
+class WeatherCache:
+    """Size-bounded LRU cache of hourly weather data per (tile, month)."""
+
+    def __init__(self, root: str = WEATHER_CACHE_DIR, max_bytes: int = WEATHER_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def path(self, tile: tuple[float, float], month: pd.Period) -> str:
+        """Return the file used for one tile and month."""
+        return os.path.join(self.root, f"{tile[0]:.4f}_{tile[1]:.4f}", f"{month}.parquet")
+
+    def get(self, tile: tuple[float, float], month: pd.Period) -> Optional[pd.DataFrame]:
+        """
+        Look up a cached month.
+
+        Args:
+            tile: Snapped (latitude, longitude).
+            month: Calendar month.
+
+        Returns:
+            DataFrame with a time column, or None on a cache miss.
+        """
+        path = self.path(tile, month)
+        try:
+            data = pd.read_parquet(path)
+            os.utime(path)  # mark as recently used
+            return data
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+
+    def put(self, tile: tuple[float, float], month: pd.Period, data: pd.DataFrame, evict: bool = True) -> None:
+        """
+        Store a month and evict old entries if the cache grew too large.
+
+        Args:
+            tile: Snapped (latitude, longitude).
+            month: Calendar month.
+            data: DataFrame with a time column covering the month.
+            evict: Whether to evict right away. Callers storing several months
+                pass False and call evict() once after the last put, since
+                eviction walks the whole cache directory.
+        """
+        path = self.path(tile, month)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        data.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+        if evict:
+            self.evict()
+
+    def entries(self) -> list[tuple[float, int, str]]:
+        """Return (last used, size, path) for every cached file."""
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if not name.endswith(".parquet"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def size(self) -> int:
+        """Total size of the cache in bytes."""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self) -> None:
+        """Delete least recently used months until the cache fits in max_bytes."""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+@functools.lru_cache(maxsize=None)
+def default_cache() -> WeatherCache:
+    """Return the process-wide weather cache."""
+    return WeatherCache()